@@ -0,0 +1,172 @@
+"""Random-access corpus shards: JSONL plus a fixed-width binary offset index.
+
+Every shard ``name.jsonl`` is published with a sidecar ``name.idx``:
+
+    header      <8sHHIII  magic, version, record size, record count,
+                          category table length, reserved
+    categories  UTF-8 JSON list of category names (chat topic, summarization
+                bucket, reasoning category), padded to 8 bytes
+    records     <QIIH6x   byte offset, byte length, token count, category id
+
+The offsets are into the uncompressed JSONL. A shard published with
+--compression gzip is stored as gzip bytes, so gunzip it before opening it
+with its index; the manifest entry records this as
+"index_offsets": "uncompressed".
+
+A reader mmaps both files and can fetch or sample any record in O(1)
+without deserializing the rest of the shard:
+
+    with CorpusShard("build/corpus/chat/passages.jsonl") as shard:
+        doc = shard.get(3)
+        picks = shard.sample(5, by_bucket="GPU Architecture", seed=1)
+        for doc in shard.iter_stratified(strata=4, seed=1):
+            ...
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+from pathlib import Path
+
+MAGIC = b"GTCIDX01"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIII")
+RECORD = struct.Struct("<QIIH6x")
+
+IndexEntry = namedtuple("IndexEntry", "offset length token_count category")
+
+
+def index_path_for(jsonl_path: Path) -> Path:
+    return Path(jsonl_path).with_suffix(".idx")
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def write_shard(jsonl_path: Path, records: list[dict], token_field: str, category_of) -> tuple[str, int]:
+    """Write records as JSONL plus the sidecar index; return (sha256, byte size) of the JSONL.
+
+    category_of(record) names the record's bucket/category; ids are assigned
+    in first-seen order.
+    """
+    jsonl_path = Path(jsonl_path)
+    jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    categories: dict[str, int] = {}
+    entries = bytearray()
+    offset = 0
+
+    with open(jsonl_path, "wb") as f:
+        for r in records:
+            line = (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+            f.write(line)
+            digest.update(line)
+            category = categories.setdefault(category_of(r), len(categories))
+            entries += RECORD.pack(offset, len(line), r[token_field], category)
+            offset += len(line)
+
+    table = json.dumps(list(categories), ensure_ascii=False).encode("utf-8")
+    with open(index_path_for(jsonl_path), "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(records), len(table), 0))
+        f.write(table.ljust(_pad8(len(table)), b"\0"))
+        f.write(entries)
+
+    return digest.hexdigest(), offset
+
+
+class CorpusShard:
+    """Memory-mapped reader for a JSONL shard and its .idx sidecar."""
+
+    def __init__(self, jsonl_path: Path, index_path: Path | None = None):
+        jsonl_path = Path(jsonl_path)
+        index_path = Path(index_path) if index_path else index_path_for(jsonl_path)
+
+        with open(index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, table_len, _ = HEADER.unpack_from(self._index, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{index_path}: not a v{VERSION} corpus index")
+        self.categories: list[str] = json.loads(self._index[HEADER.size:HEADER.size + table_len])
+        self._records_start = HEADER.size + _pad8(table_len)
+        self._count = count
+
+        with open(jsonl_path, "rb") as f:
+            # mmap cannot map a zero-length file; an empty shard has nothing to read anyway
+            empty = os.fstat(f.fileno()).st_size == 0
+            self._data = b"" if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._by_category: dict[int, list[int]] | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._index.close()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def entry(self, i: int) -> IndexEntry:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return IndexEntry(*RECORD.unpack_from(self._index, self._records_start + i * RECORD.size))
+
+    def entries(self):
+        """Iterate over all index entries (no JSON is parsed)."""
+        return (IndexEntry(*e) for e in RECORD.iter_unpack(
+            self._index[self._records_start:self._records_start + self._count * RECORD.size]))
+
+    def get(self, i: int) -> dict:
+        e = self.entry(i)
+        return json.loads(self._data[e.offset:e.offset + e.length])
+
+    def indices_for(self, bucket: str) -> list[int]:
+        """Record indices in the named bucket/category."""
+        if self._by_category is None:
+            self._by_category = {}
+            for i, e in enumerate(self.entries()):
+                self._by_category.setdefault(e.category, []).append(i)
+        if bucket not in self.categories:
+            raise KeyError(f"unknown bucket {bucket!r} (have {self.categories})")
+        return self._by_category.get(self.categories.index(bucket), [])
+
+    def sample(self, k: int, by_bucket: str | None = None, seed: int | None = None) -> list[dict]:
+        """k records drawn uniformly, without replacement while k <= population."""
+        rng = random.Random(seed)
+        population = self.indices_for(by_bucket) if by_bucket is not None else range(self._count)
+        if not population:
+            return []
+        if k <= len(population):
+            picks = rng.sample(population, k)
+        else:
+            picks = rng.choices(population, k=k)
+        return [self.get(i) for i in picks]
+
+    def iter_stratified(self, strata: int = 4, seed: int | None = None):
+        """Yield every record, alternating across token-length strata.
+
+        Records are split into `strata` equal-count groups by token_count
+        (shortest first); iteration round-robins across groups, shuffled
+        within each, so any prefix of the stream covers the length range.
+        """
+        if self._count == 0:
+            return
+        rng = random.Random(seed)
+        order = sorted(range(self._count), key=lambda i: self.entry(i).token_count)
+        size = -(-len(order) // max(strata, 1))
+        groups = [order[s:s + size] for s in range(0, len(order), size)]
+        for g in groups:
+            rng.shuffle(g)
+        for pos in range(size):
+            for g in groups:
+                if pos < len(g):
+                    yield self.get(g[pos])
@@ -0,0 +1,90 @@
+"""Per-shard corpus profiles for capacity planning.
+
+For every shard the profile records the prompt-token distribution (power-of-
+two histogram, percentiles, total) and what serving one record costs on a
+given model:
+
+    prefill FLOPs   2 * params * T  (dense matmuls)
+                  + 2 * layers * T^2 * hidden  (causal QK^T and AV)
+    KV footprint    ceil(T / block) * block * 2 * layers * kv_heads * head_dim * kv_bytes
+
+at each engine's KV block size (16 for vLLM, 32 for TRT-LLM). Token counts
+are the curated prompt text only: chat templates and generated output add to
+both at serving time.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+ModelSpec = namedtuple("ModelSpec", "name params layers hidden kv_heads head_dim")
+
+MODELS = {
+    "llama-3.3-70b": ModelSpec("Llama-3.3-70B-Instruct", 70.6e9, 80, 8192, 8, 128),
+    "llama-3.1-8b": ModelSpec("Llama-3.1-8B-Instruct", 8.03e9, 32, 4096, 8, 128),
+}
+DEFAULT_MODEL = "llama-3.3-70b"
+
+BLOCK_SIZES = {"vllm": 16, "trtllm": 32}
+PERCENTILES = (50, 90, 95, 99)
+
+
+def prefill_flops(tokens: np.ndarray, model: ModelSpec) -> np.ndarray:
+    t = tokens.astype(np.float64)
+    return 2 * model.params * t + 2 * model.layers * t * t * model.hidden
+
+
+def kv_bytes_per_token(model: ModelSpec, kv_bytes: int) -> int:
+    # K and V for every layer and KV head
+    return 2 * model.layers * model.kv_heads * model.head_dim * kv_bytes
+
+
+def histogram(tokens: np.ndarray) -> dict:
+    """Counts per power-of-two token-length bin: [0, 32), [32, 64), [64, 128), ..."""
+    top = max(int(tokens.max()) + 1, 64)
+    edges = [0] + [2 ** k for k in range(5, math.ceil(math.log2(top)) + 1)]
+    counts, _ = np.histogram(tokens, bins=edges)
+    return {"edges": edges, "counts": counts.tolist()}
+
+
+def _summary(values: np.ndarray, digits: int | None = None) -> dict:
+    rnd = (lambda v: round(float(v), digits)) if digits is not None else (lambda v: int(round(float(v))))
+    summary = {"mean": round(float(values.mean()), 1 if digits is None else digits), "max": rnd(values.max())}
+    summary.update({f"p{q}": rnd(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+    return summary
+
+
+def profile_shard(tokens: list[int], model: ModelSpec, kv_bytes: int = 2) -> dict:
+    t = np.asarray(tokens, dtype=np.int64)
+    flops = prefill_flops(t, model)
+    per_token = kv_bytes_per_token(model, kv_bytes)
+
+    kv = {}
+    for engine, block in BLOCK_SIZES.items():
+        blocks = -(-t // block)
+        kv[engine] = {
+            "block_size": block,
+            "blocks": _summary(blocks),
+            "bytes": _summary(blocks * block * per_token),
+            "total_bytes": int((blocks * block * per_token).sum()),
+        }
+
+    return {
+        "records": int(t.size),
+        "tokens": {"total": int(t.sum()), "min": int(t.min()), **_summary(t)},
+        "histogram": histogram(t),
+        "prefill_tflops": {**_summary(flops / 1e12, digits=3), "total": round(float(flops.sum()) / 1e12, 3)},
+        "kv_cache": kv,
+    }
+
+
+def build_profile(shard_tokens: dict[str, list[int]], model_key: str = DEFAULT_MODEL, kv_bytes: int = 2) -> dict:
+    """Profile every named shard (shards without tokens are left out)."""
+    model = MODELS[model_key]
+    return {
+        "model": {**model._asdict(), "kv_bytes": kv_bytes,
+                  "kv_bytes_per_token": kv_bytes_per_token(model, kv_bytes)},
+        "percentiles": list(PERCENTILES),
+        "shards": {name: profile_shard(tokens, model, kv_bytes) for name, tokens in shard_tokens.items() if tokens},
+    }
@@ -5,20 +5,69 @@ Loads bundled chat passages and reasoning prompts, fetches summarization docs
 from Project Gutenberg, and uploads everything to a Spaces bucket under the
 corpus/ prefix.
 
+Gutenberg downloads run concurrently (bounded per host) and are kept in an
+on-disk HTTP cache, so re-curation only costs one conditional request per book.
+
+Token counts come from a local tokenizer.json when --tokenizer (or
+TOKENIZER_PATH) is given, and fall back to a ~1.3 tokens/word heuristic.
+
+Publishing is incremental: corpus/manifest.json lists every shard with its
+content hash, size, record count and token statistics, and only shards whose
+hash changed since the last run are uploaded (--force uploads all of them).
+Each shard is also written under --build-dir with a binary .idx sidecar for
+random access (see corpus_index.py); the sidecar is published next to it.
+Its offsets are into the uncompressed JSONL, so a gzip shard downloaded from
+the store must be decompressed before it is opened with its .idx.
+corpus/profile.json summarizes each shard's token distribution, prefill FLOPs
+and KV-cache footprint per request for --model (see corpus_profile.py).
+
+Publishing goes through a storage backend (see storage.py): --backend s3
+(the default, Spaces via AWS_* credentials), local (a directory laid out by
+key, e.g. to pre-stage the corpus onto the model NFS PVC) or memory (for
+offline profiling). Credentials are only needed for s3.
+
+The shared-prefix mode builds synthetic multi-turn chat corpora with a tunable
+number of shared context prefixes for KV-routing experiments (see
+shared_prefix.py).
+
+The trace mode turns the local build of the corpus into a seeded arrival trace
+(.npy structured array plus a JSON sidecar) that benchmarks can replay request
+for request (see traces.py).
+
 Usage:
     source ~/env/gtc.env
-    python3 apps/corpus-curator/curate.py [--force]
+    python3 apps/corpus-curator/curate.py [--force] [--cache-dir DIR] [--fetch-workers N]
+        [--tokenizer PATH/tokenizer.json] [--token-workers N]
+    python3 apps/corpus-curator/curate.py --backend local --local-root /mnt/models/corpus-store
+    python3 apps/corpus-curator/curate.py shared-prefix --prefixes 16 --prefix-tokens 4000 \
+        --zipf 1.2 --turns 5 --conversations 1000 --name p16-z12
+    python3 apps/corpus-curator/curate.py trace --process gamma --burstiness 3 --rps 4 \
+        --duration 600 --mix a=1,b=1,c=1 --seed 7 --name bursty-4rps
 """
 
 import argparse
+import gzip
+import hashlib
 import json
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urlparse
 
 import boto3
 import requests
+from boto3.s3.transfer import TransferConfig
+
+from corpus_index import index_path_for, write_shard
+from corpus_profile import DEFAULT_MODEL, MODELS, build_profile
+from shared_prefix import build_shared_prefix_corpus
+from storage import LocalStore, MemoryStore, ObjectStore, S3Store
+from token_counter import (TRIM_WINDOW_CHARS_PER_TOKEN, HeuristicCounter, TokenCache, TokenCounter,
+                           TokenizerCounter, trim_to_token_budget)
+from traces import ARRIVAL_PROCESSES, build_trace, save_trace
 
 # ---------------------------------------------------------------------------
 # Config
@@ -27,28 +76,79 @@ import requests
 ENDPOINT_URL = os.environ.get("ENDPOINT_URL", "https://atl1.digitaloceanspaces.com")
 BUCKET = os.environ.get("BUCKET", "do-gtc2026-doks-demo")
 SENTINEL_KEY = "corpus/.curator-complete"
+MANIFEST_KEY = "corpus/manifest.json"
+MANIFEST_VERSION = 1
+PROFILE_KEY = "corpus/profile.json"
 CORPUS_PREFIX = "corpus/"
 
 SCRIPT_DIR = Path(__file__).resolve().parent
+BUILD_DIR = SCRIPT_DIR / "build"
+LOCAL_ROOT = Path(os.environ.get("CURATOR_LOCAL_ROOT", SCRIPT_DIR / "local-store"))
+BACKENDS = ("s3", "local", "memory")
+
+CACHE_DIR = Path(os.environ.get("CURATOR_CACHE_DIR", Path.home() / ".cache" / "gtc-corpus-curator"))
+FETCH_WORKERS = 8
+MAX_CONNECTIONS_PER_HOST = 2
+USER_AGENT = "GTCDemoCorpusCurator/1.0 (booth demo; no scraping)"
+
+# Multipart transfer: memory in flight is bounded by chunksize * max_concurrency
+UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+COMPRESSIONS = ("gzip", "none")
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def estimate_tokens(text: str) -> int:
-    """Rough token estimate: ~1.3 tokens per whitespace-delimited word."""
-    return int(len(text.split()) * 1.3)
+def make_token_counter(tokenizer_path: Path | None, workers: int | None, cache_dir: Path) -> TokenCounter:
+    """Tokenizer-backed counter if a tokenizer.json is given, else the word heuristic."""
+    if not tokenizer_path:
+        return HeuristicCounter()
+    if not Path(tokenizer_path).is_file():
+        print(f"ERROR: tokenizer file not found: {tokenizer_path}")
+        sys.exit(1)
+    cache = TokenCache(Path(cache_dir) / "token-counts.sqlite")
+    return TokenizerCounter(tokenizer_path, workers=workers, cache=cache)
+
+
+_thread_local = threading.local()
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
 
 
-SESSION = requests.Session()
-SESSION.headers.update({"User-Agent": "GTCDemoCorpusCurator/1.0 (booth demo; no scraping)"})
+def get_session() -> requests.Session:
+    """Per-thread session (requests.Session is not safe to share across threads)."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"User-Agent": USER_AGENT})
+        _thread_local.session = session
+    return session
 
 
-def fetch_with_retry(url: str, max_retries: int = 3, timeout: int = 30) -> requests.Response:
-    """GET with exponential backoff."""
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    """Semaphore limiting concurrent connections to the URL's host."""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_slots[host]
+
+
+def fetch_with_retry(url: str, max_retries: int = 3, timeout: int = 30,
+                     headers: dict | None = None) -> requests.Response:
+    """GET with exponential backoff.
+
+    The per-host slot is only held while a request is in flight, so one task
+    backing off does not block other downloads from the same host.
+    """
     for attempt in range(max_retries):
         try:
-            resp = SESSION.get(url, timeout=timeout)
+            with host_slot(url):
+                resp = get_session().get(url, timeout=timeout, headers=headers)
             resp.raise_for_status()
             return resp
         except (requests.RequestException, requests.HTTPError) as exc:
@@ -59,18 +159,182 @@ def fetch_with_retry(url: str, max_retries: int = 3, timeout: int = 30) -> reque
             time.sleep(wait)
 
 
-def upload_jsonl(s3, bucket: str, key: str, records: list[dict]):
-    """Upload a list of dicts as newline-delimited JSON."""
-    body = "\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n"
-    s3.put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"), ContentType="application/jsonl")
-    print(f"  Uploaded s3://{bucket}/{key} ({len(records)} records, {len(body)} bytes)")
+class HttpCache:
+    """On-disk cache of GET response bodies, revalidated via ETag/Last-Modified.
+
+    Each URL maps to a ``<sha256>.body`` file holding the raw bytes and a
+    ``<sha256>.json`` file holding the validators and text encoding.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / f"{key}.body", self.root / f"{key}.json"
+
+    def get_text(self, url: str) -> tuple[str, bool]:
+        """Return (text, from_cache). Sends a conditional GET when a cached copy exists."""
+        body_path, meta_path = self._paths(url)
+        meta = None
+        if body_path.exists() and meta_path.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                meta = None
+
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = fetch_with_retry(url, headers=headers)
+        if resp.status_code == 304 and meta:
+            return body_path.read_bytes().decode(meta["encoding"], errors="replace"), True
+
+        encoding = resp.encoding or "utf-8"
+        new_meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "encoding": encoding,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        # Write body before metadata so a crash never leaves validators for a partial body
+        for path, data in ((body_path, resp.content), (meta_path, json.dumps(new_meta).encode("utf-8"))):
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return resp.content.decode(encoding, errors="replace"), False
+
+
+def iter_jsonl(records: list[dict]):
+    """Yield each record as one encoded JSONL line."""
+    for r in records:
+        yield (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _ProducerReader:
+    """Pipe read end that raises the writer thread's error at EOF instead of ending cleanly.
+
+    Closing the pipe looks like a normal end of stream, so without this a
+    failed writer would still publish a truncated object; raising from read()
+    makes every store abort the put (S3 aborts the multipart upload).
+    """
+
+    def __init__(self, fileobj, writer: threading.Thread, errors: list):
+        self._fileobj = fileobj
+        self._writer = writer
+        self._errors = errors
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if not data:
+            # EOF means the writer closed its end: wait for it to record any error
+            self._writer.join()
+            if self._errors:
+                raise self._errors[0]
+        return data
+
+    def close(self):
+        self._fileobj.close()
+
+
+def upload_jsonl(store: ObjectStore, key: str, records: list[dict], compression: str = "gzip"):
+    """Stream a list of dicts as newline-delimited JSON through a multipart upload.
+
+    A writer thread serializes (and optionally gzips) records into a pipe that
+    the transfer manager reads part by part, so memory stays constant no matter
+    how large the corpus is. The object carries Content-Encoding and the record
+    count in its metadata. If serialization fails the put is aborted and any
+    previously published object is left in place.
+    """
+    read_fd, write_fd = os.pipe()
+    reader = os.fdopen(read_fd, "rb")
+    written = {"bytes": 0}
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, "wb") as raw:
+                # mtime=0 keeps the compressed bytes reproducible run to run
+                out = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compression == "gzip" else raw
+                for line in iter_jsonl(records):
+                    out.write(line)
+                    written["bytes"] += len(line)
+                if out is not raw:
+                    out.close()
+        except Exception as exc:
+            errors.append(exc)
+
+    writer = threading.Thread(target=produce, daemon=True)
+    writer.start()
+    try:
+        store.put_stream(key, _ProducerReader(reader, writer, errors), "application/jsonl",
+                         content_encoding="gzip" if compression == "gzip" else None,
+                         metadata={"record-count": str(len(records))})
+    finally:
+        # Closing the read end unblocks the writer if the upload failed early
+        reader.close()
+        writer.join()
+    print(f"  Uploaded {store.url(key)} ({len(records)} records, {written['bytes']} bytes, {compression})")
+
+
+def shard_entry(name: str, key: str, records: list[dict], token_field: str, compression: str,
+                digest: str, size: int) -> dict:
+    """Describe a shard by the sha256 of its uncompressed JSONL plus size/token stats."""
+    tokens = [r[token_field] for r in records]
+    return {
+        "name": name,
+        "key": key,
+        "index_key": str(index_path_for(Path(key))),
+        # The .idx offsets always address the uncompressed JSONL, whatever "compression" is
+        "index_offsets": "uncompressed",
+        "sha256": digest,
+        "bytes": size,
+        "records": len(records),
+        "compression": compression,
+        "tokens": {
+            "total": sum(tokens),
+            "min": min(tokens),
+            "max": max(tokens),
+            "mean": round(sum(tokens) / len(tokens), 1),
+        },
+    }
+
+
+def load_manifest(store: ObjectStore, key: str = MANIFEST_KEY) -> dict | None:
+    """Fetch a published manifest, or None if there isn't one (or it is unreadable)."""
+    body = store.get_bytes(key)
+    if body is None:
+        return None
+    try:
+        manifest = json.loads(body)
+    except ValueError:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def shard_unchanged(entry: dict, previous: dict | None) -> bool:
+    return (
+        previous is not None
+        and previous.get("key") == entry["key"]
+        and previous.get("index_key") == entry["index_key"]
+        and previous.get("sha256") == entry["sha256"]
+        and previous.get("compression") == entry["compression"]
+    )
 
 
 # ---------------------------------------------------------------------------
 # Chat passages (bundled)
 # ---------------------------------------------------------------------------
 
-def load_chat_passages() -> list[dict]:
+def load_chat_passages(counter: TokenCounter) -> list[dict]:
     """Load bundled chat passages and add token counts."""
     print("Loading chat passages...")
     passages_path = SCRIPT_DIR / "prompts" / "chat_passages.json"
@@ -78,8 +342,8 @@ def load_chat_passages() -> list[dict]:
         raw = json.load(f)
 
     passages = []
-    for p in raw:
-        token_count = estimate_tokens(p["text"])
+    token_counts = counter.count_batch([p["text"] for p in raw])
+    for p, token_count in zip(raw, token_counts):
         passages.append({
             "id": p["id"],
             "text": p["text"],
@@ -115,7 +379,6 @@ GUTENBERG_BOOKS = [
 # Token targets per bucket
 TOKEN_TARGETS = {"short": 4000, "medium": 10000, "long": 18000}
 
-
 def strip_gutenberg_boilerplate(text: str) -> str:
     """Remove Project Gutenberg header and footer."""
     # Find start of actual text
@@ -150,40 +413,59 @@ def strip_gutenberg_boilerplate(text: str) -> str:
     return text[start_idx:end_idx].strip()
 
 
-def fetch_summarization_docs() -> dict[str, list[dict]]:
-    """Fetch excerpts from Project Gutenberg, bucketed by length."""
+def fetch_summarization_docs(cache: HttpCache, counter: TokenCounter,
+                             max_workers: int = FETCH_WORKERS) -> dict[str, list[dict]]:
+    """Fetch excerpts from Project Gutenberg, bucketed by length.
+
+    Books are downloaded concurrently; each task retries independently so a
+    slow mirror only delays its own book.
+    """
     print("Fetching summarization docs from Project Gutenberg...")
+    docs: dict[int, tuple[str, dict]] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(cache.get_text, f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.txt"):
+                (i, book_id, title, bucket)
+            for i, (book_id, title, bucket) in enumerate(GUTENBERG_BOOKS)
+        }
+        for fut in as_completed(futures):
+            i, book_id, title, bucket = futures[fut]
+            try:
+                raw, from_cache = fut.result()
+                text = strip_gutenberg_boilerplate(raw)
+                docs[i] = (bucket, {
+                    "id": f"summ-{i+1:02d}",
+                    "text": text,
+                    "source": f"gutenberg:{book_id}",
+                    "title": title,
+                })
+                source = "cached" if from_cache else "downloaded"
+                print(f"  [{i+1}/{len(GUTENBERG_BOOKS)}] {title} ({bucket}, {source})")
+            except Exception as exc:
+                print(f"  ERROR fetching {title} (id={book_id}): {exc}")
+
+    # Trim to exact token targets, keeping GUTENBERG_BOOKS order regardless of completion order
+    order = sorted(docs)
+    windows = []
+    for i in order:
+        bucket, doc = docs[i]
+        windows.append(doc["text"][:TOKEN_TARGETS[bucket] * TRIM_WINDOW_CHARS_PER_TOKEN])
+    for i, window, token_ends in zip(order, windows, counter.token_ends_batch(windows)):
+        bucket, doc = docs[i]
+        if len(token_ends) <= TOKEN_TARGETS[bucket] and len(window) < len(doc["text"]):
+            # Window too small for this text: fall back to encoding all of it
+            window = doc["text"]
+            token_ends = counter.token_ends_batch([window])[0]
+        doc["text"] = trim_to_token_budget(window, TOKEN_TARGETS[bucket], token_ends)
+
+    token_counts = counter.count_batch([docs[i][1]["text"] for i in order])
     docs_by_bucket: dict[str, list[dict]] = {"short": [], "medium": [], "long": []}
-
-    for i, (book_id, title, bucket) in enumerate(GUTENBERG_BOOKS):
-        url = f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.txt"
-        try:
-            resp = fetch_with_retry(url)
-            text = strip_gutenberg_boilerplate(resp.text)
-
-            # Trim to target token count (rough: 1 token ≈ 0.77 words)
-            target = TOKEN_TARGETS[bucket]
-            words = text.split()
-            target_words = int(target / 1.3)
-            if len(words) > target_words:
-                text = " ".join(words[:target_words])
-                # End at last sentence boundary
-                last_period = text.rfind(".")
-                if last_period > len(text) * 0.8:
-                    text = text[:last_period + 1]
-
-            token_count = estimate_tokens(text)
-            docs_by_bucket[bucket].append({
-                "id": f"summ-{i+1:02d}",
-                "text": text,
-                "source": f"gutenberg:{book_id}",
-                "title": title,
-                "token_count": token_count,
-            })
-            print(f"  [{i+1}/{len(GUTENBERG_BOOKS)}] {title} ({bucket}): {token_count} tokens")
-        except Exception as exc:
-            print(f"  ERROR fetching {title} (id={book_id}): {exc}")
-
+    for i, token_count in zip(order, token_counts):
+        bucket, doc = docs[i]
+        doc["token_count"] = token_count
+        docs_by_bucket[bucket].append(doc)
+        print(f"  {doc['title']} ({bucket}): {token_count}/{TOKEN_TARGETS[bucket]} tokens")
     return docs_by_bucket
 
 
@@ -191,7 +473,7 @@ def fetch_summarization_docs() -> dict[str, list[dict]]:
 # Reasoning prompts
 # ---------------------------------------------------------------------------
 
-def load_reasoning_prompts() -> list[dict]:
+def load_reasoning_prompts(counter: TokenCounter) -> list[dict]:
     """Load bundled reasoning prompts and add token counts."""
     print("Loading reasoning prompts...")
     prompts_path = SCRIPT_DIR / "prompts" / "reasoning.json"
@@ -199,13 +481,14 @@ def load_reasoning_prompts() -> list[dict]:
         prompts = json.load(f)
 
     records = []
-    for p in prompts:
+    token_counts = counter.count_batch([p["prompt"] for p in prompts])
+    for p, token_count in zip(prompts, token_counts):
         records.append({
             "id": p["id"],
             "prompt": p["prompt"],
             "category": p["category"],
             "expected_output_length": p["expected_output_length"],
-            "prompt_token_count": estimate_tokens(p["prompt"]),
+            "prompt_token_count": token_count,
         })
     print(f"  Loaded {len(records)} reasoning prompts")
     return records
@@ -215,18 +498,14 @@ def load_reasoning_prompts() -> list[dict]:
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    parser = argparse.ArgumentParser(description="Curate and upload demo corpus to Spaces")
-    parser.add_argument("--force", action="store_true", help="Re-upload even if sentinel exists")
-    args = parser.parse_args()
-
-    # Validate credentials
+def make_s3_client():
+    """Spaces client from AWS_* credentials (exits if they are missing)."""
     for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
         if not os.environ.get(var):
             print(f"ERROR: {var} not set. Run: source ~/env/gtc.env")
             sys.exit(1)
 
-    s3 = boto3.client(
+    return boto3.client(
         "s3",
         endpoint_url=ENDPOINT_URL,
         aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
@@ -234,44 +513,314 @@ def main():
         region_name="us-east-1",  # required by boto3 but ignored by Spaces
     )
 
-    # Check sentinel
-    if not args.force:
+
+def make_store(args) -> ObjectStore:
+    """Object store selected by --backend."""
+    if args.backend == "local":
+        return LocalStore(args.local_root)
+    if args.backend == "memory":
+        return MemoryStore()
+    return S3Store(make_s3_client(), BUCKET, UPLOAD_CONFIG)
+
+
+def publish_shards(store: ObjectStore, shards: list[tuple], manifest_key: str, args, token_counter: str) -> dict:
+    """Write shards locally, upload those that changed, then write the manifest.
+
+    shards are (name, key, records, token field, category_of) tuples.
+    """
+    previous = load_manifest(store, manifest_key)
+    previous_shards = {e["name"]: e for e in previous["shards"]} if previous else {}
+    if previous:
+        print(f"\nFound manifest from {previous['generated_at']} ({len(previous_shards)} shards)")
+    else:
+        print("\nNo published manifest — uploading all shards")
+
+    # --- Upload changed shards ---
+    print(f"\nUploading to {store.url(CORPUS_PREFIX)}...")
+    now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    entries = []
+    uploaded = 0
+    for name, key, records, token_field, category_of in shards:
+        if not records:
+            # Fetch failed this run: keep serving the previously published shard
+            if name in previous_shards:
+                print(f"  WARN: no records for {name}, keeping published shard")
+                entries.append(previous_shards[name])
+            continue
+        local_path = args.build_dir / key
+        digest, size = write_shard(local_path, records, token_field, category_of)
+        entry = shard_entry(name, key, records, token_field, args.compression, digest, size)
+        prev = previous_shards.get(name)
+        if shard_unchanged(entry, prev) and not args.force:
+            entry["uploaded_at"] = prev.get("uploaded_at", now)
+            print(f"  Unchanged {name} (sha256 {entry['sha256'][:12]}), skipping")
+        else:
+            upload_jsonl(store, key, records, args.compression)
+            store.put_file(entry["index_key"], index_path_for(local_path), "application/octet-stream")
+            entry["uploaded_at"] = now
+            uploaded += 1
+        entries.append(entry)
+
+    # --- Write manifest (after shards, so it never points at unpublished content) ---
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": now,
+        "token_counter": token_counter,
+        "shards": entries,
+    }
+    store.put_bytes(manifest_key, json.dumps(manifest, indent=2).encode("utf-8"), "application/json")
+    print(f"\nManifest written to {store.url(manifest_key)} "
+          f"({uploaded} uploaded, {len(entries) - uploaded} unchanged)")
+    return manifest
+
+
+def publish_profile(store: ObjectStore, shards: list[tuple], manifest: dict, key: str, args) -> dict | None:
+    """Write the token/prefill/KV profile of the manifest's shards next to it.
+
+    Shards the manifest carried over from an earlier run (no records this run)
+    keep their entry from the published profile; if that entry is missing or
+    was built for another model, the published profile is left as it is.
+    """
+    records_by_name = {name: (records, token_field) for name, _, records, token_field, _ in shards}
+    profile = build_profile({name: [r[token_field] for r in records]
+                             for name, (records, token_field) in records_by_name.items() if records},
+                            args.model, args.kv_bytes)
+    carried = [e["name"] for e in manifest["shards"] if not records_by_name.get(e["name"], ([], None))[0]]
+    if carried:
         try:
-            s3.head_object(Bucket=BUCKET, Key=SENTINEL_KEY)
-            print(f"Sentinel found at s3://{BUCKET}/{SENTINEL_KEY} — corpus already uploaded.")
-            print("Use --force to re-upload.")
-            sys.exit(0)
-        except s3.exceptions.ClientError:
-            pass  # sentinel doesn't exist, proceed
+            previous = json.loads(store.get_bytes(key) or b"null")
+        except ValueError:
+            previous = None
+        same_model = bool(previous) and previous.get("model") == profile["model"]
+        missing = [name for name in carried if not same_model or name not in previous.get("shards", {})]
+        if missing:
+            print(f"  WARN: no profile for carried-over {', '.join(missing)}, keeping {store.url(key)}")
+            return None
+        profile["shards"].update({name: previous["shards"][name] for name in carried})
+    # Same shards, in the same order, as the manifest
+    profile["shards"] = {e["name"]: profile["shards"][e["name"]] for e in manifest["shards"]}
+    body = json.dumps(profile, indent=2).encode("utf-8")
+    (args.build_dir / key).parent.mkdir(parents=True, exist_ok=True)
+    (args.build_dir / key).write_bytes(body)
+    store.put_bytes(key, body, "application/json")
+    print(f"Profile written to {store.url(key)} ({profile['model']['name']})")
+    for name, p in profile["shards"].items():
+        print(f"  {name}: {p['tokens']['total']} tokens, p95 {p['tokens']['p95']}, "
+              f"p95 prefill {p['prefill_tflops']['p95']} TFLOP, "
+              f"p95 KV {p['kv_cache']['vllm']['bytes']['p95'] / 2**20:.0f} MiB (block 16)")
+    return profile
+
+
+def cmd_publish(args):
+    """Default mode: curate the demo corpus and publish changed shards."""
+    store = make_store(args)
 
     # --- Fetch / Load ---
-    chat_passages = load_chat_passages()
-    summ_docs = fetch_summarization_docs()
-    reasoning_prompts = load_reasoning_prompts()
-
-    # --- Upload ---
-    print("\nUploading to Spaces...")
-    upload_jsonl(s3, BUCKET, "corpus/chat/passages.jsonl", chat_passages)
-
+    counter = make_token_counter(args.tokenizer, args.token_workers, args.cache_dir)
+    print(f"Token counter: {counter.name}")
+    try:
+        chat_passages = load_chat_passages(counter)
+        summ_docs = fetch_summarization_docs(HttpCache(args.cache_dir), counter, args.fetch_workers)
+        reasoning_prompts = load_reasoning_prompts(counter)
+    finally:
+        counter.close()
+
+    # (name, key, records, token field, category of a record)
+    shards = [("chat/passages", "corpus/chat/passages.jsonl", chat_passages, "token_count",
+               lambda r: r["topic"])]
     for bucket_name in ("short", "medium", "long"):
-        docs = summ_docs.get(bucket_name, [])
-        if docs:
-            upload_jsonl(s3, BUCKET, f"corpus/summarization/{bucket_name}/docs.jsonl", docs)
+        shards.append((f"summarization/{bucket_name}", f"corpus/summarization/{bucket_name}/docs.jsonl",
+                       summ_docs.get(bucket_name, []), "token_count", lambda r, b=bucket_name: b))
+    shards.append(("reasoning/prompts", "corpus/reasoning/prompts.jsonl", reasoning_prompts,
+                   "prompt_token_count", lambda r: r["category"]))
 
-    upload_jsonl(s3, BUCKET, "corpus/reasoning/prompts.jsonl", reasoning_prompts)
+    manifest = publish_shards(store, shards, MANIFEST_KEY, args, counter.name)
+    publish_profile(store, shards, manifest, PROFILE_KEY, args)
 
     # --- Write sentinel ---
     sentinel_body = json.dumps({
-        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "timestamp": manifest["generated_at"],
         "chat_passages": len(chat_passages),
         "summarization_docs": sum(len(v) for v in summ_docs.values()),
         "reasoning_prompts": len(reasoning_prompts),
+        "token_counter": counter.name,
+        "manifest": MANIFEST_KEY,
+        "profile": PROFILE_KEY,
     })
-    s3.put_object(Bucket=BUCKET, Key=SENTINEL_KEY, Body=sentinel_body.encode("utf-8"),
-                  ContentType="application/json")
-    print(f"\nSentinel written to s3://{BUCKET}/{SENTINEL_KEY}")
+    store.put_bytes(SENTINEL_KEY, sentinel_body.encode("utf-8"), "application/json")
+    print(f"Sentinel written to {store.url(SENTINEL_KEY)}")
     print("Corpus upload complete!")
 
 
+def cmd_shared_prefix(args):
+    """Build and publish a shared-prefix multi-turn chat corpus."""
+    if args.turns < 1 or args.prefixes < 1 or args.conversations < 1:
+        print("ERROR: --prefixes, --turns and --conversations must be >= 1")
+        sys.exit(1)
+    store = make_store(args)
+
+    counter = make_token_counter(args.tokenizer, args.token_workers, args.cache_dir)
+    print(f"Token counter: {counter.name}")
+    try:
+        passages = load_chat_passages(counter)
+        print(f"Building shared-prefix corpus '{args.name}'...")
+        prefixes, conversations, metadata = build_shared_prefix_corpus(
+            passages, counter,
+            n_prefixes=args.prefixes,
+            prefix_tokens=args.prefix_tokens,
+            zipf_s=args.zipf,
+            turns=args.turns,
+            n_conversations=args.conversations,
+            assistant_tokens=args.assistant_tokens,
+            block_size=args.block_size,
+            seed=args.seed,
+        )
+    finally:
+        counter.close()
+    print(f"  {len(prefixes)} prefixes, {len(conversations)} conversations, "
+          f"max prefix-cache hit rate {metadata['theoretical_max_hit_rate']:.1%} "
+          f"(cross-conversation {metadata['cross_conversation_hit_rate']:.1%})")
+
+    prefix = f"{CORPUS_PREFIX}shared-prefix/{args.name}/"
+    shards = [
+        ("prefixes", f"{prefix}prefixes.jsonl", prefixes, "token_count", lambda r: r["id"]),
+        ("conversations", f"{prefix}conversations.jsonl", conversations, "token_count",
+         lambda r: r["prefix_id"]),
+    ]
+    manifest = publish_shards(store, shards, f"{prefix}manifest.json", args, counter.name)
+    publish_profile(store, shards, manifest, f"{prefix}profile.json", args)
+
+    metadata_key = f"{prefix}metadata.json"
+    body = json.dumps(metadata, indent=2).encode("utf-8")
+    (args.build_dir / metadata_key).write_bytes(body)
+    store.put_bytes(metadata_key, body, "application/json")
+    print(f"Metadata written to {store.url(metadata_key)}")
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """'a=2,b=1,c=1' -> {'a': 2.0, 'b': 1.0, 'c': 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        workload, _, weight = part.partition("=")
+        if workload not in ("a", "b", "c") or not weight:
+            raise argparse.ArgumentTypeError(f"bad mix entry {part!r} (expected a=W,b=W,c=W)")
+        mix[workload] = float(weight)
+    return mix
+
+
+def cmd_trace(args):
+    """Build a replayable arrival trace from the local corpus build."""
+    if args.rps <= 0 or args.duration <= 0:
+        print("ERROR: --rps and --duration must be > 0")
+        sys.exit(1)
+    if args.burstiness <= 0 or args.period <= 0:
+        # gamma's shape is 1 / burstiness**2: 0 divides by zero, a negative value acts as its absolute value
+        print("ERROR: --burstiness and --period must be > 0")
+        sys.exit(1)
+    if not 0 <= args.amplitude <= 1:
+        # Above 1 the diurnal rate would go negative at the trough
+        print("ERROR: --amplitude must be between 0 and 1")
+        sys.exit(1)
+    try:
+        trace, metadata = build_trace(
+            args.build_dir, args.mix, args.process, args.rps, args.duration, args.seed,
+            burstiness=args.burstiness, period_s=args.period, amplitude=args.amplitude,
+            assistant_tokens=args.assistant_tokens,
+        )
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    path = args.output or args.build_dir / f"{CORPUS_PREFIX}traces/{args.name}.npy"
+    meta_path = save_trace(path, trace, metadata)
+    print(f"Trace '{args.name}': {metadata['requests']} arrivals, {metadata['rows']} requests "
+          f"over {args.duration:.0f}s ({args.process}) -> {path}")
+
+    if args.upload:
+        store = make_store(args)
+        for local, content_type in ((path, "application/octet-stream"), (meta_path, "application/json")):
+            key = f"{CORPUS_PREFIX}traces/{args.name}{local.suffix}"
+            store.put_file(key, local, content_type)
+            print(f"  Uploaded {store.url(key)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Curate and upload demo corpus to Spaces",
+        epilog="Options above apply to every mode and go before the mode name.",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="s3",
+                        help="Where to publish: s3 (Spaces, needs AWS_* credentials), local (a directory "
+                             "laid out by key) or memory (discarded on exit, for profiling) (default: s3)")
+    parser.add_argument("--local-root", type=Path, default=LOCAL_ROOT,
+                        help=f"Root directory for --backend local (default: {LOCAL_ROOT})")
+    parser.add_argument("--force", action="store_true",
+                        help="Upload every shard, even those unchanged since the published manifest")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                        help=f"On-disk HTTP cache for Gutenberg downloads (default: {CACHE_DIR})")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS,
+                        help=f"Concurrent Gutenberg downloads (default: {FETCH_WORKERS}, "
+                             f"at most {MAX_CONNECTIONS_PER_HOST} per host)")
+    parser.add_argument("--build-dir", type=Path, default=BUILD_DIR,
+                        help=f"Local copy of the published shards and their .idx sidecars (default: {BUILD_DIR})")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="gzip",
+                        help="Content-Encoding for uploaded JSONL (default: gzip)")
+    parser.add_argument("--tokenizer", type=Path, default=os.environ.get("TOKENIZER_PATH"),
+                        help="Local tokenizer.json for exact token counts (default: $TOKENIZER_PATH, "
+                             "else ~1.3 tokens/word heuristic)")
+    parser.add_argument("--token-workers", type=int, default=None,
+                        help="Processes used to encode text with --tokenizer (default: CPU count)")
+    parser.add_argument("--model", choices=MODELS, default=DEFAULT_MODEL,
+                        help=f"Model for prefill FLOPs and KV footprint in the corpus profile (default: {DEFAULT_MODEL})")
+    parser.add_argument("--kv-bytes", type=int, default=2,
+                        help="Bytes per KV-cache element in the corpus profile; 1 for an FP8 cache (default: 2)")
+    parser.set_defaults(func=cmd_publish)
+    modes = parser.add_subparsers(title="modes", metavar="MODE")
+
+    modes.add_parser("publish", help="Curate the demo corpus and publish changed shards (default)")
+
+    sp = modes.add_parser("shared-prefix", help="Multi-turn chat corpus with tunable prefix sharing")
+    sp.set_defaults(func=cmd_shared_prefix)
+    sp.add_argument("--name", default="default",
+                    help="Published under corpus/shared-prefix/NAME/ (default: default)")
+    sp.add_argument("--prefixes", type=int, default=8, help="Distinct system/context prefixes (default: 8)")
+    sp.add_argument("--prefix-tokens", type=int, default=2000, help="Tokens per prefix (default: 2000)")
+    sp.add_argument("--zipf", type=float, default=1.0,
+                    help="Zipf skew of prefix popularity; 0 = uniform (default: 1.0)")
+    sp.add_argument("--turns", type=int, default=5, help="User turns per conversation (default: 5)")
+    sp.add_argument("--conversations", type=int, default=500, help="Conversations to generate (default: 500)")
+    sp.add_argument("--assistant-tokens", type=int, default=512,
+                    help="Assumed assistant reply length for hit-rate math (default: 512)")
+    sp.add_argument("--block-size", type=int, default=16,
+                    help="KV block size for hit-rate math (default: 16, vLLM)")
+    sp.add_argument("--seed", type=int, default=0, help="RNG seed (default: 0)")
+
+    tr = modes.add_parser("trace", help="Seeded arrival trace over the local corpus build")
+    tr.set_defaults(func=cmd_trace)
+    tr.add_argument("--name", default="default",
+                    help="Written to BUILD_DIR/corpus/traces/NAME.npy (default: default)")
+    tr.add_argument("--output", type=Path, default=None, help="Override the .npy path")
+    tr.add_argument("--process", choices=ARRIVAL_PROCESSES, default="poisson",
+                    help="Arrival process (default: poisson)")
+    tr.add_argument("--rps", type=float, default=2.0,
+                    help="Mean arrivals per second; a chat arrival starts a whole conversation (default: 2)")
+    tr.add_argument("--duration", type=float, default=300.0, help="Trace length in seconds (default: 300)")
+    tr.add_argument("--mix", type=parse_mix, default="a=1,b=1,c=1",
+                    help="Workload weights, a=chat b=summarization c=reasoning (default: a=1,b=1,c=1)")
+    tr.add_argument("--burstiness", type=float, default=2.0,
+                    help="gamma: coefficient of variation of inter-arrival gaps (default: 2.0)")
+    tr.add_argument("--period", type=float, default=3600.0,
+                    help="diurnal: seconds per rate cycle (default: 3600)")
+    tr.add_argument("--amplitude", type=float, default=0.5,
+                    help="diurnal: peak rate is rps * (1 + amplitude), 0 to 1 (default: 0.5)")
+    tr.add_argument("--assistant-tokens", type=int, default=512,
+                    help="Assumed assistant reply length when estimating chat follow-up input (default: 512)")
+    tr.add_argument("--seed", type=int, default=0, help="RNG seed (default: 0)")
+    tr.add_argument("--upload", action="store_true", help="Also publish to corpus/traces/")
+
+    args = parser.parse_args()
+    args.func(args)
+
+
 if __name__ == "__main__":
     main()
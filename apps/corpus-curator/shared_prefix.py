@@ -0,0 +1,148 @@
+"""Shared-prefix multi-turn chat corpora for KV-routing stress tests.
+
+Builds `n_prefixes` distinct system/context prefixes of an exact token length
+from the bundled chat passages, then samples conversations whose prefix is
+drawn from a Zipf(s) popularity distribution. Each conversation carries
+`turns` user messages.
+
+The metadata reports the theoretical maximum prefix-cache hit rate: the
+fraction of input tokens that an infinite, perfectly routed prefix cache
+could serve at the given KV block size. The first conversation on each prefix
+misses; later first turns reuse the prefix; follow-up turns reuse the prefix
+plus the whole conversation so far (with assistant replies assumed to be
+`assistant_tokens` long).
+"""
+
+import random
+
+from token_counter import TRIM_WINDOW_CHARS_PER_TOKEN, TokenCounter, trim_to_token_budget
+
+FIRST_TURN = "Using the reference context above, explain the key ideas it covers about {topic}."
+
+FOLLOW_UPS = [
+    "Can you go deeper on the most important point you just made?",
+    "What are the main trade-offs involved here?",
+    "How would this work in a production system at scale?",
+    "Can you give a concrete example?",
+    "What are common misconceptions about this?",
+    "How does this compare to the alternatives?",
+    "What would you measure to know whether this is working?",
+    "Summarize the discussion so far in three bullet points.",
+]
+
+
+def zipf_weights(n: int, s: float) -> list[float]:
+    """Popularity of rank 1..n under Zipf(s); s=0 is uniform."""
+    raw = [1.0 / (rank ** s) for rank in range(1, n + 1)]
+    total = sum(raw)
+    return [w / total for w in raw]
+
+
+def build_prefixes(passages: list[dict], n_prefixes: int, prefix_tokens: int,
+                   counter: TokenCounter, rng: random.Random) -> list[dict]:
+    """Distinct context prefixes, each trimmed to at most prefix_tokens.
+
+    The prefix id leads the text so no two prefixes share a cacheable block.
+    """
+    texts = []
+    for i in range(n_prefixes):
+        order = passages[:]
+        rng.shuffle(order)
+        body = "\n\n".join(p["text"] for p in order)
+        # Repeat the passages if one pass is shorter than the requested prefix
+        while counter.count(body) < prefix_tokens and len(body) < prefix_tokens * 64:
+            body = body + "\n\n" + body
+        text = f"Reference context #{i + 1:03d} (topics: {order[0]['topic']}, {order[1]['topic']}):\n\n{body}"
+        texts.append(text[:prefix_tokens * TRIM_WINDOW_CHARS_PER_TOKEN])
+
+    trimmed = [trim_to_token_budget(t, prefix_tokens, ends)
+               for t, ends in zip(texts, counter.token_ends_batch(texts))]
+    return [
+        {"id": f"prefix-{i + 1:03d}", "text": text, "token_count": count}
+        for i, (text, count) in enumerate(zip(trimmed, counter.count_batch(trimmed)))
+    ]
+
+
+def build_conversations(prefixes: list[dict], passages: list[dict], n_conversations: int,
+                        turns: int, zipf_s: float, counter: TokenCounter,
+                        rng: random.Random) -> list[dict]:
+    weights = zipf_weights(len(prefixes), zipf_s)
+    # Popularity rank is independent of prefix id
+    ranked = prefixes[:]
+    rng.shuffle(ranked)
+
+    conversations = []
+    for c in range(n_conversations):
+        prefix = rng.choices(ranked, weights=weights)[0]
+        topic = rng.choice(passages)["topic"]
+        messages = [FIRST_TURN.format(topic=topic)] + [rng.choice(FOLLOW_UPS) for _ in range(turns - 1)]
+        conversations.append({
+            "id": f"sp-{c + 1:05d}",
+            "prefix_id": prefix["id"],
+            "turns": messages,
+            "prefix_token_count": prefix["token_count"],
+        })
+
+    distinct = sorted({m for conv in conversations for m in conv["turns"]})
+    counts = dict(zip(distinct, counter.count_batch(distinct)))
+    for conv in conversations:
+        conv["turn_token_counts"] = [counts[m] for m in conv["turns"]]
+        conv["token_count"] = conv["prefix_token_count"] + sum(conv["turn_token_counts"])
+    return conversations
+
+
+def max_prefix_hit_rate(conversations: list[dict], assistant_tokens: int, block_size: int) -> dict:
+    """Cacheable vs total input tokens with an infinite cache and perfect routing."""
+    seen = set()
+    total = 0
+    cached = 0
+    cross = 0
+    for conv in conversations:
+        context = conv["prefix_token_count"]
+        for j, user_tokens in enumerate(conv["turn_token_counts"]):
+            if j == 0:
+                reusable = context if conv["prefix_id"] in seen else 0
+                cross += (reusable // block_size) * block_size
+            else:
+                context += assistant_tokens
+                reusable = context
+            cached += (reusable // block_size) * block_size
+            context += user_tokens
+            total += context
+        seen.add(conv["prefix_id"])
+    return {
+        "input_tokens": total,
+        "cacheable_tokens": cached,
+        "theoretical_max_hit_rate": round(cached / total, 4) if total else 0.0,
+        "cross_conversation_hit_rate": round(cross / total, 4) if total else 0.0,
+    }
+
+
+def build_shared_prefix_corpus(passages: list[dict], counter: TokenCounter, n_prefixes: int,
+                               prefix_tokens: int, zipf_s: float, turns: int, n_conversations: int,
+                               assistant_tokens: int, block_size: int, seed: int):
+    """Return (prefix records, conversation records, metadata)."""
+    rng = random.Random(seed)
+    prefixes = build_prefixes(passages, n_prefixes, prefix_tokens, counter, rng)
+    conversations = build_conversations(prefixes, passages, n_conversations, turns, zipf_s, counter, rng)
+
+    popularity = {p["id"]: 0 for p in prefixes}
+    for conv in conversations:
+        popularity[conv["prefix_id"]] += 1
+
+    metadata = {
+        "params": {
+            "prefixes": n_prefixes,
+            "prefix_tokens": prefix_tokens,
+            "zipf_s": zipf_s,
+            "turns": turns,
+            "conversations": n_conversations,
+            "assistant_tokens": assistant_tokens,
+            "block_size": block_size,
+            "seed": seed,
+        },
+        "token_counter": counter.name,
+        "prefix_popularity": popularity,
+        **max_prefix_hit_rate(conversations, assistant_tokens, block_size),
+    }
+    return prefixes, conversations, metadata
@@ -0,0 +1,214 @@
+"""Object-store backends for the corpus curator.
+
+Every publish path (shards, .idx sidecars, manifests, sentinel, metadata)
+goes through an ObjectStore, so the same code can target:
+
+    S3Store      a Spaces/S3 bucket via boto3 (what the cluster reads from)
+    LocalStore   a directory tree laid out by key, e.g. to pre-stage the
+                 corpus onto the model NFS PVC or to run offline
+    MemoryStore  an in-process dict, for profiling build time and memory
+                 without credentials or disk I/O
+
+Object metadata (content type/encoding, user metadata) is kept alongside the
+bytes: S3 stores it natively, LocalStore in a JSON sidecar under
+ROOT/.meta/KEY.json so that ROOT itself mirrors the bucket layout.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+class ObjectStore:
+    """Base class: put/get/head/list over string keys."""
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def put_stream(self, key: str, fileobj, content_type: str, content_encoding: str | None = None,
+                   metadata: dict[str, str] | None = None):
+        """Store everything readable from fileobj under key."""
+        raise NotImplementedError
+
+    def put_bytes(self, key: str, body: bytes, content_type: str, content_encoding: str | None = None,
+                  metadata: dict[str, str] | None = None):
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: Path, content_type: str):
+        with open(path, "rb") as f:
+            self.put_stream(key, f, content_type)
+
+    def get_bytes(self, key: str) -> bytes | None:
+        """Object body, or None if the key does not exist."""
+        raise NotImplementedError
+
+    def head(self, key: str) -> dict | None:
+        """{size, content_type, content_encoding, metadata}, or None if the key does not exist."""
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> list[str]:
+        """Keys under prefix, sorted."""
+        raise NotImplementedError
+
+
+def _head_record(size: int, content_type: str, content_encoding: str | None, metadata: dict | None) -> dict:
+    return {
+        "size": size,
+        "content_type": content_type,
+        "content_encoding": content_encoding,
+        "metadata": dict(metadata or {}),
+    }
+
+
+class S3Store(ObjectStore):
+    def __init__(self, client, bucket: str, transfer_config=None):
+        self.client = client
+        self.bucket = bucket
+        self.transfer_config = transfer_config
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    @staticmethod
+    def _extra_args(content_type, content_encoding, metadata) -> dict:
+        extra = {"ContentType": content_type}
+        if content_encoding:
+            extra["ContentEncoding"] = content_encoding
+        if metadata:
+            extra["Metadata"] = metadata
+        return extra
+
+    def put_stream(self, key, fileobj, content_type, content_encoding=None, metadata=None):
+        self.client.upload_fileobj(fileobj, self.bucket, key,
+                                   ExtraArgs=self._extra_args(content_type, content_encoding, metadata),
+                                   Config=self.transfer_config)
+
+    def put_bytes(self, key, body, content_type, content_encoding=None, metadata=None):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body,
+                               **self._extra_args(content_type, content_encoding, metadata))
+
+    def put_file(self, key, path, content_type):
+        self.client.upload_file(str(path), self.bucket, key, ExtraArgs={"ContentType": content_type},
+                                Config=self.transfer_config)
+
+    def get_bytes(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def head(self, key):
+        try:
+            resp = self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return _head_record(resp["ContentLength"], resp.get("ContentType"), resp.get("ContentEncoding"),
+                            resp.get("Metadata"))
+
+    def list(self, prefix=""):
+        keys = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(obj["Key"] for obj in page.get("Contents", []))
+        return sorted(keys)
+
+
+class LocalStore(ObjectStore):
+    """Objects as files under root; writes are atomic (temp file + rename)."""
+
+    META_DIR = ".meta"
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+
+    def url(self, key):
+        return str(self._path(key))
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"key {key!r} escapes {self.root}")
+        return path
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / self.META_DIR / f"{key}.json"
+
+    def _write(self, path: Path, write):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def put_stream(self, key, fileobj, content_type, content_encoding=None, metadata=None):
+        path = self._path(key)
+        self._write(path, lambda f: shutil.copyfileobj(fileobj, f, 1 << 20))
+        record = _head_record(path.stat().st_size, content_type, content_encoding, metadata)
+        self._write(self._meta_path(key), lambda f: f.write(json.dumps(record).encode("utf-8")))
+
+    def put_bytes(self, key, body, content_type, content_encoding=None, metadata=None):
+        self.put_stream(key, io.BytesIO(body), content_type, content_encoding, metadata)
+
+    def get_bytes(self, key):
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def head(self, key):
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        try:
+            return json.loads(self._meta_path(key).read_text())
+        except (FileNotFoundError, ValueError):
+            # Placed by hand (e.g. copied onto the PVC): describe what we can
+            return _head_record(path.stat().st_size, "application/octet-stream", None, None)
+
+    def list(self, prefix=""):
+        if not self.root.is_dir():
+            return []
+        keys = []
+        for path in self.root.rglob("*"):
+            rel = path.relative_to(self.root).as_posix()
+            if path.is_file() and rel.startswith(prefix) and not rel.startswith(f"{self.META_DIR}/"):
+                keys.append(rel)
+        return sorted(keys)
+
+
+class MemoryStore(ObjectStore):
+    """In-process stand-in for a bucket; contents last as long as the object."""
+
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, dict]] = {}
+
+    def url(self, key):
+        return f"memory://{key}"
+
+    def put_stream(self, key, fileobj, content_type, content_encoding=None, metadata=None):
+        chunks = []
+        while chunk := fileobj.read(1 << 20):
+            chunks.append(chunk)
+        self.put_bytes(key, b"".join(chunks), content_type, content_encoding, metadata)
+
+    def put_bytes(self, key, body, content_type, content_encoding=None, metadata=None):
+        self.objects[key] = (bytes(body), _head_record(len(body), content_type, content_encoding, metadata))
+
+    def get_bytes(self, key):
+        obj = self.objects.get(key)
+        return obj[0] if obj else None
+
+    def head(self, key):
+        obj = self.objects.get(key)
+        return dict(obj[1]) if obj else None
+
+    def list(self, prefix=""):
+        return sorted(k for k in self.objects if k.startswith(prefix))
@@ -0,0 +1,229 @@
+"""Token counting backends for the corpus curator.
+
+HeuristicCounter reproduces the original ~1.3 tokens/word estimate and needs
+no extra dependencies. TokenizerCounter loads a local HuggingFace
+tokenizer.json (e.g. the Llama 3 tokenizer), encodes in batches across a
+process pool, and memoizes counts by content hash in a SQLite cache so that
+re-curation only encodes text that changed.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+# When trimming, only the head of a text is encoded; no English prose
+# averages anywhere near this many characters per token.
+TRIM_WINDOW_CHARS_PER_TOKEN = 16
+
+# Sentence end: terminal punctuation plus closing quotes/brackets, followed by whitespace or EOF
+SENTENCE_END = re.compile(r"[.!?][\"'\u201d\u2019)\]]*(?=\s|$)")
+
+
+def content_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def trim_to_token_budget(text: str, budget: int, token_ends: list[int]) -> str:
+    """Largest sentence-aligned prefix of text holding at most budget tokens.
+
+    token_ends are the cumulative token end offsets for text (computed once);
+    the prefix ending at a sentence boundary b holds bisect_right(token_ends, b)
+    tokens, which is monotonic in b, so the best boundary is a binary search.
+    """
+    if len(token_ends) <= budget:
+        return text
+    boundaries = [m.end() for m in SENTENCE_END.finditer(text)]
+    n = bisect_right(boundaries, budget, key=lambda b: bisect_right(token_ends, b))
+    if n == 0:
+        # No sentence fits (e.g. verse without punctuation): cut on a token boundary
+        return text[:token_ends[budget - 1]].rstrip()
+    return text[:boundaries[n - 1]]
+
+
+class TokenCounter:
+    """Base class: subclasses implement count_batch()."""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        raise NotImplementedError
+
+    def token_ends_batch(self, texts: list[str]) -> list[list[int]]:
+        """Character offset at which each token ends, in token order.
+
+        The number of tokens inside text[:pos] is bisect_right(ends, pos),
+        which lets callers size any prefix without re-encoding it.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+_WORD = re.compile(r"\S+")
+
+
+class HeuristicCounter(TokenCounter):
+    """Rough token estimate: ~1.3 tokens per whitespace-delimited word."""
+
+    name = "heuristic-1.3"
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        return [int(len(t.split()) * 1.3) for t in texts]
+
+    def token_ends_batch(self, texts: list[str]) -> list[list[int]]:
+        batch = []
+        for text in texts:
+            # Spread tokens over word ends so that a prefix of n words holds int(n * 1.3)
+            ends = []
+            for n, m in enumerate(_WORD.finditer(text), start=1):
+                ends.extend([m.end()] * (int(n * 1.3) - len(ends)))
+            batch.append(ends)
+        return batch
+
+
+class TokenCache:
+    """Persistent (tokenizer, content sha256) -> token count store."""
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_counts ("
+            " tokenizer TEXT NOT NULL, digest TEXT NOT NULL, count INTEGER NOT NULL,"
+            " PRIMARY KEY (tokenizer, digest))"
+        )
+
+    def get_many(self, tokenizer: str, digests: list[str]) -> dict[str, int]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT digest, count FROM token_counts WHERE tokenizer = ? AND digest IN ({placeholders})",
+                [tokenizer, *chunk],
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, tokenizer: str, counts: dict[str, int]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO token_counts (tokenizer, digest, count) VALUES (?, ?, ?)",
+                [(tokenizer, d, c) for d, c in counts.items()],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+# Per-process tokenizer, loaded once by the pool initializer
+_worker_tokenizer = None
+
+
+def _load_tokenizer(path: str):
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        raise RuntimeError("tokenizers library required for --tokenizer. Install with: pip install tokenizers")
+    return Tokenizer.from_file(path)
+
+
+def _init_worker(path: str):
+    global _worker_tokenizer
+    _worker_tokenizer = _load_tokenizer(path)
+
+
+def _encode_lengths(texts: list[str]) -> list[int]:
+    encodings = _worker_tokenizer.encode_batch(texts, add_special_tokens=False)
+    return [len(e.ids) for e in encodings]
+
+
+def _token_ends(encoding) -> list[int]:
+    ends = []
+    last = 0
+    for _, end in encoding.offsets:
+        # Byte-level merges can report overlapping offsets; keep ends monotonic
+        last = max(last, end)
+        ends.append(last)
+    return ends
+
+
+def _encode_ends(texts: list[str]) -> list[list[int]]:
+    encodings = _worker_tokenizer.encode_batch(texts, add_special_tokens=False)
+    return [_token_ends(e) for e in encodings]
+
+
+class TokenizerCounter(TokenCounter):
+    """Exact counts from a local tokenizer.json, batched across processes.
+
+    Counts exclude special tokens (BOS, chat template markers) so they
+    describe the content itself; the serving stack adds its own framing.
+    """
+
+    def __init__(self, tokenizer_path: Path, workers: int | None = None,
+                 batch_size: int = 32, cache: TokenCache | None = None):
+        self.tokenizer_path = str(Path(tokenizer_path).resolve())
+        fingerprint = hashlib.sha256(Path(self.tokenizer_path).read_bytes()).hexdigest()[:16]
+        self.name = f"tokenizer:{fingerprint}"
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.cache = cache
+        self._pool = None
+
+    def _run_batched(self, texts: list[str], worker_fn, batch_size: int) -> list:
+        """Apply worker_fn to batches of texts, in-process or on the process pool."""
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if self.workers <= 1 or len(batches) == 1:
+            global _worker_tokenizer
+            if _worker_tokenizer is None:
+                _worker_tokenizer = _load_tokenizer(self.tokenizer_path)
+            return worker_fn(texts)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.tokenizer_path,)
+            )
+        results = []
+        for batch_results in self._pool.map(worker_fn, batches):
+            results.extend(batch_results)
+        return results
+
+    def token_ends_batch(self, texts: list[str]) -> list[list[int]]:
+        # Offsets are only needed for a handful of long documents: one per task
+        return self._run_batched(texts, _encode_ends, batch_size=1)
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        digests = [content_digest(t) for t in texts]
+        known = self.cache.get_many(self.name, digests) if self.cache else {}
+
+        # Encode each distinct uncached text once
+        missing = {}
+        for digest, text in zip(digests, texts):
+            if digest not in known and digest not in missing:
+                missing[digest] = text
+        if missing:
+            counts = self._run_batched(list(missing.values()), _encode_lengths, self.batch_size)
+            fresh = dict(zip(missing.keys(), counts))
+            if self.cache:
+                self.cache.put_many(self.name, fresh)
+            known.update(fresh)
+
+        return [known[d] for d in digests]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.cache:
+            self.cache.close()
@@ -0,0 +1,185 @@
+"""Seeded, replayable arrival traces built from the curated corpus.
+
+A trace is a NumPy structured array (saved as .npy) with one row per request:
+
+    arrival_s          offset from trace start in seconds
+    workload           0 = chat (a), 1 = summarization (b), 2 = reasoning (c)
+    shard, item        corpus item: row `item` of metadata["shards"][shard]
+    turn               turn index within a chat conversation (0 otherwise)
+    input_tokens       prompt tokens (chat follow-ups are estimated)
+    max_output_tokens  max_tokens the load generator sends for this request
+
+Chat conversations expand into one row per turn sharing the conversation's
+arrival time; a replayer issues turn N+1 when turn N completes, as the load
+generator does. A JSON sidecar records the seed, arrival process and the
+sha256 of every shard the trace indexes into, so the same trace can be
+replayed against the same corpus.
+
+Arrival processes:
+    poisson   exponential inter-arrivals at --rps
+    gamma     gamma inter-arrivals with mean 1/rps and coefficient of
+              variation --burstiness (1 = Poisson, >1 = bursty)
+    diurnal   Poisson with rate rps * (1 + amplitude * sin(2*pi*t / period)),
+              sampled by thinning
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from corpus_index import CorpusShard
+
+TRACE_DTYPE = np.dtype([
+    ("arrival_s", "<f8"),
+    ("workload", "u1"),
+    ("shard", "u1"),
+    ("turn", "u1"),
+    ("item", "<u4"),
+    ("input_tokens", "<u4"),
+    ("max_output_tokens", "<u4"),
+])
+
+WORKLOADS = {"a": 0, "b": 1, "c": 2}
+ARRIVAL_PROCESSES = ("poisson", "gamma", "diurnal")
+
+# Shards each workload samples from (keys relative to the build dir)
+WORKLOAD_SHARDS = {
+    "a": ["corpus/chat/passages.jsonl"],
+    "b": [f"corpus/summarization/{b}/docs.jsonl" for b in ("short", "medium", "long")],
+    "c": ["corpus/reasoning/prompts.jsonl"],
+}
+
+# Mirrors the load generator's runners
+CHAT_TURNS = 5
+CHAT_MAX_TOKENS = 1024
+SUMMARIZATION_MAX_TOKENS = 200
+# System prompt + instruction wrapped around the corpus text
+PROMPT_OVERHEAD_TOKENS = 40
+FOLLOW_UP_TOKENS = 20
+
+
+def arrival_times(process: str, rps: float, duration_s: float, rng: np.random.Generator,
+                  burstiness: float = 2.0, period_s: float = 3600.0, amplitude: float = 0.5) -> np.ndarray:
+    """Sorted arrival offsets in [0, duration_s) for the named process."""
+    if process == "poisson":
+        draw = lambda n: rng.exponential(1.0 / rps, n)
+    elif process == "gamma":
+        shape = 1.0 / burstiness ** 2
+        draw = lambda n: rng.gamma(shape, 1.0 / (rps * shape), n)
+    elif process == "diurnal":
+        # Candidates at the peak rate, thinned below
+        draw = lambda n: rng.exponential(1.0 / (rps * (1 + amplitude)), n)
+    else:
+        raise ValueError(f"unknown arrival process {process!r}")
+
+    chunks = []
+    last = 0.0
+    chunk = int(rps * duration_s * (1 + amplitude)) + 64
+    while last < duration_s:
+        times = last + np.cumsum(draw(chunk))
+        chunks.append(times)
+        last = times[-1]
+    times = np.concatenate(chunks)
+    times = times[times < duration_s]
+
+    if process == "diurnal":
+        rate = 1 + amplitude * np.sin(2 * np.pi * times / period_s)
+        times = times[rng.random(times.size) * (1 + amplitude) < rate]
+    return times
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_trace(build_dir: Path, mix: dict[str, float], process: str, rps: float, duration_s: float,
+                seed: int, burstiness: float = 2.0, period_s: float = 3600.0, amplitude: float = 0.5,
+                assistant_tokens: int = 512) -> tuple[np.ndarray, dict]:
+    """Return (trace rows, metadata) sampled from the shards under build_dir."""
+    rng = np.random.default_rng(seed)
+    active = {w: weight for w, weight in mix.items() if weight > 0}
+    if not active:
+        raise ValueError("workload mix has no positive weights")
+
+    # Load per-shard token counts and output lengths from the indexes (and
+    # expected_output_length for reasoning prompts, which needs the record).
+    shard_keys = []
+    pools = {}
+    for w in active:
+        items = []
+        for key in WORKLOAD_SHARDS[w]:
+            path = Path(build_dir) / key
+            if not path.exists():
+                continue
+            shard_id = len(shard_keys)
+            shard_keys.append(key)
+            with CorpusShard(path) as shard:
+                for i, e in enumerate(shard.entries()):
+                    if w == "c":
+                        max_out = shard.get(i).get("expected_output_length") or CHAT_MAX_TOKENS
+                    elif w == "b":
+                        max_out = SUMMARIZATION_MAX_TOKENS
+                    else:
+                        max_out = CHAT_MAX_TOKENS
+                    items.append((shard_id, i, e.token_count, max_out))
+        if not items:
+            raise FileNotFoundError(f"no shards for workload {w!r} under {build_dir}; run the publish mode first")
+        pools[w] = np.array(items, dtype=np.int64)
+
+    times = arrival_times(process, rps, duration_s, rng, burstiness, period_s, amplitude)
+    names = list(active)
+    weights = np.array([active[w] for w in names], dtype=float)
+    choice = rng.choice(len(names), size=times.size, p=weights / weights.sum())
+
+    rows = []
+    for t, c in zip(times, choice):
+        w = names[c]
+        shard_id, item, tokens, max_out = pools[w][rng.integers(len(pools[w]))]
+        base = int(tokens) + PROMPT_OVERHEAD_TOKENS
+        turns = CHAT_TURNS if w == "a" else 1
+        for turn in range(turns):
+            input_tokens = base + turn * (assistant_tokens + FOLLOW_UP_TOKENS)
+            rows.append((t, WORKLOADS[w], shard_id, turn, item, input_tokens, max_out))
+    trace = np.array(rows, dtype=TRACE_DTYPE)
+
+    metadata = {
+        "version": 1,
+        "seed": seed,
+        "process": process,
+        "rps": rps,
+        "duration_s": duration_s,
+        "burstiness": burstiness if process == "gamma" else None,
+        "period_s": period_s if process == "diurnal" else None,
+        "amplitude": amplitude if process == "diurnal" else None,
+        "mix": active,
+        "assistant_tokens": assistant_tokens,
+        "workloads": WORKLOADS,
+        "shards": [{"key": k, "sha256": _file_sha256(Path(build_dir) / k)} for k in shard_keys],
+        "requests": int(times.size),
+        "rows": int(trace.size),
+        "dtype": [list(f) for f in TRACE_DTYPE.descr],
+    }
+    return trace, metadata
+
+
+def save_trace(path: Path, trace: np.ndarray, metadata: dict) -> Path:
+    """Write trace.npy plus trace.json; return the metadata path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, trace, allow_pickle=False)
+    meta_path = path.with_suffix(".json")
+    meta_path.write_text(json.dumps(metadata, indent=2))
+    return meta_path
+
+
+def load_trace(path: Path, mmap: bool = True) -> tuple[np.ndarray, dict]:
+    path = Path(path)
+    trace = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    metadata = json.loads(path.with_suffix(".json").read_text())
+    return trace, metadata
@@ -1,4 +1,5 @@
 import { S3Client, GetObjectCommand } from '@aws-sdk/client-s3';
+import { gunzipSync } from 'node:zlib';
 import type { AppConfig } from './config.js';
 import type { SummarizationDoc, ReasoningPrompt, ChatPassage } from './types.js';
 
@@ -11,8 +12,12 @@ export interface Corpus {
 async function fetchJsonl<T>(s3: S3Client, bucket: string, key: string): Promise<T[]> {
   const cmd = new GetObjectCommand({ Bucket: bucket, Key: key });
   const resp = await s3.send(cmd);
-  const body = await resp.Body?.transformToString('utf-8');
-  if (!body) return [];
+  const bytes = await resp.Body?.transformToByteArray();
+  if (!bytes) return [];
+  // The curator uploads gzip-compressed JSONL with Content-Encoding: gzip
+  const body = resp.ContentEncoding === 'gzip'
+    ? gunzipSync(bytes).toString('utf-8')
+    : Buffer.from(bytes).toString('utf-8');
   return body
     .split('\n')
     .filter((line) => line.trim().length > 0)
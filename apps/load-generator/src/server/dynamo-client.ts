@@ -35,6 +35,7 @@ async function streamRequest(
         messages: req.messages,
         max_tokens: req.maxTokens,
         stream: true,
+        stream_options: { include_usage: true },
       }),
       signal: controller.signal,
     });
@@ -54,6 +55,8 @@ async function streamRequest(
     let firstTokenTime: number | null = null;
     const tokenTimes: number[] = [];
     let outputTokens = 0;
+    let inputTokens: number | undefined;
+    let cachedTokens: number | undefined;
     let buffer = '';
     const textParts: string[] = [];
 
@@ -78,6 +81,13 @@ async function streamRequest(
           continue;
         }
 
+        // With include_usage the last chunk has empty choices and the token usage
+        const usage = parsed?.usage;
+        if (usage) {
+          inputTokens = usage.prompt_tokens ?? inputTokens;
+          cachedTokens = usage.prompt_tokens_details?.cached_tokens ?? cachedTokens;
+        }
+
         const delta = parsed?.choices?.[0]?.delta;
         if (!delta?.content) continue;
 
@@ -121,6 +131,8 @@ async function streamRequest(
         tpotMs: outputTokens > 1 ? (latencyMs - ttftMs) / (outputTokens - 1) : 0,
         latencyMs,
         outputTokens,
+        inputTokens,
+        cachedTokens,
         completedAt: Date.now(),
         itemId: req.itemId,
       },
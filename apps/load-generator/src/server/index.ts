@@ -121,6 +121,7 @@ app.get('/api/status', (_req, res) => {
     running: scheduler?.running ?? false,
     config: scheduler?.currentConfig ?? null,
     uptimeMs: startTime ? Date.now() - startTime : 0,
+    activeRequests: scheduler?.activeRequests ?? 0,
     corpus: corpusCounts,
     metrics: scheduler?.running ? metrics.getAggregate() : null,
   };
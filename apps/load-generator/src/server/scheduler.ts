@@ -43,6 +43,10 @@ export class Scheduler {
     return this.timer !== null;
   }
 
+  get activeRequests(): number {
+    return this.activeConcurrency;
+  }
+
   get currentConfig(): WorkloadConfig {
     return { ...this.config };
   }
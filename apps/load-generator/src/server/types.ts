@@ -63,6 +63,10 @@ export interface RequestMetrics {
   latencyMs: number;
   /** Number of generated tokens */
   outputTokens: number;
+  /** Prompt tokens, from the usage chunk (absent if the server sent none) */
+  inputTokens?: number;
+  /** Prompt tokens served from the prefix cache (usage.prompt_tokens_details) */
+  cachedTokens?: number;
   /** Timestamp when the request completed */
   completedAt: number;
   /** Error message if status is 'error' */
@@ -140,6 +144,7 @@ export interface ServerStatus {
   running: boolean;
   config: WorkloadConfig | null;
   uptimeMs: number;
+  activeRequests: number;
   corpus: {
     chatPassages: number;
     summarizationDocs: number;
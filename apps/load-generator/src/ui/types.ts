@@ -18,6 +18,8 @@ export interface RequestMetrics {
   tpotMs: number;
   latencyMs: number;
   outputTokens: number;
+  inputTokens?: number;
+  cachedTokens?: number;
   completedAt: number;
   error?: string;
   itemId?: string;
@@ -76,6 +78,7 @@ export interface ServerStatus {
   running: boolean;
   config: WorkloadConfig | null;
   uptimeMs: number;
+  activeRequests: number;
   corpus: {
     chatPassages: number;
     summarizationDocs: number;
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Backfill 'tops' (output tokens/s) column into benchmark sweep TSVs.
 
-Queries Prometheus range API for dynamo_frontend_output_tokens_total rate
-during each row's measurement window. Adds a 'tops' column between
-'actual_rps' and 'measure_start_utc'.
+Averages the dynamo_frontend_output_tokens_total rate over each row's
+measurement window. Adds a 'tops' column between 'actual_rps' and
+'measure_start_utc'. This is the 'tops' metric of backfill_metrics.py
+(batched range fetches, on-disk cache, vectorized slicing) plus the
+averaged summary; use that script for other columns. Requires numpy.
 
 Usage:
     python3 scripts/backfill-tops.py [--prom-url URL] [--update-averaged] TSV [TSV ...]
@@ -14,124 +16,26 @@ import csv
 import math
 import os
 import sys
-import time
-import urllib.parse
-import urllib.request
-import json
 from collections import defaultdict
+from pathlib import Path
+
+from backfill_metrics import CACHE_DIR, backfill, load_spec
+from prom_client import open_prom
 
 
 def parse_args():
     p = argparse.ArgumentParser(description="Backfill TOPS into benchmark TSVs")
     p.add_argument("tsv_files", nargs="+", help="TSV file paths to backfill")
     p.add_argument("--prom-url", default="http://localhost:9090",
-                   help="Prometheus base URL (default: http://localhost:9090)")
+                   help="Prometheus base URL or prom_archive.py archive(s) (default: http://localhost:9090)")
     p.add_argument("--update-averaged", action="store_true",
                    help="Also regenerate dev/benchmark-sweep-averaged.tsv")
+    p.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                   help=f"Where fetched series chunks are cached (default: {CACHE_DIR})")
+    p.add_argument("--no-cache", action="store_true", help="Neither read nor write the on-disk cache")
     return p.parse_args()
 
 
-def prom_range_query(base_url: str, query: str, start: str, end: str, step: str = "60") -> float | None:
-    """Query Prometheus range API, return average of all values."""
-    params = urllib.parse.urlencode({
-        "query": query,
-        "start": start,
-        "end": end,
-        "step": step,
-    })
-    url = f"{base_url}/api/v1/query_range?{params}"
-
-    try:
-        with urllib.request.urlopen(url, timeout=10) as resp:
-            data = json.loads(resp.read())
-    except Exception as e:
-        print(f"  WARN: Prometheus query failed: {e}", file=sys.stderr)
-        return None
-
-    if data.get("status") != "success":
-        return None
-
-    results = data.get("data", {}).get("result", [])
-    if not results:
-        return None
-
-    values = []
-    for series in results:
-        for _, val_str in series.get("values", []):
-            try:
-                v = float(val_str)
-                if not (math.isnan(v) or math.isinf(v)):
-                    values.append(v)
-            except (ValueError, TypeError):
-                pass
-
-    if not values:
-        return None
-
-    return sum(values) / len(values)
-
-
-def backfill_tsv(path: str, prom_url: str) -> list[dict]:
-    """Read TSV, query Prometheus for each row, add tops column, write back."""
-    with open(path, newline="") as f:
-        reader = csv.DictReader(f, delimiter="\t")
-        fieldnames = reader.fieldnames
-        rows = list(reader)
-
-    if not rows:
-        print(f"  WARN: {path} is empty", file=sys.stderr)
-        return rows
-
-    # Check if tops already exists
-    has_tops = "tops" in fieldnames
-
-    query = 'sum(rate(dynamo_frontend_output_tokens_total{dynamo_namespace="dynamo-workload-gtc-demo"}[1m]))'
-
-    for i, row in enumerate(rows):
-        start = row.get("measure_start_utc", "")
-        end = row.get("measure_end_utc", "")
-
-        if not start or not end:
-            row["tops"] = "NaN"
-            continue
-
-        if has_tops and row.get("tops", "NaN") != "NaN":
-            # Already has a value, skip
-            print(f"  Row {i+1}: tops already set ({row['tops']}), skipping")
-            continue
-
-        print(f"  Row {i+1}/{len(rows)}: {row['mode']} conc={row['concurrency']} [{start} → {end}]")
-        tops = prom_range_query(prom_url, query, start, end)
-
-        if tops is not None:
-            row["tops"] = f"{tops:.6f}"
-            print(f"    → {tops:.2f} tok/s")
-        else:
-            row["tops"] = "NaN"
-            print(f"    → NaN (no data)")
-
-        time.sleep(0.2)
-
-    # Build output fieldnames: insert tops between actual_rps and measure_start_utc
-    if not has_tops:
-        new_fieldnames = []
-        for fn in fieldnames:
-            new_fieldnames.append(fn)
-            if fn == "actual_rps":
-                new_fieldnames.append("tops")
-        fieldnames = new_fieldnames
-
-    # Write back
-    with open(path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t",
-                                lineterminator="\n")
-        writer.writeheader()
-        writer.writerows(rows)
-
-    print(f"  Written: {path} ({len(fieldnames)} columns)")
-    return rows
-
-
 def generate_averaged(all_rows: list[dict], output_path: str):
     """Group by (mode, concurrency), average all numeric columns, write TSV."""
     groups = defaultdict(list)
@@ -175,11 +79,15 @@ def generate_averaged(all_rows: list[dict], output_path: str):
 def main():
     args = parse_args()
 
-    all_rows = []
-    for path in args.tsv_files:
-        print(f"\nBackfilling: {path}")
-        rows = backfill_tsv(path, args.prom_url)
-        all_rows.extend(rows)
+    try:
+        import numpy as np  # noqa: F401  (used by backfill_metrics)
+    except ImportError:
+        print("ERROR: numpy required. Install with: pip install numpy")
+        sys.exit(1)
+
+    print(f"Backfilling: {', '.join(args.tsv_files)}")
+    all_rows = backfill(args.tsv_files, load_spec(names=["tops"]), open_prom(args.prom_url),
+                        None if args.no_cache else args.cache_dir, verbose=True)
 
     if args.update_averaged:
         # Determine output dir from first TSV file
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""Backfill Prometheus-derived columns into historical benchmark sweep TSVs.
+
+A spec is a JSON list of named metrics, each a PromQL expression and how to
+aggregate its samples over a row's measure_start_utc..measure_end_utc window:
+
+    [
+      {"name": "gpu_util_pct", "query": "avg(DCGM_FI_DEV_GPU_UTIL{...})", "agg": "mean"},
+      {"name": "queue_depth_p95", "query": "sum(dynamo_frontend_queued_requests{...})", "agg": "p95",
+       "after": "actual_rps"}
+    ]
+
+Keys: name (the TSV column), query, agg (mean, max, min, p50, p95, p99 or
+last; default mean), after (column a new column is inserted after; default
+just before measure_start_utc) and step (sample resolution in seconds;
+default 15). Without --spec the built-in DEFAULT_SPEC is used; --print-spec
+dumps it as a starting point.
+
+Every file is read first, and each metric is then fetched once for all of
+them. The windows are mapped onto epoch-aligned one-hour chunks. Each
+contiguous run of missing chunks costs one query_range, and all runs of
+all metrics are fetched concurrently through prom_client. Settled chunks
+are cached on disk as .npz, so a re-run over the same files makes no
+Prometheus calls. Rows are then aggregated locally. Missing columns are
+added; cells that are empty or NaN are filled, and --refresh recomputes
+every cell. --prom-url may also name prom_archive.py archives, which
+lets old runs be backfilled after the cluster is gone.
+
+Usage:
+    python3 scripts/backfill_metrics.py [--spec FILE] [--metrics a,b] [--refresh] TSV [TSV ...]
+
+Requires numpy.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from prom_client import PromClient, open_prom
+
+PROM_URL = "http://localhost:9090"
+START_COL = "measure_start_utc"
+END_COL = "measure_end_utc"
+STEP_SEC = 15
+# Cache granularity; chunks are aligned to multiples of this since the epoch
+CHUNK_SEC = 3600
+# Prometheus rejects ranges over 11,000 points per series
+MAX_POINTS = 10000
+# Chunks ending less than this long ago may still change: never cache them
+SETTLE_SEC = 300
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "gtc-backfill-metrics"
+AGGREGATIONS = ("mean", "max", "min", "p50", "p95", "p99", "last")
+
+FRONTEND_NS = 'dynamo_namespace="dynamo-workload-gtc-demo"'
+COMPONENT_NS = 'dynamo_namespace="dynamo_workload_gtc_demo"'
+WORKER_NS = 'namespace="dynamo-workload"'
+GPU_NS = 'exported_namespace="dynamo-workload"'
+
+DEFAULT_SPEC = [
+    {"name": "tops", "after": "actual_rps", "agg": "mean",
+     "query": f"sum(rate(dynamo_frontend_output_tokens_total{{{FRONTEND_NS}}}[1m]))"},
+    {"name": "gpu_util_pct", "agg": "mean", "query": f"avg(DCGM_FI_DEV_GPU_UTIL{{{GPU_NS}}})"},
+    {"name": "gpu_util_max_pct", "agg": "max", "query": f"max(DCGM_FI_DEV_GPU_UTIL{{{GPU_NS}}})"},
+    {"name": "kv_usage", "agg": "mean",
+     "query": f"avg(dynamo_component_kvstats_gpu_cache_usage_percent{{{COMPONENT_NS}}})"},
+    {"name": "kv_usage_max", "agg": "max",
+     "query": f"max(dynamo_component_kvstats_gpu_cache_usage_percent{{{COMPONENT_NS}}})"},
+    {"name": "queue_depth_p95", "agg": "p95", "query": f"sum(dynamo_frontend_queued_requests{{{FRONTEND_NS}}})"},
+    # Busiest worker relative to the average: 1.0 means perfectly even routing
+    {"name": "inflight_skew", "agg": "mean",
+     "query": f"max(dynamo_component_inflight_requests{{{WORKER_NS}}})"
+              f" / (avg(dynamo_component_inflight_requests{{{WORKER_NS}}}) > 0)"},
+]
+
+
+def parse_utc(value: str) -> float | None:
+    """Epoch seconds for an ISO 8601 timestamp such as 2026-02-27T23:50:57Z, or None."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def is_missing(value) -> bool:
+    return value in (None, "", "NaN", "nan")
+
+
+def load_spec(path: str | None = None, names: list[str] | None = None) -> list[dict]:
+    """Validated metric specs from a JSON file (or DEFAULT_SPEC), optionally filtered by name."""
+    if path:
+        with open(path) as f:
+            spec = json.load(f)
+    else:
+        spec = DEFAULT_SPEC
+    if not isinstance(spec, list):
+        raise ValueError("spec must be a JSON list of metrics")
+
+    metrics = []
+    for i, entry in enumerate(spec):
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("query"):
+            raise ValueError(f"spec entry {i}: needs 'name' and 'query'")
+        metric = dict(entry)
+        metric.setdefault("agg", "mean")
+        metric.setdefault("after", None)
+        metric.setdefault("step", STEP_SEC)
+        if metric["agg"] not in AGGREGATIONS:
+            raise ValueError(f"{metric['name']}: agg must be one of {', '.join(AGGREGATIONS)}")
+        if CHUNK_SEC % metric["step"]:
+            raise ValueError(f"{metric['name']}: step must divide {CHUNK_SEC}")
+        metrics.append(metric)
+
+    if names:
+        known = {m["name"] for m in metrics}
+        unknown = [n for n in names if n not in known]
+        if unknown:
+            raise ValueError(f"unknown metric(s): {', '.join(unknown)}")
+        metrics = [m for m in metrics if m["name"] in names]
+    return metrics
+
+
+# ── Range cache ───────────────────────────────────────────────────────────────
+
+
+class RangeCache:
+    """One PromQL expression, fetched in epoch-aligned chunks and cached on disk.
+
+    Each chunk is stored as <cache_dir>/<hash of url, query, step>/<chunk start>.npz
+    with arrays t (epoch seconds) and v. Only chunks that ended SETTLE_SEC
+    before the fetch and hold samples are written; a failed fetch or an empty
+    chunk is never cached.
+    """
+
+    def __init__(self, prom: PromClient, query: str, cache_dir: Path | None = None, step: int = STEP_SEC):
+        self.prom = prom
+        self.query = query
+        self.step = step
+        key = hashlib.sha1(f"{prom.base_url}\n{query}\n{step}".encode()).hexdigest()[:16]
+        self.dir = cache_dir / key if cache_dir else None
+        self.chunks = {}
+        self.cached = 0
+
+    def _path(self, chunk: int) -> Path:
+        return self.dir / f"{chunk * CHUNK_SEC}.npz"
+
+    def plan(self, windows: list[tuple[float, float]]) -> list[tuple]:
+        """Load cached chunks covering the windows; (query, start, end, step) for the rest.
+
+        Missing chunks are merged into the fewest contiguous spans, each at most
+        MAX_POINTS samples long. Pass each span's series back through ingest().
+        """
+        import numpy as np
+
+        needed = sorted({c for start, end in windows
+                         for c in range(int(start // CHUNK_SEC), int(end // CHUNK_SEC) + 1)} - self.chunks.keys())
+        runs = []
+        per_chunk = CHUNK_SEC // self.step
+        for c in needed:
+            if self.dir and self._path(c).exists():
+                with np.load(self._path(c)) as z:
+                    self.chunks[c] = (z["t"], z["v"])
+                self.cached += 1
+            elif runs and c == runs[-1][1] and (c + 1 - runs[-1][0]) * per_chunk <= MAX_POINTS:
+                runs[-1][1] = c + 1
+            else:
+                runs.append([c, c + 1])
+        return [(self.query, first * CHUNK_SEC, end * CHUNK_SEC - self.step, self.step) for first, end in runs]
+
+    def ingest(self, span: tuple, series: list[dict] | None):
+        """Split a fetched span into chunks (and cache the settled ones); None = fetch failed."""
+        import numpy as np
+
+        if series is None:
+            return
+        _, start, end, _ = span
+        t = np.array([t for s in series for t, _ in s["values"]], dtype=np.float64)
+        v = np.array([v for s in series for _, v in s["values"]], dtype=np.float64)
+        settled = time.time() - SETTLE_SEC
+        for c in range(int(start // CHUNK_SEC), int(end // CHUNK_SEC) + 1):
+            mask = (t >= c * CHUNK_SEC) & (t < (c + 1) * CHUNK_SEC)
+            self.chunks[c] = (t[mask], v[mask])
+            # An empty chunk is as likely a wrong or restarted Prometheus as a quiet
+            # hour: keep it for this run but refetch it next time
+            if self.dir and mask.any() and (c + 1) * CHUNK_SEC <= settled:
+                self._save(c, t[mask], v[mask])
+
+    def _save(self, chunk: int, t, v):
+        import numpy as np
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(chunk).with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, t=t, v=v)
+        os.replace(tmp, self._path(chunk))
+
+    def aggregate(self, windows: list[tuple[float, float]], agg: str = "mean"):
+        """agg of the loaded samples inside each [start, end] window; NaN where there are none."""
+        import numpy as np
+
+        if not windows:
+            return np.zeros(0)
+        parts = [self.chunks[c] for c in sorted(self.chunks)]
+        t = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0)
+        v = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0)
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+
+        bounds = np.asarray(windows, dtype=np.float64)
+        lo = np.searchsorted(t, bounds[:, 0], side="left")
+        hi = np.searchsorted(t, bounds[:, 1], side="right")
+        n = hi - lo
+        if agg == "mean":
+            csum = np.concatenate(([0.0], np.cumsum(v)))
+            return np.where(n > 0, (csum[hi] - csum[lo]) / np.maximum(n, 1), np.nan)
+        if agg == "last":
+            return np.where(n > 0, v[np.maximum(hi - 1, 0)] if len(v) else np.nan, np.nan)
+        reduce = {"max": np.max, "min": np.min}.get(agg) or (lambda x: np.percentile(x, float(agg[1:])))
+        return np.array([reduce(v[a:b]) if b > a else np.nan for a, b in zip(lo, hi)])
+
+
+def fetch(caches: list[RangeCache], windows: list[tuple[float, float]]):
+    """Load every cache for the windows, fetching all missing spans in one concurrent batch."""
+    requests = {}
+    for i, cache in enumerate(caches):
+        for j, span in enumerate(cache.plan(windows)):
+            requests[(i, j)] = span
+    if not requests:
+        return 0
+    results = caches[0].prom.range_many(requests)
+    for (i, j), span in requests.items():
+        caches[i].ingest(span, results[(i, j)])
+    return len(requests)
+
+
+# ── TSV backfill ──────────────────────────────────────────────────────────────
+
+
+def read_tsv(path: str) -> tuple[list[str], list[dict]]:
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        return list(reader.fieldnames or []), list(reader)
+
+
+def write_tsv(path: str, fieldnames: list[str], rows: list[dict]):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def add_column(fieldnames: list[str], name: str, after: str | None):
+    """Insert name after `after` if present, else just before START_COL, else at the end."""
+    if name in fieldnames:
+        return
+    if after in fieldnames:
+        fieldnames.insert(fieldnames.index(after) + 1, name)
+    elif START_COL in fieldnames:
+        fieldnames.insert(fieldnames.index(START_COL), name)
+    else:
+        fieldnames.append(name)
+
+
+def backfill(paths: list[str], metrics: list[dict], prom: PromClient, cache_dir: Path | None = None,
+             refresh: bool = False, verbose: bool = False) -> list[dict]:
+    """Add/fill every metric's column in every TSV (rewritten in place); return all rows."""
+    tables = []
+    for path in paths:
+        fieldnames, rows = read_tsv(path)
+        if START_COL not in fieldnames or END_COL not in fieldnames:
+            print(f"  WARN: {path} has no {START_COL}/{END_COL} columns, skipping", file=sys.stderr)
+            continue
+        windows = [(parse_utc(r.get(START_COL)), parse_utc(r.get(END_COL))) for r in rows]
+        tables.append((path, fieldnames, rows, windows))
+
+    # Which (table, row) cells each metric still needs
+    pending = {}
+    for metric in metrics:
+        name = metric["name"]
+        pending[name] = [
+            (ti, ri) for ti, (_, fieldnames, rows, windows) in enumerate(tables)
+            for ri, row in enumerate(rows)
+            if None not in windows[ri] and (refresh or name not in fieldnames or is_missing(row.get(name)))
+        ]
+
+    if getattr(prom, "offline", False):
+        cache_dir = None  # an archive is already local
+    caches = {m["name"]: RangeCache(prom, m["query"], cache_dir, m["step"]) for m in metrics}
+    all_windows = sorted({tables[ti][3][ri] for cells in pending.values() for ti, ri in cells})
+    prom.last_error = None
+    queries = fetch(list(caches.values()), all_windows)
+    cached = sum(c.cached for c in caches.values())
+    print(f"Prometheus: {queries} range queries for {len(metrics)} metrics, {cached} chunks from cache")
+    if prom.last_error:
+        print(f"  WARN: Prometheus query failed: {prom.last_error}", file=sys.stderr)
+
+    for metric in metrics:
+        name = metric["name"]
+        cells = pending[name]
+        values = caches[name].aggregate([tables[ti][3][ri] for ti, ri in cells], metric["agg"])
+        for (ti, ri), value in zip(cells, values):
+            row = tables[ti][2][ri]
+            row[name] = "NaN" if math.isnan(value) else f"{value:.6f}"
+            if verbose:
+                print(f"  {tables[ti][0]} row {ri+1}: {row.get('mode', '')} conc={row.get('concurrency', '')} "
+                      f"{name}={row[name]}")
+        filled = sum(1 for ti, ri in cells if tables[ti][2][ri][name] != "NaN")
+        print(f"  {name:<18} {metric['agg']:<5} {filled} filled, {len(cells) - filled} without data")
+
+    all_rows = []
+    for path, fieldnames, rows, _ in tables:
+        for metric in metrics:
+            add_column(fieldnames, metric["name"], metric["after"])
+        for row in rows:
+            for metric in metrics:
+                row.setdefault(metric["name"], "NaN")
+        write_tsv(path, fieldnames, rows)
+        print(f"  Written: {path} ({len(fieldnames)} columns)")
+        all_rows.extend(rows)
+    return all_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill Prometheus metrics into benchmark sweep TSVs")
+    parser.add_argument("tsv_files", nargs="*", metavar="TSV", help="TSV files to backfill (rewritten in place)")
+    parser.add_argument("--spec", help="JSON metric spec (default: built-in, see --print-spec)")
+    parser.add_argument("--metrics", help="Comma-separated subset of the spec's metric names")
+    parser.add_argument("--refresh", action="store_true", help="Recompute cells that already have a value")
+    parser.add_argument("--prom-url", default=PROM_URL,
+                        help=f"Prometheus base URL or prom_archive.py archive(s), comma-separated (default: {PROM_URL})")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                        help=f"Where fetched series chunks are cached (default: {CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the on-disk cache")
+    parser.add_argument("--print-spec", action="store_true", help="Print the spec as JSON and exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every filled cell")
+    args = parser.parse_args()
+
+    try:
+        metrics = load_spec(args.spec, args.metrics.split(",") if args.metrics else None)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.print_spec:
+        print(json.dumps(metrics, indent=2))
+        return
+    if not args.tsv_files:
+        parser.error("at least one TSV is required")
+
+    try:
+        import numpy as np  # noqa: F401  (used by RangeCache)
+    except ImportError:
+        print("ERROR: numpy required. Install with: pip install numpy")
+        sys.exit(1)
+
+    backfill(args.tsv_files, metrics, open_prom(args.prom_url), None if args.no_cache else args.cache_dir,
+             refresh=args.refresh, verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    main()
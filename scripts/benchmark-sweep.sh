@@ -6,10 +6,12 @@
 #
 # Usage:
 #   ./scripts/benchmark-sweep.sh [--levels 40,60,80,100,120] [--rps 10] \
-#       [--warmup 60] [--measure 300] [--output-dir dev] [--context NAME] [--dry-run]
+#       [--warmup 60|auto] [--measure 300] [--output-dir dev] [--context NAME] [--dry-run]
 
 set -euo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # ── Defaults ────────────────────────────────────────────────────────────────
 CONTEXT="${KUBE_CONTEXT:-do-nyc2-gtc-demo}"
 OUTPUT_DIR="dev"
@@ -18,7 +20,8 @@ MODE="both"   # both | kv | round_robin
 
 LEVELS="40,60,80,100,120"
 RPS=10
-WARMUP_SEC=60
+WARMUP_SEC=60          # or "auto": wait for steady state (see steady_state.py)
+WARMUP_MAX_SEC=300     # upper bound for --warmup auto
 MEASURE_SEC=300
 SNAPSHOT_COUNT=3       # 3 snapshots at 100s intervals covering 300s
 
@@ -46,7 +49,8 @@ Measures TTFT via loadgen_ttft_all_seconds Prometheus Summary.
 Options:
   --levels CSV       Concurrency levels, comma-separated (default: $LEVELS)
   --rps NUM          Target RPS (default: $RPS)
-  --warmup SEC       Warmup per level (default: $WARMUP_SEC)
+  --warmup SEC|auto  Warmup per level, or auto to wait for steady state (default: $WARMUP_SEC)
+  --warmup-max SEC   Longest warmup with --warmup auto (default: $WARMUP_MAX_SEC)
   --measure SEC      Measurement per level (default: $MEASURE_SEC)
   --mode MODE        Run mode: both, kv, round_robin (default: $MODE)
   --output-dir DIR   Output directory (default: $OUTPUT_DIR)
@@ -61,6 +65,7 @@ while [[ $# -gt 0 ]]; do
     --levels)      LEVELS="$2"; shift 2 ;;
     --rps)         RPS="$2"; shift 2 ;;
     --warmup)      WARMUP_SEC="$2"; shift 2 ;;
+    --warmup-max)  WARMUP_MAX_SEC="$2"; shift 2 ;;
     --measure)     MEASURE_SEC="$2"; shift 2 ;;
     --mode)        MODE="$2"; shift 2 ;;
     --output-dir)  OUTPUT_DIR="$2"; shift 2 ;;
@@ -76,6 +81,16 @@ if [[ "$MODE" != "both" && "$MODE" != "kv" && "$MODE" != "round_robin" ]]; then
   echo "Invalid --mode: $MODE (must be both, kv, or round_robin)"; exit 1
 fi
 
+if [[ "$WARMUP_SEC" == "auto" ]]; then
+  WARMUP_EST=$WARMUP_MAX_SEC
+  WARMUP_DESC="auto (<=${WARMUP_MAX_SEC}s)"
+elif [[ "$WARMUP_SEC" =~ ^[0-9]+$ ]]; then
+  WARMUP_EST=$WARMUP_SEC
+  WARMUP_DESC="${WARMUP_SEC}s"
+else
+  echo "Invalid --warmup: $WARMUP_SEC (must be seconds or auto)"; exit 1
+fi
+
 # Parse levels into array
 IFS=',' read -ra LEVEL_ARRAY <<< "$LEVELS"
 
@@ -149,26 +164,14 @@ ensure_port_forwards() {
   fi
 }
 
-# ── Prometheus instant query ──────────────────────────────────────────────────
+# ── Prometheus instant queries ────────────────────────────────────────────────
+# Evaluates all arguments concurrently over pooled connections (prom_client.py).
+# Returns pipe-delimited numeric strings, "NaN" for missing values
 prom_query() {
-  local query="$1"
-  local raw
-  raw=$(curl -sf --max-time 10 \
-    "http://localhost:${PROM_PORT}/api/v1/query" \
-    --data-urlencode "query=${query}" 2>/dev/null) || { echo "NaN"; return; }
-
-  python3 -c "
-import sys, json, math
-try:
-    d = json.load(sys.stdin)
-    if d['status'] != 'success' or not d['data']['result']:
-        print('NaN')
-    else:
-        v = float(d['data']['result'][0]['value'][1])
-        print('NaN' if (math.isnan(v) or math.isinf(v)) else f'{v:.6f}')
-except Exception:
-    print('NaN')
-" <<< "$raw"
+  python3 "${SCRIPT_DIR}/prom_client.py" --prom-url "http://localhost:${PROM_PORT}" "$@" 2>/dev/null && return
+  local out="NaN" i
+  for ((i = 1; i < $#; i++)); do out+="|NaN"; done
+  echo "$out"
 }
 
 # ── Collect metrics (pipe-delimited) ──────────────────────────────────────────
@@ -176,15 +179,13 @@ except Exception:
 collect_metrics() {
   local t50 t95 kh er ar tops ip50 ip95 tp50 tp95 lp50 lp95
 
-  t50=$(prom_query 'loadgen_ttft_all_seconds{quantile="0.5"}')
-  t95=$(prom_query 'loadgen_ttft_all_seconds{quantile="0.95"}')
-  kh=$(prom_query "clamp_max(rate(dynamo_frontend_cached_tokens_sum{${COMPONENT_NS}}[1m]) / (rate(dynamo_frontend_input_sequence_tokens_sum{${COMPONENT_NS}}[1m]) > 0), 1) or vector(0)")
-
-  # Actual RPS from Prometheus
-  ar=$(prom_query "sum(rate(loadgen_requests_total[1m])) or vector(0)")
-
-  # Output tokens per second
-  tops=$(prom_query "sum(rate(dynamo_frontend_output_tokens_total{${COMPONENT_NS}}[1m])) or vector(0)")
+  # TTFT quantiles, KV hit rate, actual RPS and output tokens/s from Prometheus
+  IFS='|' read -r t50 t95 kh ar tops <<< "$(prom_query \
+    'loadgen_ttft_all_seconds{quantile="0.5"}' \
+    'loadgen_ttft_all_seconds{quantile="0.95"}' \
+    "clamp_max(rate(dynamo_frontend_cached_tokens_sum{${COMPONENT_NS}}[1m]) / (rate(dynamo_frontend_input_sequence_tokens_sum{${COMPONENT_NS}}[1m]) > 0), 1) or vector(0)" \
+    "sum(rate(loadgen_requests_total[1m])) or vector(0)" \
+    "sum(rate(dynamo_frontend_output_tokens_total{${COMPONENT_NS}}[1m])) or vector(0)")"
 
   # Error rate + ITL + TPOT + Latency from load generator /api/status
   local status_json
@@ -388,6 +389,25 @@ restart_all_dgd_pods() {
   wait_for_dgd_pods "$DGD_EXPECTED_PODS" 600
 }
 
+# ── Warmup ──────────────────────────────────────────────────────────────────
+# Sleeps WARMUP_SEC or, with --warmup auto, waits until TTFT, active requests
+# and queue depth stop drifting (steady_state.py). Sets WARMUP_TAKEN.
+run_warmup() {
+  if [[ "$WARMUP_SEC" != "auto" ]]; then
+    info "Warmup ${WARMUP_SEC}s..."
+    sleep "$WARMUP_SEC"
+    WARMUP_TAKEN="$WARMUP_SEC"
+    return
+  fi
+  info "Warmup until steady state (at most ${WARMUP_MAX_SEC}s)..."
+  WARMUP_TAKEN=$(python3 "${SCRIPT_DIR}/steady_state.py" \
+    --loadgen-url "http://localhost:${LOADGEN_PORT}" \
+    --prom-url "http://localhost:${PROM_PORT}" \
+    --max-sec "$WARMUP_MAX_SEC") \
+    || warn "No steady state within ${WARMUP_MAX_SEC}s — measuring anyway"
+  info "Warmup took ${WARMUP_TAKEN}s"
+}
+
 # ── Format helpers ────────────────────────────────────────────────────────────
 fmt_sec() {
   python3 -c "
@@ -421,7 +441,7 @@ if $DRY_RUN; then
   echo "Output dir:    $OUTPUT_DIR/"
   echo "Levels:        ${LEVEL_ARRAY[*]}"
   echo "RPS:           $RPS"
-  echo "Warmup:        ${WARMUP_SEC}s per level"
+  echo "Warmup:        ${WARMUP_DESC} per level"
   echo "Measurement:   ${MEASURE_SEC}s per level (${SNAPSHOT_COUNT} snapshots @ ${SNAPSHOT_INTERVAL}s)"
   echo ""
   if [[ "$MODE" == "both" || "$MODE" == "kv" ]]; then
@@ -434,7 +454,7 @@ if $DRY_RUN; then
     fi
     echo "  - Prime KV cache (3 conversations at concurrency ${LEVEL_ARRAY[0]})"
     for lvl in "${LEVEL_ARRAY[@]}"; do
-      echo "  - Concurrency ${lvl}: ${WARMUP_SEC}s warmup + ${MEASURE_SEC}s measure"
+      echo "  - Concurrency ${lvl}: ${WARMUP_DESC} warmup + ${MEASURE_SEC}s measure"
     done
     echo "  - Stop workload, cooldown 30s"
     echo ""
@@ -444,7 +464,7 @@ if $DRY_RUN; then
     echo "  - Patch DGD to round_robin"
     echo "  - Wait for frontend restart"
     for lvl in "${LEVEL_ARRAY[@]}"; do
-      echo "  - Concurrency ${lvl}: ${WARMUP_SEC}s warmup + ${MEASURE_SEC}s measure"
+      echo "  - Concurrency ${lvl}: ${WARMUP_DESC} warmup + ${MEASURE_SEC}s measure"
     done
     echo "  - Stop workload"
     echo ""
@@ -453,21 +473,21 @@ if $DRY_RUN; then
     echo "Restore to kv mode + restart all DGD pods"
     echo ""
   fi
-  local_per_phase=$(( ${#LEVEL_ARRAY[@]} * (WARMUP_SEC + MEASURE_SEC + 10) ))
+  local_per_phase=$(( ${#LEVEL_ARRAY[@]} * (WARMUP_EST + MEASURE_SEC + 10) ))
   local_phases=1
   [[ "$MODE" == "both" ]] && local_phases=2
   local_total=$(( local_per_phase * local_phases / 60 + 3 ))
   echo "Estimated duration: ~${local_total} min"
   echo ""
   echo "Output: ${OUTPUT_DIR}/benchmark-sweep-YYYYMMDD-HHMMSS.tsv"
-  echo "Columns: mode  concurrency  rps  ttft_p50_sec  ttft_p95_sec  kv_hit_rate  error_pct  actual_rps  tops  itl_p50_sec  itl_p95_sec  tpot_p50_sec  tpot_p95_sec  latency_p50_sec  latency_p95_sec  measure_start_utc  measure_end_utc"
+  echo "Columns: mode  concurrency  rps  ttft_p50_sec  ttft_p95_sec  kv_hit_rate  error_pct  actual_rps  tops  itl_p50_sec  itl_p95_sec  tpot_p50_sec  tpot_p95_sec  latency_p50_sec  latency_p95_sec  measure_start_utc  measure_end_utc  warmup_sec"
   exit 0
 fi
 
 # ══════════════════════════════════════════════════════════════════════════════
 # MAIN EXECUTION
 # ══════════════════════════════════════════════════════════════════════════════
-PER_PHASE=$(( ${#LEVEL_ARRAY[@]} * (WARMUP_SEC + MEASURE_SEC + 10) / 60 ))
+PER_PHASE=$(( ${#LEVEL_ARRAY[@]} * (WARMUP_EST + MEASURE_SEC + 10) / 60 ))
 NUM_PHASES=2
 [[ "$MODE" != "both" ]] && NUM_PHASES=1
 EST_TOTAL=$(( PER_PHASE * NUM_PHASES + 3 ))
@@ -480,7 +500,7 @@ printf "║  Context:     %-42s║\n" "$CONTEXT"
 printf "║  Mode:        %-42s║\n" "$MODE"
 printf "║  Levels:      %-42s║\n" "${LEVEL_ARRAY[*]}"
 printf "║  RPS:         %-42s║\n" "$RPS"
-printf "║  Per level:   %-42s║\n" "${WARMUP_SEC}s warmup + ${MEASURE_SEC}s measure"
+printf "║  Per level:   %-42s║\n" "${WARMUP_DESC} warmup + ${MEASURE_SEC}s measure"
 printf "║  Estimated:   %-42s║\n" "~${EST_TOTAL} min"
 echo "╚══════════════════════════════════════════════════════════╝"
 echo ""
@@ -559,7 +579,7 @@ info "  Load generator ready"
 TIMESTAMP=$(date +%Y%m%d-%H%M%S)
 TSV_FILE="${OUTPUT_DIR}/benchmark-sweep-${TIMESTAMP}.tsv"
 mkdir -p "$OUTPUT_DIR"
-printf "mode\tconcurrency\trps\tttft_p50_sec\tttft_p95_sec\tkv_hit_rate\terror_pct\tactual_rps\ttops\titl_p50_sec\titl_p95_sec\ttpot_p50_sec\ttpot_p95_sec\tlatency_p50_sec\tlatency_p95_sec\tmeasure_start_utc\tmeasure_end_utc\n" \
+printf "mode\tconcurrency\trps\tttft_p50_sec\tttft_p95_sec\tkv_hit_rate\terror_pct\tactual_rps\ttops\titl_p50_sec\titl_p95_sec\ttpot_p50_sec\ttpot_p95_sec\tlatency_p50_sec\tlatency_p95_sec\tmeasure_start_utc\tmeasure_end_utc\twarmup_sec\n" \
   > "$TSV_FILE"
 info "Results → ${TSV_FILE}"
 
@@ -581,8 +601,7 @@ run_phase() {
     fi
 
     # Warmup
-    info "Warmup ${WARMUP_SEC}s..."
-    sleep "$WARMUP_SEC"
+    run_warmup
 
     # Measurement snapshots
     local measure_start measure_end
@@ -606,11 +625,11 @@ run_phase() {
     IFS='|' read -r avg_t50 avg_t95 avg_kh avg_er avg_ar avg_tops avg_ip50 avg_ip95 avg_tp50 avg_tp95 avg_lp50 avg_lp95 <<< "$avg_line"
 
     # Write TSV row
-    printf "%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" \
+    printf "%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" \
       "$mode" "$conc" "$RPS" \
       "$avg_t50" "$avg_t95" "$avg_kh" "$avg_er" "$avg_ar" "$avg_tops" \
       "$avg_ip50" "$avg_ip95" "$avg_tp50" "$avg_tp95" "$avg_lp50" "$avg_lp95" \
-      "$measure_start" "$measure_end" >> "$TSV_FILE"
+      "$measure_start" "$measure_end" "$WARMUP_TAKEN" >> "$TSV_FILE"
 
     # Display level summary
     echo "│"
@@ -624,6 +643,7 @@ run_phase() {
     echo "│    RPS     ${avg_ar}  (target: ${RPS})"
     echo "│    TOPS    ${avg_tops} tok/s"
     echo "│    Window  ${measure_start} → ${measure_end}"
+    echo "│    Warmup  ${WARMUP_TAKEN}s"
     echo "└──────────────────────────────────────────────────────"
   done
 }
@@ -3,10 +3,12 @@
 # Steps through increasing load levels, collects Prometheus metrics, finds max
 # sustainable concurrency before errors or unacceptable latency.
 #
-# Usage: ./scripts/capacity-test.sh [--context NAME] [--output-dir DIR] [--dry-run]
+# Usage: ./scripts/capacity-test.sh [--context NAME] [--output-dir DIR] [--warmup SEC|auto] [--dry-run]
 
 set -euo pipefail
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # ── Defaults ────────────────────────────────────────────────────────────────
 CONTEXT="${KUBE_CONTEXT:-do-nyc2-gtc-demo}"
 OUTPUT_DIR="dev"
@@ -18,7 +20,8 @@ LOADGEN_NS="dynamo-workload"
 PROM_NS="monitoring"
 PROM_SVC="kube-prometheus-stack-prometheus"
 
-WARMUP_SEC=60
+WARMUP_SEC=60          # or "auto": wait for steady state (see steady_state.py)
+WARMUP_MAX_SEC=300     # upper bound for --warmup auto
 SNAPSHOT_COUNT=3
 SNAPSHOT_INTERVAL=40   # seconds between snapshots (3 × 40 = 120s measurement)
 
@@ -62,6 +65,8 @@ Steps through increasing load levels and finds max sustainable concurrency.
 Options:
   --context NAME     kubectl context (default: $CONTEXT)
   --output-dir DIR   Output directory for results (default: $OUTPUT_DIR)
+  --warmup SEC|auto  Warmup per level, or auto to wait for steady state (default: $WARMUP_SEC)
+  --warmup-max SEC   Longest warmup with --warmup auto (default: $WARMUP_MAX_SEC)
   --dry-run          Print test plan without executing
   -h, --help         Show this help
 EOF
@@ -71,12 +76,24 @@ while [[ $# -gt 0 ]]; do
   case "$1" in
     --context)     CONTEXT="$2"; shift 2 ;;
     --output-dir)  OUTPUT_DIR="$2"; shift 2 ;;
+    --warmup)      WARMUP_SEC="$2"; shift 2 ;;
+    --warmup-max)  WARMUP_MAX_SEC="$2"; shift 2 ;;
     --dry-run)     DRY_RUN=true; shift ;;
     -h|--help)     usage; exit 0 ;;
     *)             echo "Unknown option: $1"; usage; exit 1 ;;
   esac
 done
 
+if [[ "$WARMUP_SEC" == "auto" ]]; then
+  WARMUP_EST=$WARMUP_MAX_SEC
+  WARMUP_DESC="auto (<=${WARMUP_MAX_SEC}s)"
+elif [[ "$WARMUP_SEC" =~ ^[0-9]+$ ]]; then
+  WARMUP_EST=$WARMUP_SEC
+  WARMUP_DESC="${WARMUP_SEC}s"
+else
+  echo "Invalid --warmup: $WARMUP_SEC (must be seconds or auto)"; exit 1
+fi
+
 # ── Logging helpers ─────────────────────────────────────────────────────────
 info() { echo "[$(date +%H:%M:%S)] INFO  $*"; }
 warn() { echo "[$(date +%H:%M:%S)] WARN  $*" >&2; }
@@ -123,27 +140,14 @@ start_port_forward() {
   info "${label}: ready"
 }
 
-# ── Prometheus instant query ────────────────────────────────────────────────
-# Returns a numeric string or "NaN"
+# ── Prometheus instant queries ──────────────────────────────────────────────
+# Evaluates all arguments concurrently over pooled connections (prom_client.py).
+# Returns pipe-delimited numeric strings, "NaN" for missing values
 prom_query() {
-  local query="$1"
-  local raw
-  raw=$(curl -sf --max-time 10 \
-    "http://localhost:${PROM_PORT}/api/v1/query" \
-    --data-urlencode "query=${query}" 2>/dev/null) || { echo "NaN"; return; }
-
-  python3 -c "
-import sys, json, math
-try:
-    d = json.load(sys.stdin)
-    if d['status'] != 'success' or not d['data']['result']:
-        print('NaN')
-    else:
-        v = float(d['data']['result'][0]['value'][1])
-        print('NaN' if (math.isnan(v) or math.isinf(v)) else f'{v:.6f}')
-except Exception:
-    print('NaN')
-" <<< "$raw"
+  python3 "${SCRIPT_DIR}/prom_client.py" --prom-url "http://localhost:${PROM_PORT}" "$@" 2>/dev/null && return
+  local out="NaN" i
+  for ((i = 1; i < $#; i++)); do out+="|NaN"; done
+  echo "$out"
 }
 
 # ── Collect all metrics (pipe-delimited) ────────────────────────────────────
@@ -151,15 +155,16 @@ except Exception:
 collect_metrics() {
   local t50 t95 i50 i95 qd ku kh er ar gu
 
-  t50=$(prom_query "histogram_quantile(0.50, sum(rate(dynamo_frontend_time_to_first_token_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))")
-  t95=$(prom_query "histogram_quantile(0.95, sum(rate(dynamo_frontend_time_to_first_token_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))")
-  i50=$(prom_query "histogram_quantile(0.50, sum(rate(dynamo_frontend_inter_token_latency_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))")
-  i95=$(prom_query "histogram_quantile(0.95, sum(rate(dynamo_frontend_inter_token_latency_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))")
-  qd=$(prom_query  "sum(dynamo_frontend_queued_requests{${FRONTEND_NS}}) or vector(0)")
-  ku=$(prom_query  "avg(dynamo_component_kvstats_gpu_cache_usage_percent{${COMPONENT_NS}}) or vector(0)")
-  kh=$(prom_query  "avg(dynamo_component_kvstats_gpu_prefix_cache_hit_rate{${COMPONENT_NS}}) or vector(0)")
-  ar=$(prom_query  "sum(rate(dynamo_frontend_requests_total{${FRONTEND_NS}}[2m])) or vector(0)")
-  gu=$(prom_query  "avg(DCGM_FI_DEV_GPU_UTIL{${GPU_NS}}) or vector(0)")
+  IFS='|' read -r t50 t95 i50 i95 qd ku kh ar gu <<< "$(prom_query \
+    "histogram_quantile(0.50, sum(rate(dynamo_frontend_time_to_first_token_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))" \
+    "histogram_quantile(0.95, sum(rate(dynamo_frontend_time_to_first_token_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))" \
+    "histogram_quantile(0.50, sum(rate(dynamo_frontend_inter_token_latency_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))" \
+    "histogram_quantile(0.95, sum(rate(dynamo_frontend_inter_token_latency_seconds_bucket{${FRONTEND_NS}}[2m])) by (le))" \
+    "sum(dynamo_frontend_queued_requests{${FRONTEND_NS}}) or vector(0)" \
+    "avg(dynamo_component_kvstats_gpu_cache_usage_percent{${COMPONENT_NS}}) or vector(0)" \
+    "avg(dynamo_component_kvstats_gpu_prefix_cache_hit_rate{${COMPONENT_NS}}) or vector(0)" \
+    "sum(rate(dynamo_frontend_requests_total{${FRONTEND_NS}}[2m])) or vector(0)" \
+    "avg(DCGM_FI_DEV_GPU_UTIL{${GPU_NS}}) or vector(0)")"
 
   # Error rate from load generator (captures client-side timeouts too)
   local status_json
@@ -239,6 +244,26 @@ loadgen_stop() {
   info "Workload stopped"
 }
 
+# ── Warmup ──────────────────────────────────────────────────────────────────
+# Sleeps WARMUP_SEC or, with --warmup auto, waits until TTFT, active requests
+# and queue depth stop drifting (steady_state.py). Sets WARMUP_TAKEN.
+run_warmup() {
+  if [[ "$WARMUP_SEC" != "auto" ]]; then
+    info "Warmup ${WARMUP_SEC}s..."
+    sleep "$WARMUP_SEC"
+    WARMUP_TAKEN="$WARMUP_SEC"
+    return
+  fi
+  info "Warmup until steady state (at most ${WARMUP_MAX_SEC}s)..."
+  WARMUP_TAKEN=$(python3 "${SCRIPT_DIR}/steady_state.py" \
+    --loadgen-url "http://localhost:${LOADGEN_PORT}" \
+    --prom-url "http://localhost:${PROM_PORT}" \
+    --queue-query "sum(dynamo_frontend_queued_requests{${FRONTEND_NS}}) or vector(0)" \
+    --max-sec "$WARMUP_MAX_SEC") \
+    || warn "No steady state within ${WARMUP_MAX_SEC}s — measuring anyway"
+  info "Warmup took ${WARMUP_TAKEN}s"
+}
+
 # ── Zone classification + stop-condition check ──────────────────────────────
 # Args: ttft_p95  itl_p95  error_rate  queue_depth  kv_usage
 # Outputs to stdout: zone|reason1;reason2;...   (reasons empty if no stop)
@@ -325,7 +350,7 @@ if $DRY_RUN; then
   echo ""
   echo "Context:       $CONTEXT"
   echo "Output dir:    $OUTPUT_DIR/"
-  echo "Warmup:        ${WARMUP_SEC}s per level"
+  echo "Warmup:        ${WARMUP_DESC} per level"
   echo "Measurement:   $((SNAPSHOT_COUNT * SNAPSHOT_INTERVAL))s per level (${SNAPSHOT_COUNT} snapshots @ ${SNAPSHOT_INTERVAL}s)"
   echo ""
   printf "  %-6s  %15s  %8s\n" "Level" "maxConcurrency" "RPS"
@@ -342,11 +367,11 @@ if $DRY_RUN; then
   echo "  Queue depth > ${QUEUE_RED}"
   echo "  KV cache usage > ${KV_RED}%"
   echo ""
-  echo "Estimated duration: ~$((${#LEVELS[@]} * (WARMUP_SEC + SNAPSHOT_COUNT * SNAPSHOT_INTERVAL + 10) / 60 + 2)) min"
+  echo "Estimated duration: ~$((${#LEVELS[@]} * (WARMUP_EST + SNAPSHOT_COUNT * SNAPSHOT_INTERVAL + 10) / 60 + 2)) min"
   echo ""
   echo "Output columns:"
   echo "  level  maxConcurrency  rps  ttft_p50  ttft_p95  itl_p50  itl_p95"
-  echo "  queue_depth  kv_usage  kv_hit_rate  error_rate  actual_rps  gpu_util  zone"
+  echo "  queue_depth  kv_usage  kv_hit_rate  error_rate  actual_rps  gpu_util  zone  warmup_sec"
   exit 0
 fi
 
@@ -359,7 +384,7 @@ echo "║            Dynamo Capacity Staircase Test                ║"
 echo "╠══════════════════════════════════════════════════════════╣"
 printf "║  Context:   %-44s║\n" "$CONTEXT"
 printf "║  Levels:    %-44s║\n" "${#LEVELS[@]} levels (L1→L${#LEVELS[@]})"
-printf "║  Per level: %-44s║\n" "${WARMUP_SEC}s warmup + $((SNAPSHOT_COUNT * SNAPSHOT_INTERVAL))s measure"
+printf "║  Per level: %-44s║\n" "${WARMUP_DESC} warmup + $((SNAPSHOT_COUNT * SNAPSHOT_INTERVAL))s measure"
 echo "╚══════════════════════════════════════════════════════════╝"
 echo ""
 
@@ -441,7 +466,7 @@ info "  Prometheus responding (up=${PROM_UP})"
 TIMESTAMP=$(date +%Y%m%d-%H%M%S)
 TSV_FILE="${OUTPUT_DIR}/capacity-test-results-${TIMESTAMP}.tsv"
 mkdir -p "$OUTPUT_DIR"
-printf "level\tmaxConcurrency\trps\tttft_p50\tttft_p95\titl_p50\titl_p95\tqueue_depth\tkv_usage\tkv_hit_rate\terror_rate\tactual_rps\tgpu_util\tzone\n" \
+printf "level\tmaxConcurrency\trps\tttft_p50\tttft_p95\titl_p50\titl_p95\tqueue_depth\tkv_usage\tkv_hit_rate\terror_rate\tactual_rps\tgpu_util\tzone\twarmup_sec\n" \
   > "$TSV_FILE"
 info "Results → ${TSV_FILE}"
 
@@ -472,8 +497,7 @@ for entry in "${LEVELS[@]}"; do
   fi
 
   # Warmup
-  info "Warmup ${WARMUP_SEC}s..."
-  sleep "$WARMUP_SEC"
+  run_warmup
 
   # Measurement snapshots
   info "Measuring ($((SNAPSHOT_COUNT * SNAPSHOT_INTERVAL))s, ${SNAPSHOT_COUNT} snapshots)..."
@@ -512,11 +536,11 @@ for entry in "${LEVELS[@]}"; do
   fi
 
   # Write TSV row
-  printf "%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" \
+  printf "%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\t%s\n" \
     "$level" "$conc" "$rps" \
     "$avg_t50" "$avg_t95" "$avg_i50" "$avg_i95" \
     "$avg_qd" "$avg_ku" "$avg_kh" "$avg_er" "$avg_ar" "$avg_gu" \
-    "$zone" >> "$TSV_FILE"
+    "$zone" "$WARMUP_TAKEN" >> "$TSV_FILE"
 
   # Display level summary
   echo "│"
@@ -529,6 +553,7 @@ for entry in "${LEVELS[@]}"; do
   echo "│    RPS    ${avg_ar}  (target: ${rps})"
   echo "│    GPU    $(fmt_pct "$avg_gu")"
   echo "│    Zone   ${zone}"
+  echo "│    Warmup ${WARMUP_TAKEN}s"
   echo "└──────────────────────────────────────────────────────"
 
   # Stop check
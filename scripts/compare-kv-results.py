@@ -4,15 +4,25 @@ Compare KV-aware vs round-robin routing test results.
 
 Reads two TSV files from kv-benefit-test.py (one per routing mode),
 joins on concurrency level, and produces a side-by-side comparison
-with crossover analysis.
+with crossover analysis. When both runs recorded token usage, the
+prefill fit (effective prefill tok/s and cache-hit savings per follow-up)
+is compared as well.
+
+With --paired, reads instead the schedule written by
+kv-benefit-comparison.sh --paired, where the routing modes alternate in
+ABBA blocks at each level. Adjacent KV/round-robin blocks form pairs and
+the per-pair differences get t confidence intervals; with ABBA ordering a
+linear drift of the cluster cancels out of their mean.
 
 Usage:
   python3 scripts/compare-kv-results.py --kv dev/kv-benefit-test-kv-*.tsv --rr dev/kv-benefit-test-roundrobin-*.tsv
   python3 scripts/compare-kv-results.py --kv FILE --rr FILE --output-dir dev
+  python3 scripts/compare-kv-results.py --paired dev/kv-paired-*/schedule.tsv
 """
 
 import argparse
 import csv
+import math
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -54,17 +64,207 @@ def fmt_ratio(val):
     return f"{v:>5.2f}x"
 
 
+# ── Paired (interleaved) comparison ─────────────────────────────────────────
+
+KV_MODE = "kv"
+
+# Two-sided 95% Student t critical values by degrees of freedom (normal beyond)
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+        9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 30: 2.042}
+
+# (column, label, sign, count columns that must be positive for the value to mean anything):
+# differences are oriented so positive favours KV routing
+PAIRED_METRICS = [
+    ("followup_ttft_p50", "F/U p50", -1, ("followup_count",)),
+    ("followup_ttft_p95", "F/U p95", -1, ("followup_count",)),
+    ("initial_ttft_p50", "Init p50", -1, ("initial_count",)),
+    ("speedup_p50", "Speedup", 1, ("initial_count", "followup_count")),
+]
+
+
+def paired_value(result, col, counts):
+    """The block's value for col, or None if missing, NaN or backed by no events (an empty sketch reads 0)."""
+    try:
+        value = float(result.get(col, ""))
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(value):
+        return None
+    for count in counts:
+        if count in result and safe_float(result[count]) <= 0:
+            return None
+    return value
+
+
+def paired_diffs(pairs, col, sign, counts):
+    """KV-advantage differences for col over the pairs where both blocks have a usable value."""
+    diffs = []
+    for kv, rr in pairs:
+        a, b = paired_value(kv, col, counts), paired_value(rr, col, counts)
+        if a is not None and b is not None:
+            diffs.append(sign * (a - b))
+    return diffs
+
+
+def t_critical(df):
+    if df < 1:
+        return math.inf
+    return T_95[max(k for k in T_95 if k <= df)] if df <= 30 else 1.96
+
+
+def mean_ci(values):
+    """Mean and 95% t half-width of values (inf half-width below two values)."""
+    n = len(values)
+    mean = sum(values) / n
+    if n < 2:
+        return mean, math.inf
+    sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    return mean, t_critical(n - 1) * sd / math.sqrt(n)
+
+
+def read_schedule(path):
+    """Schedule rows, each with the block's kv-benefit-test row attached."""
+    path = Path(path)
+    blocks = []
+    with open(path) as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            block_tsv = path.parent / row["tsv"]
+            result = read_tsv(block_tsv).get(int(row["concurrency"])) if block_tsv.is_file() else None
+            if result is None:
+                print(f"WARNING: block {row['block']} has no result ({block_tsv})", file=sys.stderr)
+            blocks.append({**row, "result": result})
+    return blocks
+
+
+def pair_blocks(blocks):
+    """Pair consecutive KV / round-robin blocks of one level as (kv, rr) results."""
+    pairs = []
+    pending = None
+    for block in blocks:
+        if block["result"] is None:
+            pending = None
+            continue
+        if pending is not None and (pending["mode"] == KV_MODE) != (block["mode"] == KV_MODE):
+            kv, rr = (pending, block) if pending["mode"] == KV_MODE else (block, pending)
+            pairs.append((kv["result"], rr["result"]))
+            pending = None
+        else:
+            pending = block
+    return pairs
+
+
+def run_paired(args):
+    schedule = read_schedule(args.paired)
+    if not schedule:
+        print(f"ERROR: Empty schedule: {args.paired}", file=sys.stderr)
+        sys.exit(1)
+
+    levels = sorted({int(b["concurrency"]) for b in schedule})
+
+    print()
+    print("=" * 100)
+    print("  KV-Aware vs Round-Robin — Paired (Interleaved) Comparison")
+    print("=" * 100)
+    print(f"  Schedule:   {args.paired}")
+    print(f"  Levels:     {levels}")
+    print()
+    print(f"  {'Block':>5} {'Round':>5} {'Conc':>4}  {'Mode':<12} {'Switch':>6}  {'Started':<20} "
+          f"{'F/U p50':>8} {'Spd':>6}")
+    for b in schedule:
+        r = b["result"] or {}
+        print(f"  {b['block']:>5} {b['round']:>5} {b['concurrency']:>4}  {b['mode']:<12} "
+              f"{b['switch_sec']:>5}s  {b['started']:<20} "
+              f"{fmt_ms(r.get('followup_ttft_p50'))} {fmt_ratio(r.get('speedup_p50'))}")
+    print()
+    print("  Paired differences (KV advantage, mean [95% CI]; positive = KV better):")
+    print(f"  {'Conc':>4} {'Pairs':>5} │ " + " │ ".join(f"{label:^27}" for _, label, _, _ in PAIRED_METRICS)
+          + " │ Verdict")
+
+    rows = []
+    for conc in levels:
+        level_blocks = [b for b in schedule if int(b["concurrency"]) == conc]
+        pairs = pair_blocks(level_blocks)
+        row = {
+            "concurrency": conc,
+            "pairs": len(pairs),
+            "order": ",".join(b["mode"] for b in level_blocks),
+        }
+        cells = []
+        for col, label, sign, counts in PAIRED_METRICS:
+            diffs = paired_diffs(pairs, col, sign, counts)
+            mean, half = mean_ci(diffs) if diffs else (0.0, math.inf)
+            row[col] = (mean, half, len(diffs))
+            unit = "x" if col.startswith("speedup") else "ms"
+            digits = 2 if unit == "x" else 0
+            ci = f"±{half:.{digits}f}" if math.isfinite(half) else "±n/a"
+            value = f"{mean:>+8.{digits}f}{unit}" if diffs else f"{'n/a':>{8 + len(unit)}}"
+            cells.append(f"{value} {ci:>11} n{len(diffs):<2}")
+
+        fu_mean, fu_half, fu_used = row["followup_ttft_p50"]
+        if not fu_used:
+            verdict = "no pairs"
+        elif not math.isfinite(fu_half):
+            verdict = "1 pair"
+        elif fu_mean - fu_half > 0:
+            verdict = "KV wins"
+        elif fu_mean + fu_half < 0:
+            verdict = "RR wins"
+        else:
+            verdict = "n.s."
+        row["verdict"] = verdict
+        rows.append(row)
+        print(f"  {conc:>4} {len(pairs):>5} │ " + " │ ".join(cells) + f" │ {verdict}")
+
+    print()
+    print("  nK = pairs used for that metric (pairs where a block has no events or a NaN value are left out)")
+    print("  n.s. = the 95% interval for the follow-up p50 difference includes zero")
+    print()
+    print("=" * 100)
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tsv_path = out_dir / f"kv-paired-comparison-{timestamp}.tsv"
+
+    with open(tsv_path, "w") as f:
+        cols = ["concurrency", "pairs"]
+        for col, _, _, _ in PAIRED_METRICS:
+            cols += [f"{col}_diff", f"{col}_ci", f"{col}_pairs"]
+        cols += ["verdict", "order", "schedule"]
+        f.write("\t".join(cols) + "\n")
+        for r in rows:
+            values = [str(r["concurrency"]), str(r["pairs"])]
+            for col, _, _, _ in PAIRED_METRICS:
+                mean, half, used = r[col]
+                values += [f"{mean:.3f}" if used else "", f"{half:.3f}" if math.isfinite(half) else "", str(used)]
+            values += [r["verdict"], r["order"], str(args.paired)]
+            f.write("\t".join(values) + "\n")
+
+    print(f"  Paired TSV: {tsv_path}")
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Compare KV-aware vs round-robin routing results",
     )
-    parser.add_argument("--kv", required=True, help="KV-mode TSV file")
-    parser.add_argument("--rr", required=True, help="Round-robin TSV file")
+    parser.add_argument("--kv", help="KV-mode TSV file")
+    parser.add_argument("--rr", help="Round-robin TSV file")
+    parser.add_argument(
+        "--paired", metavar="SCHEDULE",
+        help="Schedule TSV from kv-benefit-comparison.sh --paired (instead of --kv/--rr)",
+    )
     parser.add_argument(
         "--output-dir", default="dev", help="Output directory (default: dev)"
     )
     args = parser.parse_args()
 
+    if args.paired:
+        run_paired(args)
+        return
+    if not (args.kv and args.rr):
+        parser.error("--kv and --rr are required (or --paired SCHEDULE)")
+
     kv_data = read_tsv(args.kv)
     rr_data = read_tsv(args.rr)
 
@@ -161,6 +361,10 @@ def main():
             "fu_delta": fu_delta,
             "speedup_diff": speedup_diff,
             "note": note,
+            "kv_prefill_tok_s": safe_float(kv.get("prefill_tok_s")),
+            "kv_saved_ms": safe_float(kv.get("cache_saved_ms")),
+            "rr_prefill_tok_s": safe_float(rr.get("prefill_tok_s")),
+            "rr_saved_ms": safe_float(rr.get("cache_saved_ms")),
         }
         comparison_rows.append(comp_row)
 
@@ -217,6 +421,23 @@ def main():
         else:
             print("  No meaningful KV advantage observed at any level.")
 
+    # ── Prefill model (token usage) ─────────────────────────────────────────
+    prefill_rows = [r for r in comparison_rows if r["kv_prefill_tok_s"] and r["rr_prefill_tok_s"]]
+    if prefill_rows:
+        print()
+        print("  Prefill model (TTFT ≈ a + b × uncached tokens):")
+        print(
+            f"  {'Conc':>4} │ {'KV tok/s':>9} {'saved':>7} │ {'RR tok/s':>9} {'saved':>7} │ {'Saved Δ':>8}"
+        )
+        for r in prefill_rows:
+            print(
+                f"  {r['concurrency']:>4} │ "
+                f"{r['kv_prefill_tok_s']:>9,.0f} {r['kv_saved_ms']:>5.0f}ms │ "
+                f"{r['rr_prefill_tok_s']:>9,.0f} {r['rr_saved_ms']:>5.0f}ms │ "
+                f"{r['kv_saved_ms'] - r['rr_saved_ms']:>+6.0f}ms"
+            )
+        print("    saved = prefill time the prefix cache removes per follow-up turn")
+
     print()
     print("=" * 100)
 
@@ -232,6 +453,7 @@ def main():
             "kv_init_p50", "kv_fu_p50", "kv_speedup", "kv_hit",
             "rr_init_p50", "rr_fu_p50", "rr_speedup", "rr_hit",
             "fu_delta_ms", "speedup_diff", "note",
+            "kv_prefill_tok_s", "kv_saved_ms", "rr_prefill_tok_s", "rr_saved_ms",
         ]
         f.write("\t".join(cols) + "\n")
         for r in comparison_rows:
@@ -248,6 +470,10 @@ def main():
                 f"{r['fu_delta']:.1f}",
                 f"{r['speedup_diff']:.3f}",
                 r["note"],
+                f"{r['kv_prefill_tok_s']:.0f}",
+                f"{r['kv_saved_ms']:.1f}",
+                f"{r['rr_prefill_tok_s']:.0f}",
+                f"{r['rr_saved_ms']:.1f}",
             ]) + "\n")
 
     print(f"  Combined TSV: {tsv_path}")
@@ -4,11 +4,18 @@
 # Patches the DGD routing mode, runs kv-benefit-test.py for each mode,
 # restores the original mode, and runs compare-kv-results.py on both TSVs.
 #
+# With --paired, the modes are interleaved instead: at each level the
+# routing mode alternates in ABBA blocks (kv, round_robin, round_robin, kv)
+# for --rounds rounds, so cluster drift and cache warmth hit both modes
+# alike. The schedule goes to <output-dir>/kv-paired-<ts>/schedule.tsv and
+# compare-kv-results.py --paired reports paired differences with CIs.
+#
 # Usage:
 #   ./scripts/kv-benefit-comparison.sh
 #   ./scripts/kv-benefit-comparison.sh --levels 10,12,15,18,20,25,30 --warmup 60 --measure 300
 #   ./scripts/kv-benefit-comparison.sh --skip-kv --rr-tsv dev/kv-benefit-test-roundrobin-*.tsv
 #   ./scripts/kv-benefit-comparison.sh --skip-roundrobin --kv-tsv dev/kv-benefit-test-kv-*.tsv
+#   ./scripts/kv-benefit-comparison.sh --paired --rounds 2 --levels 10,20,30 --measure 120
 
 set -euo pipefail
 
@@ -30,6 +37,8 @@ SKIP_RR=false
 KV_TSV=""
 RR_TSV=""
 COOLDOWN=30
+PAIRED=false
+ROUNDS=2
 
 # ── Argument parsing ────────────────────────────────────────────────────────
 usage() {
@@ -49,6 +58,8 @@ Options:
   --skip-roundrobin   Skip round-robin test (use --rr-tsv for existing results)
   --kv-tsv FILE       Reuse existing KV-mode TSV instead of running test
   --rr-tsv FILE       Reuse existing round-robin TSV instead of running test
+  --paired            Interleave the modes in ABBA blocks per level (paired analysis)
+  --rounds N          ABBA rounds per level with --paired (default: $ROUNDS)
   --context NAME      kubectl context (default: $CONTEXT)
   -h, --help          Show this help
 EOF
@@ -65,12 +76,24 @@ while [[ $# -gt 0 ]]; do
     --skip-roundrobin) SKIP_RR=true; shift ;;
     --kv-tsv)          KV_TSV="$2"; SKIP_KV=true; shift 2 ;;
     --rr-tsv)          RR_TSV="$2"; SKIP_RR=true; shift 2 ;;
+    --paired)          PAIRED=true; shift ;;
+    --rounds)          ROUNDS="$2"; shift 2 ;;
     --context)         CONTEXT="$2"; shift 2 ;;
     -h|--help)         usage; exit 0 ;;
     *)                 echo "Unknown option: $1"; usage; exit 1 ;;
   esac
 done
 
+if $PAIRED && ($SKIP_KV || $SKIP_RR); then
+  echo "--paired runs both modes; it cannot be combined with --skip-* or --*-tsv"
+  exit 1
+fi
+if [[ "$WARMUP" == "auto" ]]; then
+  WARMUP_EST=300
+else
+  WARMUP_EST=$WARMUP
+fi
+
 # ── Logging helpers ──────────────────────────────────────────────────────────
 info() { echo "[$(date +%H:%M:%S)] INFO  $*"; }
 warn() { echo "[$(date +%H:%M:%S)] WARN  $*" >&2; }
@@ -152,6 +175,29 @@ wait_for_workers() {
   return 1
 }
 
+# Wait out a frontend restart after a mode patch; if the workers were
+# restarted too, wait for them to come back and reload the model.
+settle_after_switch() {
+  local workers_after
+  workers_after=$(get_worker_pods)
+  if [[ "$WORKERS_BEFORE" != "$workers_after" ]]; then
+    warn "Worker pods changed after Frontend patch!"
+    warn "  Before: $(echo "$WORKERS_BEFORE" | tr '\n' ' ')"
+    warn "  After:  $(echo "$workers_after" | tr '\n' ' ')"
+    warn "Waiting for workers to reload model (~10 min)..."
+    wait_for_workers "$WORKER_COUNT" 900
+
+    # Wait extra for model to load after pods are Running
+    info "Workers running — waiting 120s for model initialization..."
+    sleep 120
+    WORKERS_BEFORE=$(get_worker_pods)
+  else
+    info "Worker pods unchanged (as expected for Frontend-only patch)"
+    # Small settle time after frontend restart
+    sleep 10
+  fi
+}
+
 # ── Cleanup / restore ────────────────────────────────────────────────────────
 ORIGINAL_MODE=""
 cleanup() {
@@ -210,8 +256,12 @@ info "  Worker pods: $(echo "$WORKERS_BEFORE" | tr '\n' ' ')"
 
 # ── Banner ──────────────────────────────────────────────────────────────────
 NUM_LEVELS=$(echo "$LEVELS" | tr ',' '\n' | wc -l)
-EST_PER_RUN=$(( NUM_LEVELS * (WARMUP + MEASURE + 10) / 60 ))
+EST_PER_RUN=$(( NUM_LEVELS * (WARMUP_EST + MEASURE + 10) / 60 ))
 EST_TOTAL=$(( EST_PER_RUN * 2 + 3 ))
+if $PAIRED; then
+  # 4 blocks per round, 2 mode switches (~1 min each) per round
+  EST_TOTAL=$(( EST_PER_RUN * ROUNDS * 4 + NUM_LEVELS * ROUNDS * 2 + 3 ))
+fi
 
 echo ""
 echo "╔══════════════════════════════════════════════════════════╗"
@@ -219,8 +269,12 @@ echo "║         KV Routing A/B Comparison Test                   ║"
 echo "╠══════════════════════════════════════════════════════════╣"
 printf "║  Levels:      %-42s║\n" "$LEVELS"
 printf "║  Per level:   %-42s║\n" "${WARMUP}s warmup + ${MEASURE}s measure"
-printf "║  Phase A:     %-42s║\n" "$(if $SKIP_KV; then echo "SKIP (using $KV_TSV)"; else echo "KV-aware routing"; fi)"
-printf "║  Phase B:     %-42s║\n" "$(if $SKIP_RR; then echo "SKIP (using $RR_TSV)"; else echo "Round-robin baseline"; fi)"
+if $PAIRED; then
+  printf "║  Schedule:    %-42s║\n" "ABBA x ${ROUNDS} per level ($(( NUM_LEVELS * ROUNDS * 4 )) blocks)"
+else
+  printf "║  Phase A:     %-42s║\n" "$(if $SKIP_KV; then echo "SKIP (using $KV_TSV)"; else echo "KV-aware routing"; fi)"
+  printf "║  Phase B:     %-42s║\n" "$(if $SKIP_RR; then echo "SKIP (using $RR_TSV)"; else echo "Round-robin baseline"; fi)"
+fi
 printf "║  Estimated:   %-42s║\n" "~${EST_TOTAL} min total"
 printf "║  Output:      %-42s║\n" "$OUTPUT_DIR/"
 echo "╚══════════════════════════════════════════════════════════╝"
@@ -228,6 +282,76 @@ echo ""
 
 mkdir -p "$OUTPUT_DIR"
 
+# ── Paired mode: interleaved ABBA blocks ────────────────────────────────────
+if $PAIRED; then
+  PAIRED_DIR="${OUTPUT_DIR}/kv-paired-$(date +%Y%m%d-%H%M%S)"
+  SCHEDULE="${PAIRED_DIR}/schedule.tsv"
+  mkdir -p "$PAIRED_DIR"
+  printf "block\tround\tconcurrency\tmode\tswitch_sec\tstarted\tended\ttsv\n" > "$SCHEDULE"
+
+  block=0
+  for level in ${LEVELS//,/ }; do
+    for ((round = 1; round <= ROUNDS; round++)); do
+      for mode in kv round_robin round_robin kv; do
+        block=$((block + 1))
+        label="b${block}-${mode//_/}"
+        echo ""
+        echo "═══════════════════════════════════════════════════════════"
+        echo "  Block ${block}: concurrency ${level}, round ${round}, ${mode}"
+        echo "═══════════════════════════════════════════════════════════"
+
+        switch_start=$(date +%s)
+        if [[ "$(get_routing_mode)" != "$mode" ]]; then
+          set_routing_mode "$mode"
+          verify_frontend_mode "$mode" 180
+          settle_after_switch
+        fi
+        switch_sec=$(( $(date +%s) - switch_start ))
+
+        started=$(date -u +%Y-%m-%dT%H:%M:%SZ)
+        python3 "${SCRIPT_DIR}/kv-benefit-test.py" \
+          --levels "$level" \
+          --rps "$RPS" \
+          --warmup "$WARMUP" \
+          --measure "$MEASURE" \
+          --output-dir "$PAIRED_DIR" \
+          --label "$label"
+        ended=$(date -u +%Y-%m-%dT%H:%M:%SZ)
+
+        block_tsv=$(ls -t "${PAIRED_DIR}"/kv-benefit-test-${label}-*[0-9].tsv 2>/dev/null | head -1)
+        if [[ -z "$block_tsv" ]]; then
+          warn "Block ${block} produced no TSV; its pair will be skipped"
+        fi
+        printf "%d\t%d\t%s\t%s\t%d\t%s\t%s\t%s\n" \
+          "$block" "$round" "$level" "$mode" "$switch_sec" "$started" "$ended" \
+          "$(basename "${block_tsv:-missing}")" >> "$SCHEDULE"
+      done
+    done
+  done
+
+  if [[ "$(get_routing_mode)" != "$ORIGINAL_MODE" ]]; then
+    info "Restoring routing mode → ${ORIGINAL_MODE}"
+    set_routing_mode "$ORIGINAL_MODE"
+    verify_frontend_mode "$ORIGINAL_MODE" 120
+  fi
+  ORIGINAL_MODE=""
+
+  echo ""
+  echo "═══════════════════════════════════════════════════════════"
+  echo "  Paired comparison"
+  echo "═══════════════════════════════════════════════════════════"
+
+  python3 "${SCRIPT_DIR}/compare-kv-results.py" \
+    --paired "$SCHEDULE" \
+    --output-dir "$OUTPUT_DIR"
+
+  echo ""
+  info "Paired A/B comparison complete."
+  info "  Schedule:    ${SCHEDULE}"
+  info "  Comparison:  ${OUTPUT_DIR}/kv-paired-comparison-*.tsv"
+  exit 0
+fi
+
 # ── Phase A: KV-aware routing ───────────────────────────────────────────────
 if ! $SKIP_KV; then
   echo ""
@@ -254,7 +378,7 @@ if ! $SKIP_KV; then
     --label kv
 
   # Find the output file (most recent kv-benefit-test-kv-*.tsv)
-  KV_TSV=$(ls -t "${OUTPUT_DIR}"/kv-benefit-test-kv-*.tsv 2>/dev/null | head -1)
+  KV_TSV=$(ls -t "${OUTPUT_DIR}"/kv-benefit-test-kv-*[0-9].tsv 2>/dev/null | head -1)
   if [[ -z "$KV_TSV" ]]; then
     err "KV test completed but no output TSV found"
     exit 1
@@ -292,22 +416,7 @@ if ! $SKIP_RR; then
   verify_frontend_mode "round_robin" 180
 
   # Check if workers survived the patch
-  WORKERS_AFTER=$(get_worker_pods)
-  if [[ "$WORKERS_BEFORE" != "$WORKERS_AFTER" ]]; then
-    warn "Worker pods changed after Frontend patch!"
-    warn "  Before: $(echo "$WORKERS_BEFORE" | tr '\n' ' ')"
-    warn "  After:  $(echo "$WORKERS_AFTER" | tr '\n' ' ')"
-    warn "Waiting for workers to reload model (~10 min)..."
-    wait_for_workers "$WORKER_COUNT" 900
-
-    # Wait extra for model to load after pods are Running
-    info "Workers running — waiting 120s for model initialization..."
-    sleep 120
-  else
-    info "Worker pods unchanged (as expected for Frontend-only patch)"
-    # Small settle time after frontend restart
-    sleep 10
-  fi
+  settle_after_switch
 
   info "Running kv-benefit-test.py --label roundrobin ..."
   python3 "${SCRIPT_DIR}/kv-benefit-test.py" \
@@ -319,7 +428,7 @@ if ! $SKIP_RR; then
     --label roundrobin
 
   # Find the output file
-  RR_TSV=$(ls -t "${OUTPUT_DIR}"/kv-benefit-test-roundrobin-*.tsv 2>/dev/null | head -1)
+  RR_TSV=$(ls -t "${OUTPUT_DIR}"/kv-benefit-test-roundrobin-*[0-9].tsv 2>/dev/null | head -1)
   if [[ -z "$RR_TSV" ]]; then
     err "Round-robin test completed but no output TSV found"
     exit 1
@@ -5,7 +5,27 @@ benefits disappear due to queuing.
 
 Steps through increasing concurrency levels, collects per-request TTFT via
 the load generator websocket, and separates initial turns (t0) from follow-up
-turns (t1+) to measure the KV cache TTFT speedup at each level.
+turns (t1+) to measure the KV cache TTFT speedup at each level. With
+--search, only the ends of --levels are fixed: the bracket is widened and
+bisected until the marginal (<1.15x) and gone (<1.05x) thresholds are each
+pinned to within --resolution, reusing every level already measured.
+
+Every level's raw events are recorded next to the TSV (see
+loadgen_events.py); --replay re-runs the analysis and summary over such a
+recording offline, with optional time windows and per-turn/workload/
+conversation breakdowns (requires numpy).
+
+Latency percentiles come from mergeable sketches (latency_sketch.py,
+within 1% of the exact value) that are updated as events arrive and printed
+periodically during measurement. The TTFT sketches are written into the TSV
+and every level's full set goes to a .sketches.json sidecar, so runs can be
+merged exactly later. --live tty|json adds a once-a-second rolling view
+(live_dashboard.py) while each level measures.
+
+The load generator drops scheduler ticks while maxConcurrency requests are in
+flight, so the events only describe admitted requests. Each level also
+rebuilds the intended arrivals at --rps. It reports the dropped ticks and
+an initial TTFT corrected for the time each conversation waited to be admitted.
 
 Prerequisites:
   - Port-forward load generator:  kubectl port-forward svc/loadgen 3000:3000 -n dynamo-workload &
@@ -15,38 +35,60 @@ Usage:
   python3 scripts/kv-benefit-test.py
   python3 scripts/kv-benefit-test.py --levels 10,12,15,18,20,25,30
   python3 scripts/kv-benefit-test.py --warmup 60 --measure 90 --rps 10
+  python3 scripts/kv-benefit-test.py --search --levels 8,32
+  python3 scripts/kv-benefit-test.py --replay dev/kv-benefit-test-20260301-101500 --since 30
 """
 
 import argparse
 import asyncio
 import json
 import math
-import re
-import statistics
 import subprocess
 import sys
 import time
+from bisect import bisect_right
 from datetime import datetime
 from pathlib import Path
+from statistics import NormalDist
 from urllib.error import URLError
 from urllib.request import Request, urlopen
 
-try:
-    import websockets
-except ImportError:
-    print("ERROR: websockets library required. Install with: pip install websockets")
-    sys.exit(1)
+from latency_sketch import LatencySketch
+from live_dashboard import LiveDashboard
+from loadgen_events import NO_TURN, EventRecorder, read_arrays, split_item_id
+from prom_client import PromClient
+from steady_state import load_test_detector
+
+# Imported by load_websockets() so that --replay works without it
+websockets = None
 
 # ── Defaults ──────────────────────────────────────────────────────────────────
 LOADGEN_URL = "http://localhost:3000"
 WS_URL = "ws://localhost:3000/ws"
 PROM_URL = "http://localhost:9090"
-TURN_REGEX = re.compile(r"-t(\d+)$")
 
 DEFAULT_LEVELS = [10, 12, 15, 18, 20, 25, 30]
 DEFAULT_RPS = 10.0
 WARMUP_SEC = 60
+# --warmup auto: upper bound, and how often active/queue are polled meanwhile
+WARMUP_MAX_SEC = 300
+STEADY_POLL_SEC = 2
 MEASURE_SEC = 120
+PROGRESS_SEC = 15
+
+# Follow-up/initial TTFT p50 ratio below which the KV benefit is marginal / gone
+MARGINAL_SPEEDUP = 1.15
+GONE_SPEEDUP = 1.05
+SEARCH_MAX_CONCURRENCY = 64
+SEARCH_RESOLUTION = 2
+
+# Early stopping (--ci-width): interval confidence and the floor before a level may stop
+CONFIDENCE = 0.95
+MIN_MEASURE_SEC = 20
+MIN_CI_SAMPLES = 30
+
+# Dropped share of the intended ticks above which a level is flagged as not open-loop
+DROPPED_WARN_PCT = 5.0
 
 # Prometheus label selectors (must match capacity-test.sh)
 FRONTEND_NS = 'dynamo_namespace="dynamo-workload-gtc-demo"'
@@ -57,6 +99,16 @@ LOADGEN_NS = "dynamo-workload"
 PROM_NS = "monitoring"
 PROM_SVC = "kube-prometheus-stack-prometheus"
 
+
+def load_websockets():
+    try:
+        import websockets
+    except ImportError:
+        print("ERROR: websockets library required. Install with: pip install websockets")
+        sys.exit(1)
+    return websockets
+
+
 # ── Port-forward management ──────────────────────────────────────────────────
 port_forward_procs = []
 
@@ -76,20 +128,24 @@ def start_port_forward(svc, local_port, remote_port, namespace, label):
         sock.close()
 
     print(f"  Starting port-forward: {label} → localhost:{local_port}")
-    proc = subprocess.Popen(
-        [
-            "kubectl",
-            "--context",
-            KUBE_CONTEXT,
-            "port-forward",
-            f"svc/{svc}",
-            f"{local_port}:{remote_port}",
-            "-n",
-            namespace,
-        ],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-    )
+    try:
+        proc = subprocess.Popen(
+            [
+                "kubectl",
+                "--context",
+                KUBE_CONTEXT,
+                "port-forward",
+                f"svc/{svc}",
+                f"{local_port}:{remote_port}",
+                "-n",
+                namespace,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        print(f"  ERROR: kubectl not found; start {label} on localhost:{local_port} yourself")
+        return False
     port_forward_procs.append(proc)
 
     # Wait for it to be ready
@@ -164,81 +220,356 @@ def stop_workload():
 # ── Prometheus queries ────────────────────────────────────────────────────────
 
 
+PROM = PromClient(PROM_URL)
+
+
 def prom_query(query):
     """Execute a Prometheus instant query, return float or None."""
-    try:
-        from urllib.parse import urlencode
+    return PROM.query(query)
 
-        url = f"{PROM_URL}/api/v1/query?{urlencode({'query': query})}"
-        req = Request(url, method="GET")
-        with urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read())
 
-        if data["status"] != "success" or not data["data"]["result"]:
-            return None
+QUEUE_QUERY = f'sum(dynamo_frontend_queued_requests{{{FRONTEND_NS}}}) or vector(0)'
 
-        val = float(data["data"]["result"][0]["value"][1])
-        if math.isnan(val) or math.isinf(val):
-            return None
-        return val
-    except Exception:
-        return None
+PROM_METRICS = {
+    "queue_depth": QUEUE_QUERY,
+    "kv_hit_rate": f'avg(dynamo_component_kvstats_gpu_prefix_cache_hit_rate{{{COMPONENT_NS}}}) or vector(0)',
+    "kv_usage": f'avg(dynamo_component_kvstats_gpu_cache_usage_percent{{{COMPONENT_NS}}}) or vector(0)',
+}
 
 
 def collect_prometheus_metrics():
-    """Collect queue depth, KV hit rate, KV usage, GPU util from Prometheus."""
-    queue = prom_query(
-        f'sum(dynamo_frontend_queued_requests{{{FRONTEND_NS}}}) or vector(0)'
-    )
-    kv_hit = prom_query(
-        f'avg(dynamo_component_kvstats_gpu_prefix_cache_hit_rate{{{COMPONENT_NS}}}) or vector(0)'
-    )
-    kv_usage = prom_query(
-        f'avg(dynamo_component_kvstats_gpu_cache_usage_percent{{{COMPONENT_NS}}}) or vector(0)'
-    )
-    return {
-        "queue_depth": queue,
-        "kv_hit_rate": kv_hit,
-        "kv_usage": kv_usage,
-    }
+    """Collect queue depth, KV hit rate and KV usage from Prometheus (concurrently)."""
+    return PROM.query_many(PROM_METRICS)
+
+
+# ── Prefill model (TTFT by turn depth and input length) ─────────────────────
+
+# Upper edges of the input-token buckets; the last bucket is open-ended
+INPUT_BUCKETS = (512, 1024, 2048, 4096, 8192, 16384)
+
+
+def input_bucket_label(i):
+    lo = INPUT_BUCKETS[i - 1] if i > 0 else 0
+    return f"{lo}-{INPUT_BUCKETS[i]}" if i < len(INPUT_BUCKETS) else f"{lo}+"
+
+
+class PrefillModel:
+    """TTFT by turn and by input-token bucket, plus the fit TTFT ≈ a + b·uncached.
+
+    Only requests that reported token usage (inputTokens) count. b is the
+    marginal prefill cost in ms per uncached token, so 1000 / b is the
+    effective prefill throughput and b · cached tokens is the time the
+    prefix cache saved. add() takes one request, add_arrays() NumPy columns.
+    """
+
+    def __init__(self):
+        # key -> [TTFT sketch, input token sum, cached token sum]
+        self.turns = {}
+        self.buckets = {}
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    @staticmethod
+    def _group(groups, key):
+        if key not in groups:
+            groups[key] = [LatencySketch(), 0, 0]
+        return groups[key]
+
+    def add(self, turn, input_tokens, cached_tokens, ttft_ms):
+        if not input_tokens:
+            return
+        groups = [self._group(self.buckets, bisect_right(INPUT_BUCKETS, input_tokens))]
+        if turn != NO_TURN:
+            groups.append(self._group(self.turns, turn))
+        for group in groups:
+            group[0].add(ttft_ms)
+            group[1] += input_tokens
+            group[2] += cached_tokens
+        x = input_tokens - cached_tokens
+        self.n += 1
+        self.sx += x
+        self.sy += ttft_ms
+        self.sxx += x * x
+        self.sxy += x * ttft_ms
+
+    def add_arrays(self, turn, input_tokens, cached_tokens, ttft_ms):
+        import numpy as np
+
+        keep = input_tokens > 0
+        turn, ttft_ms = turn[keep], ttft_ms[keep].astype(np.float64)
+        input_tokens = input_tokens[keep].astype(np.int64)
+        cached_tokens = cached_tokens[keep].astype(np.int64)
+        for groups, keys in ((self.turns, turn), (self.buckets, np.searchsorted(INPUT_BUCKETS, input_tokens, "right"))):
+            for key in np.unique(keys):
+                if groups is self.turns and key == NO_TURN:
+                    continue
+                sel = keys == key
+                group = self._group(groups, int(key))
+                group[0].merge(LatencySketch.from_array(ttft_ms[sel]))
+                group[1] += int(input_tokens[sel].sum())
+                group[2] += int(cached_tokens[sel].sum())
+        x = (input_tokens - cached_tokens).astype(np.float64)
+        self.n += int(x.size)
+        self.sx += float(x.sum())
+        self.sy += float(ttft_ms.sum())
+        self.sxx += float((x * x).sum())
+        self.sxy += float((x * ttft_ms).sum())
+
+    def fit(self):
+        """(a ms, b ms per uncached token) by least squares, or None if underdetermined."""
+        det = self.n * self.sxx - self.sx * self.sx
+        if self.n < 3 or det <= 0:
+            return None
+        b = (self.n * self.sxy - self.sx * self.sy) / det
+        return (self.sy - b * self.sx) / self.n, b
+
+    def summary(self):
+        fit = self.fit()
+        a, b = fit if fit else (None, None)
+
+        def rows(groups, label):
+            out = []
+            for key in sorted(groups):
+                sketch, input_sum, cached_sum = groups[key]
+                mean_cached = cached_sum / sketch.count
+                out.append({
+                    "key": label(key),
+                    "count": sketch.count,
+                    "p50": sketch.percentile(50),
+                    "p95": sketch.percentile(95),
+                    "mean_input": input_sum / sketch.count,
+                    "mean_cached": mean_cached,
+                    "saved_ms": b * mean_cached if b is not None else None,
+                })
+            return out
+
+        followups = [g for turn, g in self.turns.items() if turn > 0]
+        followup_cached = sum(g[2] for g in followups) / max(sum(g[0].count for g in followups), 1)
+        return {
+            "samples": self.n,
+            "fit_a_ms": a,
+            "fit_b_ms": b,
+            "prefill_tok_s": 1000.0 / b if b and b > 0 else None,
+            "saved_ms": b * followup_cached if b is not None and followups else None,
+            "turns": rows(self.turns, lambda t: f"t{t}"),
+            "buckets": rows(self.buckets, input_bucket_label),
+        }
+
+
+# ── Coordinated omission (intended vs admitted arrivals) ────────────────────
+
+
+class ArrivalModel:
+    """Admission accounting for the load generator's open-loop scheduler.
+
+    The scheduler fires a tick every 1/RPS seconds and silently drops it while
+    maxConcurrency requests are in flight. A chat tick starts a whole
+    conversation, so only t0 turns and non-chat requests mark dispatches
+    (dispatch = completedAt - latencyMs). summary() rebuilds the intended
+    arrivals as a tick grid anchored at the first dispatch and serves them
+    FIFO: the k-th dispatch answers the k-th intended tick, and the gap is
+    time spent waiting for admission. Intended ticks left unserved are the
+    dropped ticks; the corrected initial TTFT adds each t0's wait.
+
+    Only dispatches after the first completion, and early enough that they
+    must have completed (last completion - slowest dispatch latency), are
+    counted. Any backlog from before the window is taken as empty, so the
+    correction is a lower bound.
+    """
+
+    def __init__(self, rps):
+        self.interval_ms = 1000.0 / rps
+        # (dispatch epoch ms, t0 TTFT ms or None)
+        self.dispatches = []
+        self.first_completed = math.inf
+        self.last_completed = -math.inf
+        self.max_latency = 0.0
+
+    def add(self, turn, ok, completed_at, latency_ms, ttft_ms):
+        if not completed_at:
+            return
+        self.first_completed = min(self.first_completed, completed_at)
+        self.last_completed = max(self.last_completed, completed_at)
+        if turn not in (0, NO_TURN):
+            return
+        self.max_latency = max(self.max_latency, latency_ms)
+        self.dispatches.append((completed_at - latency_ms, ttft_ms if ok and turn == 0 else None))
+
+    def add_arrays(self, turn, ok, completed_at, latency_ms, ttft_ms):
+        import numpy as np
+
+        if not completed_at.size:
+            return
+        self.first_completed = min(self.first_completed, float(completed_at.min()))
+        self.last_completed = max(self.last_completed, float(completed_at.max()))
+        sel = (turn == 0) | (turn == NO_TURN)
+        if not sel.any():
+            return
+        latency_ms = latency_ms[sel].astype(np.float64)
+        self.max_latency = max(self.max_latency, float(latency_ms.max()))
+        dispatch = (completed_at[sel] - latency_ms).tolist()
+        ttft = np.where(ok[sel] & (turn[sel] == 0), ttft_ms[sel], np.nan).tolist()
+        self.dispatches.extend((d, None if t != t else t) for d, t in zip(dispatch, ttft))
+
+    def tick_interval(self, times):
+        """Effective tick period: the median near-nominal gap, since setInterval runs slightly slow."""
+        nominal = self.interval_ms
+        gaps = sorted(b - a for a, b in zip(times, times[1:]) if 0.5 * nominal < b - a < 1.5 * nominal)
+        if len(gaps) < 10:
+            return nominal
+        return min(max(gaps[len(gaps) // 2], nominal), 1.1 * nominal)
+
+    def summary(self):
+        horizon = self.last_completed - self.max_latency
+        # Sort on the time only: tied dispatches may carry a TTFT and None
+        kept = sorted((d for d in self.dispatches if self.first_completed <= d[0] <= horizon), key=lambda d: d[0])
+        if len(kept) < 2:
+            return None
+        interval = self.tick_interval([d for d, _ in kept])
+        anchor = kept[0][0]
+        # Never below the dispatches (jitter at the edges, or a recording's rps is off)
+        intended = max(int((horizon - anchor) // interval) + 1, len(kept))
+        wait, ttft = LatencySketch(), LatencySketch()
+        for k, (dispatch, t0_ttft) in enumerate(kept):
+            w = max(0.0, dispatch - (anchor + k * interval))
+            wait.add(w)
+            if t0_ttft is not None:
+                ttft.add(t0_ttft + w)
+        dropped = intended - len(kept)
+        return {
+            "interval_ms": interval,
+            "intended": intended,
+            "dispatched": len(kept),
+            "dropped": dropped,
+            "dropped_pct": 100.0 * dropped / intended,
+            "wait": wait.stats(),
+            "initial_ttft": ttft.stats(),
+        }
 
 
 # ── Statistics ────────────────────────────────────────────────────────────────
 
 
-def percentile(values, p):
-    """Compute percentile using linear interpolation."""
-    if not values:
-        return 0.0
-    sorted_vals = sorted(values)
-    n = len(sorted_vals)
-    idx = (p / 100.0) * (n - 1)
-    lo = int(math.floor(idx))
-    hi = min(int(math.ceil(idx)), n - 1)
-    if lo == hi:
-        return sorted_vals[lo]
-    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (idx - lo)
-
-
-def compute_stats(values):
-    """Compute count, mean, p50, p95 for a list of values."""
-    if not values:
-        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0}
-    return {
-        "count": len(values),
-        "mean": statistics.mean(values),
-        "p50": percentile(values, 50),
-        "p95": percentile(values, 95),
+class LevelStats:
+    """Streaming statistics for one level, split by turn (t0 = initial, t1+ = follow-up).
+
+    Each metric goes into a mergeable latency sketch (see latency_sketch.py):
+    O(1) per event, percentiles available at any time during measurement,
+    and serializable so levels and runs can be merged later. With rps, every
+    event also feeds the ArrivalModel (dropped ticks, admission wait).
+    """
+
+    METRICS = (("ttft", "ttftMs"), ("itl", "itlMs"), ("latency", "latencyMs"))
+
+    def __init__(self, rps=None):
+        self.sketches = {
+            f"{side}_{metric}": LatencySketch()
+            for side in ("initial", "followup")
+            for metric, _ in self.METRICS
+        }
+        self.conversations = set()
+        self.total_events = 0
+        self.prefill = PrefillModel()
+        self.arrivals = ArrivalModel(rps) if rps else None
+
+    def add_row(self, ev):
+        """Add a recorded row (see loadgen_events.iter_events).
+
+        Failures only count as dispatches; non-chat items only feed the
+        prefill and arrival models.
+        """
+        turn = ev["turn"]
+        if self.arrivals is not None:
+            self.arrivals.add(turn, ev["status"] == "ok", ev.get("completedAt") or 0,
+                              ev.get("latencyMs") or 0, ev.get("ttftMs") or 0)
+        if ev["status"] != "ok":
+            return
+        self.prefill.add(turn, ev.get("inputTokens") or 0, ev.get("cachedTokens") or 0, ev.get("ttftMs") or 0)
+        if not ev["conversation"] or turn == NO_TURN:
+            return
+        self.total_events += 1
+        self.conversations.add(ev["conversation"])
+        side = "initial" if turn == 0 else "followup"
+        for metric, field in self.METRICS:
+            self.sketches[f"{side}_{metric}"].add(ev.get(field) or 0)
+
+    def add_event(self, data):
+        """Add a raw request_complete payload."""
+        conversation, turn = split_item_id(data.get("itemId") or "")
+        self.add_row({**data, "conversation": conversation, "turn": turn})
+
+    def progress(self):
+        i, f = self.sketches["initial_ttft"], self.sketches["followup_ttft"]
+        return (
+            f"t0 TTFT p50/p95/p99={i.percentile(50):.0f}/{i.percentile(95):.0f}/{i.percentile(99):.0f}ms (n={i.count})  "
+            f"t1+ {f.percentile(50):.0f}/{f.percentile(95):.0f}/{f.percentile(99):.0f}ms (n={f.count})"
+        )
+
+    def summary(self):
+        stats = {name: sketch.stats() for name, sketch in self.sketches.items()}
+        i_ttft, f_ttft = stats["initial_ttft"], stats["followup_ttft"]
+        return {
+            **stats,
+            "speedup_ratio": i_ttft["p50"] / f_ttft["p50"] if f_ttft["p50"] > 0 else 0.0,
+            "delta_ms": i_ttft["p50"] - f_ttft["p50"],
+            "total_events": self.total_events,
+            "conversations": len(self.conversations),
+            "sketches": self.sketches,
+            "ci": confidence_intervals(self.sketches),
+            "prefill": self.prefill.summary(),
+            **({"arrivals": self.arrivals.summary()} if self.arrivals else {}),
+        }
+
+    def converged(self, ci_width, min_samples=MIN_CI_SAMPLES):
+        """True once both turn groups have min_samples and every interval is within ci_width."""
+        if min(self.sketches["initial_ttft"].count, self.sketches["followup_ttft"].count) < min_samples:
+            return False
+        return confidence_intervals(self.sketches)["width"] <= ci_width
+
+
+def confidence_intervals(sketches, confidence=CONFIDENCE):
+    """Confidence intervals for the TTFT speedup and the t0/t1+ TTFT p95.
+
+    Intervals are distribution-free order-statistic bounds read from the
+    sketches. The speedup (p50 ratio) interval combines the two p50 intervals
+    at half the error rate each, so it covers at least confidence. "width" is
+    the widest interval relative to its own estimate.
+    """
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    z_pair = NormalDist().inv_cdf(1 - (1 - confidence) / 4)
+    i_ttft, f_ttft = sketches["initial_ttft"], sketches["followup_ttft"]
+    i_lo, i_hi = i_ttft.quantile_interval(0.5, z_pair)
+    f_lo, f_hi = f_ttft.quantile_interval(0.5, z_pair)
+    f_p50 = f_ttft.quantile(0.5)
+    estimates = {
+        "speedup": i_ttft.quantile(0.5) / f_p50 if f_p50 > 0 else 0.0,
+        "initial_ttft_p95": i_ttft.percentile(95),
+        "followup_ttft_p95": f_ttft.percentile(95),
+    }
+    ci = {
+        "speedup": (i_lo / f_hi if f_hi > 0 else 0.0, i_hi / f_lo if f_lo > 0 else math.inf),
+        "initial_ttft_p95": i_ttft.quantile_interval(0.95, z),
+        "followup_ttft_p95": f_ttft.quantile_interval(0.95, z),
     }
+    ci["width"] = max(
+        (hi - lo) / estimates[name] if estimates[name] > 0 else math.inf
+        for name, (lo, hi) in ci.items()
+    )
+    return ci
 
 
 # ── Websocket event collection ───────────────────────────────────────────────
 
 
-async def collect_events(duration_sec):
-    """Connect to websocket, collect request_complete events for duration_sec."""
-    events = []
-    deadline = time.time() + duration_sec
+async def stream_events(duration_sec, on_event, on_tick=None):
+    """Connect to websocket and pass request_complete payloads to on_event for duration_sec.
+
+    on_tick(elapsed_sec), if given, runs about once a second (events or
+    not) and ends streaming early by returning True. Returns seconds streamed.
+    """
+    start = time.time()
+    deadline = start + duration_sec
+    next_tick = start + 1
     reconnect_delay = 1
 
     while time.time() < deadline:
@@ -249,15 +580,18 @@ async def collect_events(duration_sec):
                     remaining = deadline - time.time()
                     if remaining <= 0:
                         break
+                    if on_tick is not None and time.time() >= next_tick:
+                        next_tick += 1
+                        if on_tick(time.time() - start):
+                            deadline = time.time()
+                            break
                     try:
                         raw = await asyncio.wait_for(
-                            ws.recv(), timeout=min(2.0, remaining)
+                            ws.recv(), timeout=min(1.0, remaining)
                         )
                         msg = json.loads(raw)
                         if msg.get("type") == "request_complete":
-                            data = msg["data"]
-                            if data.get("status") == "ok" and data.get("itemId"):
-                                events.append(data)
+                            on_event(msg["data"])
                     except asyncio.TimeoutError:
                         continue
         except (
@@ -273,297 +607,629 @@ async def collect_events(duration_sec):
             await asyncio.sleep(wait)
             reconnect_delay = min(reconnect_delay * 2, 10)
 
-    return events
+    return time.time() - start
+
+
+async def collect_events(duration_sec, recorder, stats=None, progress_sec=PROGRESS_SEC, stop_when=None,
+                         dashboard=None):
+    """Stream request_complete events for duration_sec into recorder.
+
+    With stats (a LevelStats), events are also added to it and running
+    percentiles are printed every progress_sec. stop_when, if given, is
+    polled about once a second and ends collection early when it returns True.
+    A LiveDashboard gets every event too and is shown while collecting; in
+    tty mode it replaces the progress lines.
+    """
+    next_progress = progress_sec
+    progress = stats is not None and (dashboard is None or dashboard.mode != "tty")
+
+    def on_event(data):
+        recorder.append(data)
+        if stats is not None:
+            stats.add_event(data)
+        if dashboard is not None:
+            dashboard.add_event(data)
+
+    def on_tick(elapsed):
+        nonlocal next_progress
+        if progress and elapsed >= next_progress:
+            print(f"│  [{elapsed:>4.0f}s] {stats.progress()}")
+            next_progress += progress_sec
+        return stop_when is not None and stop_when()
+
+    if dashboard is not None:
+        dashboard.start()
+    try:
+        await stream_events(duration_sec, on_event, on_tick)
+    finally:
+        if dashboard is not None:
+            dashboard.close()
+    recorder.flush()
+    return len(recorder)
+
+
+async def wait_for_steady_state(max_sec, progress_sec=PROGRESS_SEC):
+    """Warm up until TTFT, active requests and queue depth stop drifting.
+
+    TTFT comes from the websocket, active requests from /api/status and queue
+    depth from Prometheus; see steady_state.py for the test. Returns the
+    warmup seconds (max_sec at most).
+    """
+    detector = load_test_detector(max_sec=max_sec)
+    next_progress = progress_sec
+
+    def on_event(data):
+        if data.get("status") == "ok":
+            # Bucket by completion time, not receipt: a stalled read must not bunch samples.
+            # Capped at now, as the stand-in's completedAt runs ahead when time-scaled.
+            completed = data.get("completedAt")
+            t = min(completed / 1000.0, time.time()) if completed else None
+            detector.add("ttft", data.get("ttftMs"), t)
+
+    async def poll():
+        # Off the event loop: a slow API or Prometheus must not stall the websocket reads
+        while True:
+            t = time.time()
+            status, queue = await asyncio.gather(asyncio.to_thread(get_status),
+                                                 asyncio.to_thread(prom_query, QUEUE_QUERY))
+            if status:
+                detector.add("active", status.get("activeRequests"), t)
+            detector.add("queue", queue, t)
+            await asyncio.sleep(max(0.0, t + STEADY_POLL_SEC - time.time()))
+
+    def on_tick(elapsed):
+        nonlocal next_progress
+        if elapsed >= next_progress:
+            print(f"│  [{elapsed:>4.0f}s] {detector.status()}")
+            next_progress += progress_sec
+        return detector.check()
+
+    poller = asyncio.create_task(poll())
+    try:
+        waited = await stream_events(max_sec, on_event, on_tick)
+    finally:
+        poller.cancel()
+    if detector.steady_at is None:
+        print(f"│  No steady state within {max_sec}s ({detector.status()}) — measuring anyway")
+        return waited
+    print(f"│  Steady after {detector.steady_at:.0f}s ({detector.status()})")
+    return detector.steady_at
 
 
 def analyze_events(events):
-    """Separate events by turn number (t0 = initial, t1+ = follow-up)."""
-    initial_ttfts = []
-    followup_ttfts = []
-    initial_itls = []
-    followup_itls = []
-    initial_latencies = []
-    followup_latencies = []
-    conversations = set()
+    """Separate recorded rows by turn number (t0 = initial, t1+ = follow-up).
 
+    events is any iterable of recorded rows (see loadgen_events.iter_events).
+    """
+    stats = LevelStats()
     for ev in events:
-        item_id = ev.get("itemId", "")
-        match = TURN_REGEX.search(item_id)
-        if not match:
-            continue
-
-        turn = int(match.group(1))
-        conv_id = item_id[: match.start()]
-        conversations.add(conv_id)
-
-        ttft = ev.get("ttftMs", 0)
-        itl = ev.get("itlMs", 0)
-        latency = ev.get("latencyMs", 0)
-
-        if turn == 0:
-            initial_ttfts.append(ttft)
-            initial_itls.append(itl)
-            initial_latencies.append(latency)
-        else:
-            followup_ttfts.append(ttft)
-            followup_itls.append(itl)
-            followup_latencies.append(latency)
-
-    i_ttft = compute_stats(initial_ttfts)
-    f_ttft = compute_stats(followup_ttfts)
-    i_itl = compute_stats(initial_itls)
-    f_itl = compute_stats(followup_itls)
-
-    speedup = i_ttft["p50"] / f_ttft["p50"] if f_ttft["p50"] > 0 else 0.0
-    delta = i_ttft["p50"] - f_ttft["p50"]
-
+        stats.add_row(ev)
+    return stats.summary()
+
+
+# ── Offline replay (vectorized) ──────────────────────────────────────────────
+
+REPLAY_GROUPINGS = ("turn", "workload", "conversation")
+REPLAY_METRICS = {"ttft": "ttft_ms", "itl": "itl_ms", "tpot": "tpot_ms", "latency": "latency_ms"}
+
+
+def grouped_stats(keys, values, percentiles=(50, 95)):
+    """Per-group count, mean and linear-interpolated percentiles.
+
+    Returns (group keys, counts, means, {p: values}). Unlike the live
+    sketches these are exact order statistics. A few groups (turns, workloads) use one O(n)
+    selection each; many groups (conversations) share one sort.
+    """
+    import numpy as np
+
+    values = values.astype(np.float64)
+    groups = np.unique(keys)
+    if groups.size <= 64:
+        counts = np.zeros(groups.size, dtype=np.int64)
+        means = np.zeros(groups.size)
+        result = {p: np.zeros(groups.size) for p in percentiles}
+        for i, g in enumerate(groups):
+            v = values[keys == g]
+            counts[i], means[i] = v.size, v.mean()
+            for p, q in zip(percentiles, np.percentile(v, percentiles)):
+                result[p][i] = q
+        return groups, counts, means, result
+
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    means = np.add.reduceat(values, starts) / counts
+    result = {}
+    for p in percentiles:
+        idx = starts + (p / 100.0) * (counts - 1)
+        lo = np.floor(idx).astype(np.int64)
+        hi = np.minimum(np.ceil(idx).astype(np.int64), starts + counts - 1)
+        result[p] = values[lo] + (values[hi] - values[lo]) * (idx - lo)
+    return groups, counts, means, result
+
+
+def analyze_columns(cols, since_sec=None, until_sec=None, rps=None):
+    """Vectorized analyze_events() over arrays from loadgen_events.read_arrays().
+
+    since_sec/until_sec keep requests completed within that window, in
+    seconds after the level's first completion. With rps, the arrival model
+    (dropped ticks, corrected TTFT) is computed too. Returns the
+    analyze_events() dict plus the row mask used, for further grouping.
+    """
+    import numpy as np
+
+    completed = cols["completed_at"]
+    window = np.ones(completed.size, dtype=bool)
+    if completed.size and (since_sec is not None or until_sec is not None):
+        offset = (completed - completed.min()) / 1000.0
+        if since_sec is not None:
+            window &= offset >= since_sec
+        if until_sec is not None:
+            window &= offset < until_sec
+    arrivals = None
+    if rps:
+        arrivals = ArrivalModel(rps)
+        arrivals.add_arrays(cols["turn"][window], cols["status"][window] == 0, completed[window],
+                            cols["latency_ms"][window], cols["ttft_ms"][window])
+    mask = window & (cols["status"] == 0)
+    prefill = PrefillModel()
+    prefill.add_arrays(cols["turn"][mask], cols["input_tokens"][mask], cols["cached_tokens"][mask],
+                       cols["ttft_ms"][mask])
+    mask &= cols["turn"] != NO_TURN
+
+    split = (cols["turn"][mask] > 0).astype(np.int8)
+    stats = {}
+    sketches = {}
+    for metric in ("ttft_ms", "itl_ms", "latency_ms"):
+        values = cols[metric][mask]
+        groups, counts, means, pct = grouped_stats(split, values, (50, 95, 99))
+        for side, key in ((0, "initial"), (1, "followup")):
+            name = f"{key}_{metric[:-3]}"
+            sketches[name] = LatencySketch.from_array(values[split == side])
+            hit = np.flatnonzero(groups == side)
+            if hit.size:
+                g = hit[0]
+                stats[name] = {"count": int(counts[g]), "mean": float(means[g]),
+                               **{f"p{p}": float(pct[p][g]) for p in (50, 95, 99)}}
+            else:
+                stats[name] = {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    i_ttft, f_ttft = stats["initial_ttft"], stats["followup_ttft"]
     return {
-        "initial_ttft": i_ttft,
-        "followup_ttft": f_ttft,
-        "initial_itl": i_itl,
-        "followup_itl": f_itl,
-        "initial_latency": compute_stats(initial_latencies),
-        "followup_latency": compute_stats(followup_latencies),
-        "speedup_ratio": speedup,
-        "delta_ms": delta,
-        "total_events": len(events),
-        "conversations": len(conversations),
+        **stats,
+        "speedup_ratio": i_ttft["p50"] / f_ttft["p50"] if f_ttft["p50"] > 0 else 0.0,
+        "delta_ms": i_ttft["p50"] - f_ttft["p50"],
+        "total_events": int(mask.sum()),
+        "conversations": int(np.unique(cols["conversation"][mask]).size),
+        "sketches": sketches,
+        "ci": confidence_intervals(sketches),
+        "prefill": prefill.summary(),
+        **({"arrivals": arrivals.summary()} if arrivals else {}),
+        "mask": mask,
     }
 
 
-# ── Main test loop ───────────────────────────────────────────────────────────
-
+def print_grouping(cols, dictionaries, mask, group_by, metric, percentiles):
+    """Per-group breakdown of one latency metric for the rows in mask."""
+    keys = cols[group_by][mask]
+    groups, counts, means, pct = grouped_stats(keys, cols[REPLAY_METRICS[metric]][mask], percentiles)
+    names = dictionaries.get(group_by)
+    print(f"│  {metric} by {group_by}:")
+    print(f"│    {group_by:>12}  {'n':>7}  {'mean':>8}  " + "  ".join(f"{'p' + format(p, 'g'):>8}" for p in percentiles))
+    for i, g in enumerate(groups):
+        label = names[g] if names else f"t{g}"
+        print(f"│    {label:>12}  {counts[i]:>7}  {means[i]:>8.1f}  "
+              + "  ".join(f"{pct[p][i]:>8.1f}" for p in percentiles))
+
+
+def replay_levels(events_dir):
+    """(concurrency, level dir) pairs recorded under events_dir, lowest first."""
+    events_dir = Path(events_dir)
+    if (events_dir / "meta.json").exists():
+        dirs = [events_dir]
+    else:
+        dirs = [d for d in events_dir.iterdir() if (d / "meta.json").exists()]
+    levels = [(json.loads((d / "meta.json").read_text()).get("concurrency"), d) for d in dirs]
+    return sorted(levels, key=lambda level: (level[0] is None, level[0] or 0, level[1].name))
 
-async def run_test(levels, rps, warmup_sec, measure_sec, output_dir, label=""):
-    """Step through concurrency levels and measure KV cache benefit at each."""
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    label_part = f"-{label}" if label else ""
-    tsv_path = Path(output_dir) / f"kv-benefit-test{label_part}-{timestamp}.tsv"
 
-    # ── Pre-checks ────────────────────────────────────────────────────────
-    print("Setting up port forwards...")
-    if not start_port_forward("loadgen", 3000, 3000, LOADGEN_NS, "Load Generator"):
+def run_replay(events_dir, output_dir, since_sec=None, until_sec=None, group_by=None, metric="ttft",
+               percentiles=(50, 95, 99)):
+    """Re-run the analysis and summary over recorded event directories."""
+    try:
+        import numpy as np  # noqa: F401  (used by the vectorized helpers)
+    except ImportError:
+        print("ERROR: numpy required for --replay. Install with: pip install numpy")
         sys.exit(1)
-    start_port_forward(PROM_SVC, 9090, 9090, PROM_NS, "Prometheus")
 
-    print("\nChecking load generator connectivity...")
-    status = get_status()
-    if not status:
-        print("ERROR: Cannot reach load generator at", LOADGEN_URL)
+    levels = replay_levels(events_dir)
+    if not levels:
+        print(f"ERROR: no recorded levels under {events_dir}")
         sys.exit(1)
-    print(f"  Load generator ready (corpus: {status.get('corpus', {}).get('chatPassages', '?')} passages)")
-
-    if status.get("running"):
-        print("  Workload already running — stopping first...")
-        stop_workload()
-        await asyncio.sleep(5)
-
-    # ── Banner ────────────────────────────────────────────────────────────
-    est_min = len(levels) * (warmup_sec + measure_sec + 10) // 60
-    print(f"\n{'=' * 70}")
-    print(f"  KV Cache Benefit Threshold Test")
-    print(f"  Concurrency levels: {levels}")
-    print(f"  RPS: {rps}")
-    print(f"  Per level: {warmup_sec}s warmup + {measure_sec}s measurement")
-    print(f"  Estimated duration: ~{est_min} min")
-    print(f"  Output: {tsv_path}")
-    print(f"{'=' * 70}")
 
-    # ── TSV header ────────────────────────────────────────────────────────
-    header_cols = [
-        "concurrency",
-        "rps",
-        "initial_ttft_p50",
-        "initial_ttft_p95",
-        "initial_ttft_mean",
-        "followup_ttft_p50",
-        "followup_ttft_p95",
-        "followup_ttft_mean",
-        "speedup_p50",
-        "delta_p50_ms",
-        "initial_itl_p50",
-        "followup_itl_p50",
-        "initial_count",
-        "followup_count",
-        "total_events",
-        "conversations",
-        "queue_depth",
-        "kv_hit_rate",
-        "kv_usage",
-        "actual_rps",
-        "error_pct",
-    ]
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    with open(tsv_path, "w") as f:
-        f.write("\t".join(header_cols) + "\n")
+    window = ""
+    if since_sec is not None or until_sec is not None:
+        window = f"-w{since_sec or 0:g}-{until_sec if until_sec is not None else 'end'}"
+    tsv_path = Path(output_dir) / f"{Path(events_dir).name}-replay{window}.tsv"
+    print(f"Replaying {len(levels)} level(s) from {events_dir}")
+    write_tsv_header(tsv_path)
 
     results = []
-    first = True
-
-    for conc in levels:
-        print(f"\n┌─ Concurrency={conc}, RPS={rps} {'─' * 40}")
-
-        # Start or reconfigure
-        if first:
-            start_workload(conc, rps)
-            first = False
+    for conc, level_dir in levels:
+        cols, dictionaries, meta = read_arrays(level_dir)
+        rps = meta.get("rps", 0.0)
+        print(f"\n┌─ Concurrency={conc}, RPS={rps} (replay of {level_dir.name}) {'─' * 20}")
+
+        analysis = analyze_columns(cols, since_sec, until_sec, rps)
+        kept = cols["completed_at"][analysis["mask"]]
+        if window and kept.size:
+            analysis["measure_sec"] = float(kept.max() - kept.min()) / 1000.0
         else:
-            update_config(conc, rps)
-
-        # Warmup
-        print(f"│  Warmup ({warmup_sec}s)...")
-        await asyncio.sleep(warmup_sec)
-
-        # Collect events via websocket
-        print(f"│  Measuring ({measure_sec}s via websocket)...")
-        events = await collect_events(measure_sec)
-
-        # Also grab aggregate metrics from load generator + Prometheus
-        lg_status = get_status()
-        prom_metrics = collect_prometheus_metrics()
-
-        actual_rps = 0.0
-        error_pct = 0.0
-        if lg_status and lg_status.get("metrics"):
-            m = lg_status["metrics"]
-            actual_rps = m.get("actualRPS", 0)
-            req_count = m.get("requestCount", 0)
-            err_count = m.get("errorCount", 0)
-            error_pct = (100.0 * err_count / req_count) if req_count > 0 else 0.0
+            analysis["measure_sec"] = meta.get("measure_sec", meta.get("stopped_at", 0) - meta.get("started_at", 0))
+        analysis["warmup_sec"] = meta.get("warmup_sec")
+        infra = dict(meta.get("infra", {}))
+        # Load numbers from the recording itself when the live run did not store them
+        rows = cols["status"].size
+        if rows and "actual_rps" not in infra:
+            span = (cols["completed_at"].max() - cols["completed_at"].min()) / 1000.0
+            infra["actual_rps"] = rows / span if span > 0 else 0.0
+            infra["error_pct"] = 100.0 * float((cols["status"] != 0).sum()) / rows
+
+        results.append(report_level(conc, rps, analysis, infra, tsv_path))
+        if group_by:
+            print_grouping(cols, dictionaries, analysis["mask"], group_by, metric, percentiles)
+        print(f"└{'─' * 55}")
 
-        # Analyze events
-        analysis = analyze_events(events)
-        i_ttft = analysis["initial_ttft"]
-        f_ttft = analysis["followup_ttft"]
-        i_itl = analysis["initial_itl"]
-        f_itl = analysis["followup_itl"]
-        speedup = analysis["speedup_ratio"]
-        delta = analysis["delta_ms"]
-        qd = prom_metrics.get("queue_depth")
-        kv_hit = prom_metrics.get("kv_hit_rate")
-        kv_usage = prom_metrics.get("kv_usage")
-
-        # ── Print results ─────────────────────────────────────────────────
-        print(f"│")
-        print(
-            f"│  Initial TTFT:   p50={i_ttft['p50']:>7.0f}ms  p95={i_ttft['p95']:>7.0f}ms  mean={i_ttft['mean']:>7.0f}ms  (n={i_ttft['count']})"
-        )
-        print(
-            f"│  Follow-up TTFT: p50={f_ttft['p50']:>7.0f}ms  p95={f_ttft['p95']:>7.0f}ms  mean={f_ttft['mean']:>7.0f}ms  (n={f_ttft['count']})"
-        )
-        print(
-            f"│  Speedup: {speedup:.2f}x  (delta={delta:+.0f}ms)"
-        )
-        print(
-            f"│  ITL:     initial p50={i_itl['p50']:.1f}ms  followup p50={f_itl['p50']:.1f}ms"
-        )
-        print(
-            f"│  Infra:   queue={qd if qd is not None else 'N/A'}  "
-            f"kv_hit={f'{kv_hit:.1f}%' if kv_hit is not None else 'N/A'}  "
-            f"kv_usage={f'{kv_usage:.1f}%' if kv_usage is not None else 'N/A'}"
-        )
+    print_summary(results, tsv_path)
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+TSV_COLUMNS = [
+    "concurrency",
+    "rps",
+    "initial_ttft_p50",
+    "initial_ttft_p95",
+    "initial_ttft_mean",
+    "followup_ttft_p50",
+    "followup_ttft_p95",
+    "followup_ttft_mean",
+    "speedup_p50",
+    "delta_p50_ms",
+    "initial_itl_p50",
+    "followup_itl_p50",
+    "initial_count",
+    "followup_count",
+    "total_events",
+    "conversations",
+    "queue_depth",
+    "kv_hit_rate",
+    "kv_usage",
+    "actual_rps",
+    "error_pct",
+    "initial_ttft_p99",
+    "followup_ttft_p99",
+    "initial_ttft_sketch",
+    "followup_ttft_sketch",
+    "measure_sec",
+    "ci_width",
+    "speedup_ci_lo",
+    "speedup_ci_hi",
+    "initial_ttft_p95_ci_lo",
+    "initial_ttft_p95_ci_hi",
+    "followup_ttft_p95_ci_lo",
+    "followup_ttft_p95_ci_hi",
+    "warmup_sec",
+    "prefill_fit_a_ms",
+    "prefill_fit_b_ms_per_token",
+    "prefill_tok_s",
+    "cache_saved_ms",
+    "usage_samples",
+    "intended_ticks",
+    "dropped_ticks",
+    "dropped_pct",
+    "admission_wait_p50",
+    "admission_wait_p95",
+    "co_initial_ttft_p50",
+    "co_initial_ttft_p95",
+    "co_initial_ttft_p99",
+]
+
+# Long-format per-turn / per-input-bucket TTFT breakdown, one file per run
+PREFILL_COLUMNS = [
+    "concurrency",
+    "group",
+    "key",
+    "count",
+    "ttft_p50",
+    "ttft_p95",
+    "mean_input_tokens",
+    "mean_cached_tokens",
+    "saved_ms",
+]
+
+
+def sketch_path(tsv_path):
+    """JSON sidecar holding every level's full set of latency sketches."""
+    return Path(tsv_path).with_suffix(".sketches.json")
+
+
+def prefill_path(tsv_path):
+    return Path(tsv_path).with_suffix(".prefill.tsv")
+
+
+def write_tsv_header(tsv_path):
+    Path(tsv_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(tsv_path, "w") as f:
+        f.write("\t".join(TSV_COLUMNS) + "\n")
+    with open(prefill_path(tsv_path), "w") as f:
+        f.write("\t".join(PREFILL_COLUMNS) + "\n")
+    sketch_path(tsv_path).write_text(json.dumps({"levels": []}))
+
+
+def report_prefill(conc, prefill, tsv_path):
+    """Print the prefill fit and per-turn / per-input-bucket TTFT, and append them to the .prefill.tsv."""
+    if not prefill["samples"]:
+        print("│  Prefill: no token usage in events (load generator without stream usage?)")
+        return
+    if prefill["fit_b_ms"] is not None:
+        tok_s = prefill["prefill_tok_s"]
+        saved = prefill["saved_ms"]
         print(
-            f"│  Load:    actual_rps={actual_rps:.1f}  errors={error_pct:.1f}%  "
-            f"events={analysis['total_events']}  conversations={analysis['conversations']}"
+            f"│  Prefill: TTFT ≈ {prefill['fit_a_ms']:.0f}ms + {prefill['fit_b_ms']:.3f}ms × uncached tokens"
+            f"  → {f'{tok_s:,.0f} tok/s' if tok_s else 'N/A'}"
+            f"{f', cache saves {saved:.0f}ms per follow-up' if saved is not None else ''}"
+            f"  (n={prefill['samples']})"
         )
+    print(f"│    {'':>11}  {'n':>6}  {'p50':>7}  {'p95':>7}  {'input':>7}  {'cached':>7}  {'saved':>7}")
+    lines = []
+    for group, rows in (("turn", prefill["turns"]), ("input", prefill["buckets"])):
+        for r in rows:
+            saved = f"{r['saved_ms']:.0f}ms" if r["saved_ms"] is not None else "N/A"
+            print(
+                f"│    {group + ' ' + r['key']:>11}  {r['count']:>6}  {r['p50']:>5.0f}ms  {r['p95']:>5.0f}ms  "
+                f"{r['mean_input']:>7.0f}  {r['mean_cached']:>7.0f}  {saved:>7}"
+            )
+            lines.append("\t".join([
+                str(conc), group, r["key"], str(r["count"]), f"{r['p50']:.1f}", f"{r['p95']:.1f}",
+                f"{r['mean_input']:.1f}", f"{r['mean_cached']:.1f}",
+                f"{r['saved_ms']:.1f}" if r["saved_ms"] is not None else "NaN",
+            ]))
+    with open(prefill_path(tsv_path), "a") as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+def report_arrivals(arrivals):
+    """Print the dropped ticks and the admission-wait corrected initial TTFT."""
+    if arrivals is None:
+        print("│  Arrivals: not enough dispatches to reconstruct the tick schedule")
+        return
+    wait, ttft = arrivals["wait"], arrivals["initial_ttft"]
+    flag = "  (intended rate not sustained)" if arrivals["dropped_pct"] > DROPPED_WARN_PCT else ""
+    print(
+        f"│  Arrivals: {arrivals['dispatched']}/{arrivals['intended']} ticks dispatched, "
+        f"{arrivals['dropped']} dropped ({arrivals['dropped_pct']:.1f}%){flag}"
+    )
+    print(
+        f"│  Corrected: admission wait p50={wait['p50']:.0f}ms p95={wait['p95']:.0f}ms  "
+        f"initial TTFT p50={ttft['p50']:.0f}ms p95={ttft['p95']:.0f}ms p99={ttft['p99']:.0f}ms"
+    )
 
-        # Assessment
-        if speedup < 1.05:
-            print(f"│  >>> KV cache benefit GONE at concurrency {conc}")
-        elif speedup < 1.15:
-            print(f"│  >>> KV benefit MARGINAL (speedup < 1.15x)")
-        elif delta < 15:
-            print(f"│  >>> KV benefit small — delta < 15ms")
-        else:
-            print(f"│  KV benefit visible")
 
-        print(f"└{'─' * 55}")
+def append_sketches(tsv_path, conc, rps, sketches):
+    """Add one level's sketches (LatencySketch.to_dict() form) to the sidecar."""
+    path = sketch_path(tsv_path)
+    doc = json.loads(path.read_text()) if path.exists() else {"levels": []}
+    doc["levels"].append({
+        "concurrency": conc,
+        "rps": rps,
+        "sketches": {name: sketch.to_dict() for name, sketch in sketches.items()},
+    })
+    path.write_text(json.dumps(doc))
+
+
+def report_level(conc, rps, analysis, infra, tsv_path):
+    """Print one level's results, append its TSV row, and return its summary entry.
+
+    infra holds queue_depth, kv_hit_rate, kv_usage, actual_rps and error_pct
+    (any may be missing or None).
+    """
+    i_ttft = analysis["initial_ttft"]
+    f_ttft = analysis["followup_ttft"]
+    i_itl = analysis["initial_itl"]
+    f_itl = analysis["followup_itl"]
+    speedup = analysis["speedup_ratio"]
+    delta = analysis["delta_ms"]
+    ci = analysis["ci"]
+    prefill = analysis["prefill"]
+    arrivals = analysis.get("arrivals")
+    measure_sec = analysis.get("measure_sec")
+    warmup_sec = analysis.get("warmup_sec")
+    qd = infra.get("queue_depth")
+    kv_hit = infra.get("kv_hit_rate")
+    kv_usage = infra.get("kv_usage")
+    actual_rps = infra.get("actual_rps") or 0.0
+    error_pct = infra.get("error_pct") or 0.0
+
+    # ── Print results ─────────────────────────────────────────────────
+    print(f"│")
+    print(
+        f"│  Initial TTFT:   p50={i_ttft['p50']:>7.0f}ms  p95={i_ttft['p95']:>7.0f}ms  p99={i_ttft['p99']:>7.0f}ms  "
+        f"mean={i_ttft['mean']:>7.0f}ms  (n={i_ttft['count']})"
+    )
+    print(
+        f"│  Follow-up TTFT: p50={f_ttft['p50']:>7.0f}ms  p95={f_ttft['p95']:>7.0f}ms  p99={f_ttft['p99']:>7.0f}ms  "
+        f"mean={f_ttft['mean']:>7.0f}ms  (n={f_ttft['count']})"
+    )
+    print(
+        f"│  Speedup: {speedup:.2f}x  (delta={delta:+.0f}ms)"
+    )
+    print(
+        f"│  {CONFIDENCE:.0%} CI:  speedup {ci['speedup'][0]:.2f}–{ci['speedup'][1]:.2f}x  "
+        f"p95 initial {ci['initial_ttft_p95'][0]:.0f}–{ci['initial_ttft_p95'][1]:.0f}ms  "
+        f"follow-up {ci['followup_ttft_p95'][0]:.0f}–{ci['followup_ttft_p95'][1]:.0f}ms  "
+        f"(width {ci['width']:.1%}"
+        + (f", {measure_sec:.0f}s measured" if measure_sec is not None else "")
+        + (f" after {warmup_sec:.0f}s warmup)" if warmup_sec is not None else ")")
+    )
+    print(
+        f"│  ITL:     initial p50={i_itl['p50']:.1f}ms  followup p50={f_itl['p50']:.1f}ms"
+    )
+    print(
+        f"│  Infra:   queue={qd if qd is not None else 'N/A'}  "
+        f"kv_hit={f'{kv_hit:.1f}%' if kv_hit is not None else 'N/A'}  "
+        f"kv_usage={f'{kv_usage:.1f}%' if kv_usage is not None else 'N/A'}"
+    )
+    print(
+        f"│  Load:    actual_rps={actual_rps:.1f}  errors={error_pct:.1f}%  "
+        f"events={analysis['total_events']}  conversations={analysis['conversations']}"
+    )
+    report_prefill(conc, prefill, tsv_path)
+    if "arrivals" in analysis:
+        report_arrivals(arrivals)
+
+    # Assessment
+    if speedup < GONE_SPEEDUP:
+        print(f"│  >>> KV cache benefit GONE at concurrency {conc}")
+    elif speedup < MARGINAL_SPEEDUP:
+        print(f"│  >>> KV benefit MARGINAL (speedup < {MARGINAL_SPEEDUP}x)")
+    elif delta < 15:
+        print(f"│  >>> KV benefit small — delta < 15ms")
+    else:
+        print(f"│  KV benefit visible")
 
-        # ── Write TSV row ─────────────────────────────────────────────────
-        def fmt(v, decimals=1):
-            return f"{v:.{decimals}f}" if v is not None else "NaN"
+    # ── Write TSV row ─────────────────────────────────────────────────
+    def fmt(v, decimals=1):
+        return f"{v:.{decimals}f}" if v is not None else "NaN"
 
-        row = "\t".join(
-            [
-                str(conc),
-                str(rps),
-                fmt(i_ttft["p50"]),
-                fmt(i_ttft["p95"]),
-                fmt(i_ttft["mean"]),
-                fmt(f_ttft["p50"]),
-                fmt(f_ttft["p95"]),
-                fmt(f_ttft["mean"]),
-                fmt(speedup, 3),
-                fmt(delta),
-                fmt(i_itl["p50"]),
-                fmt(f_itl["p50"]),
-                str(i_ttft["count"]),
-                str(f_ttft["count"]),
-                str(analysis["total_events"]),
-                str(analysis["conversations"]),
-                fmt(qd),
-                fmt(kv_hit),
-                fmt(kv_usage),
-                fmt(actual_rps),
-                fmt(error_pct),
-            ]
-        )
-        with open(tsv_path, "a") as f:
-            f.write(row + "\n")
-
-        results.append(
-            {
-                "concurrency": conc,
-                "speedup": speedup,
-                "delta": delta,
-                "initial_p50": i_ttft["p50"],
-                "followup_p50": f_ttft["p50"],
-                "initial_p95": i_ttft["p95"],
-                "followup_p95": f_ttft["p95"],
-                "kv_hit": kv_hit,
-                "queue": qd,
-                "initial_count": i_ttft["count"],
-                "followup_count": f_ttft["count"],
-            }
-        )
+    co = arrivals or {}
+    co_wait, co_ttft = co.get("wait", {}), co.get("initial_ttft", {})
+    row = "\t".join(
+        [
+            str(conc),
+            str(rps),
+            fmt(i_ttft["p50"]),
+            fmt(i_ttft["p95"]),
+            fmt(i_ttft["mean"]),
+            fmt(f_ttft["p50"]),
+            fmt(f_ttft["p95"]),
+            fmt(f_ttft["mean"]),
+            fmt(speedup, 3),
+            fmt(delta),
+            fmt(i_itl["p50"]),
+            fmt(f_itl["p50"]),
+            str(i_ttft["count"]),
+            str(f_ttft["count"]),
+            str(analysis["total_events"]),
+            str(analysis["conversations"]),
+            fmt(qd),
+            fmt(kv_hit),
+            fmt(kv_usage),
+            fmt(actual_rps),
+            fmt(error_pct),
+            fmt(i_ttft["p99"]),
+            fmt(f_ttft["p99"]),
+            analysis["sketches"]["initial_ttft"].encode(),
+            analysis["sketches"]["followup_ttft"].encode(),
+            fmt(measure_sec),
+            fmt(ci["width"], 4),
+            fmt(ci["speedup"][0], 3),
+            fmt(ci["speedup"][1], 3),
+            fmt(ci["initial_ttft_p95"][0]),
+            fmt(ci["initial_ttft_p95"][1]),
+            fmt(ci["followup_ttft_p95"][0]),
+            fmt(ci["followup_ttft_p95"][1]),
+            fmt(warmup_sec),
+            fmt(prefill["fit_a_ms"]),
+            fmt(prefill["fit_b_ms"], 4),
+            fmt(prefill["prefill_tok_s"], 0),
+            fmt(prefill["saved_ms"]),
+            str(prefill["samples"]),
+            fmt(co.get("intended"), 0),
+            fmt(co.get("dropped"), 0),
+            fmt(co.get("dropped_pct"), 2),
+            fmt(co_wait.get("p50")),
+            fmt(co_wait.get("p95")),
+            fmt(co_ttft.get("p50")),
+            fmt(co_ttft.get("p95")),
+            fmt(co_ttft.get("p99")),
+        ]
+    )
+    with open(tsv_path, "a") as f:
+        f.write(row + "\n")
+    append_sketches(tsv_path, conc, rps, analysis["sketches"])
 
-    # ── Stop workload ─────────────────────────────────────────────────────
-    print("\nStopping workload...")
-    stop_workload()
+    return {
+        "concurrency": conc,
+        "speedup": speedup,
+        "delta": delta,
+        "initial_p50": i_ttft["p50"],
+        "followup_p50": f_ttft["p50"],
+        "initial_p95": i_ttft["p95"],
+        "followup_p95": f_ttft["p95"],
+        "kv_hit": kv_hit,
+        "queue": qd,
+        "initial_count": i_ttft["count"],
+        "followup_count": f_ttft["count"],
+        "speedup_ci": ci["speedup"],
+        "measure_sec": measure_sec,
+        "warmup_sec": warmup_sec,
+        "prefill_tok_s": prefill["prefill_tok_s"],
+        "saved_ms": prefill["saved_ms"],
+        "dropped_pct": arrivals["dropped_pct"] if arrivals else None,
+    }
 
-    # ── Summary ───────────────────────────────────────────────────────────
+
+def print_summary(results, tsv_path, events_dir=None, verdicts=()):
+    """Summary table plus the threshold/recommendation verdict (and any search verdicts)."""
     print(f"\n{'=' * 78}")
     print(f"  KV Cache Benefit Summary")
     print(f"{'=' * 78}")
     print(
         f"  {'Conc':>5}  {'Init p50':>9}  {'F/U p50':>9}  {'Delta':>8}  "
-        f"{'Speed':>7}  {'KV Hit':>7}  {'Queue':>6}  {'n(i)':>5}  {'n(f)':>5}"
+        f"{'Speed':>7}  {'KV Hit':>7}  {'Queue':>6}  {'n(i)':>5}  {'n(f)':>5}  {'Drop':>6}"
     )
     print(
         f"  {'─' * 5}  {'─' * 9}  {'─' * 9}  {'─' * 8}  "
-        f"{'─' * 7}  {'─' * 7}  {'─' * 6}  {'─' * 5}  {'─' * 5}"
+        f"{'─' * 7}  {'─' * 7}  {'─' * 6}  {'─' * 5}  {'─' * 5}  {'─' * 6}"
     )
 
     threshold_found = None
+    dropped_levels = []
     for r in results:
         marker = ""
-        if r["speedup"] < 1.05:
+        if r["speedup"] < GONE_SPEEDUP:
             marker = " << GONE"
             if threshold_found is None:
                 threshold_found = r["concurrency"]
-        elif r["speedup"] < 1.15:
+        elif r["speedup"] < MARGINAL_SPEEDUP:
             marker = " < marginal"
 
         kv_str = f"{r['kv_hit']:.0f}%" if r["kv_hit"] is not None else "  N/A"
         q_str = f"{r['queue']:.0f}" if r["queue"] is not None else "N/A"
+        dropped = r.get("dropped_pct")
+        drop_str = f"{dropped:.0f}%" if dropped is not None else "N/A"
+        if dropped is not None and dropped > DROPPED_WARN_PCT:
+            drop_str += "!"
+            dropped_levels.append(r["concurrency"])
 
         print(
             f"  {r['concurrency']:>5}  {r['initial_p50']:>7.0f}ms  {r['followup_p50']:>7.0f}ms  "
             f"{r['delta']:>+7.0f}ms  {r['speedup']:>6.2f}x  {kv_str:>7}  {q_str:>6}  "
-            f"{r['initial_count']:>5}  {r['followup_count']:>5}{marker}"
+            f"{r['initial_count']:>5}  {r['followup_count']:>5}  {drop_str:>6}{marker}"
         )
 
     print(f"\n  {'─' * 70}")
+    if dropped_levels:
+        print(
+            f"  ! Scheduler dropped >{DROPPED_WARN_PCT:.0f}% of intended ticks at concurrency "
+            f"{', '.join(map(str, dropped_levels))}: the latencies above only cover admitted"
+        )
+        print(f"    requests; see the corrected (co_*) TSV columns for the intended rate.\n")
+    for verdict in verdicts:
+        print(f"  {verdict}")
+    if verdicts:
+        print()
     if threshold_found:
         print(
             f"  KV cache benefit disappears at concurrency {threshold_found}"
@@ -595,9 +1261,251 @@ async def run_test(levels, rps, warmup_sec, measure_sec, output_dir, label=""):
             print(f"  No clear KV benefit observed at any level.")
 
     print(f"\n  Full results: {tsv_path}")
+    print(f"  Sketches:     {sketch_path(tsv_path)}")
+    print(f"  Prefill:      {prefill_path(tsv_path)}")
+    if events_dir:
+        print(f"  Raw events:   {events_dir}/")
     print(f"{'=' * 78}")
 
 
+# ── Main test loop ───────────────────────────────────────────────────────────
+
+
+def live_infra():
+    """Infra numbers for the live dashboard (polled on its own thread)."""
+    status = get_status() or {}
+    return {**collect_prometheus_metrics(), "active_requests": status.get("activeRequests")}
+
+
+async def measure_level(conc, rps, warmup_sec, measure_sec, events_dir, tsv_path, start=False,
+                        ci_width=None, min_measure_sec=MIN_MEASURE_SEC, warmup_max_sec=WARMUP_MAX_SEC,
+                        live=None):
+    """Run one concurrency level (warmup + measurement) and return its summary entry.
+
+    warmup_sec None means warm up until steady state (at most warmup_max_sec).
+    live ("tty" or "json") shows a LiveDashboard during measurement.
+
+    With ci_width, measurement ends as soon as every confidence interval is
+    within that relative width (after at least min_measure_sec); measure_sec
+    is then the hard limit.
+    """
+    print(f"\n┌─ Concurrency={conc}, RPS={rps} {'─' * 40}")
+
+    # Start or reconfigure
+    if start:
+        start_workload(conc, rps)
+    else:
+        update_config(conc, rps)
+
+    # Warmup
+    if warmup_sec is None:
+        print(f"│  Warmup (until steady, at most {warmup_max_sec}s)...")
+        warmup_sec = round(await wait_for_steady_state(warmup_max_sec), 1)
+    else:
+        print(f"│  Warmup ({warmup_sec}s)...")
+        await asyncio.sleep(warmup_sec)
+
+    # Stream events via websocket into this level's recorder
+    level_dir = events_dir / f"c{conc}"
+    stats = LevelStats(rps)
+    stop_when = None
+    if ci_width:
+        print(f"│  Measuring (up to {measure_sec}s via websocket, until {CONFIDENCE:.0%} CIs are within {ci_width:.0%})...")
+        measure_start = time.time()
+
+        def stop_when():
+            return time.time() - measure_start >= min_measure_sec and stats.converged(ci_width)
+    else:
+        print(f"│  Measuring ({measure_sec}s via websocket)...")
+    with EventRecorder(level_dir, {"concurrency": conc, "rps": rps, "warmup_sec": warmup_sec}) as recorder:
+        started = time.time()
+        dashboard = LiveDashboard(live, f"c={conc} rps={rps}", infra_fn=live_infra, prefix="│  ") if live else None
+        await collect_events(measure_sec, recorder, stats, stop_when=stop_when, dashboard=dashboard)
+        elapsed = time.time() - started
+        recorder.meta["measure_sec"] = elapsed
+        if ci_width and elapsed < measure_sec - 1:
+            print(f"│  Confidence target reached after {elapsed:.0f}s")
+
+        # Also grab aggregate metrics from load generator + Prometheus
+        lg_status = get_status()
+        prom_metrics = collect_prometheus_metrics()
+
+        actual_rps = 0.0
+        error_pct = 0.0
+        if lg_status and lg_status.get("metrics"):
+            m = lg_status["metrics"]
+            actual_rps = m.get("actualRPS", 0)
+            req_count = m.get("requestCount", 0)
+            err_count = m.get("errorCount", 0)
+            error_pct = (100.0 * err_count / req_count) if req_count > 0 else 0.0
+
+        # Kept with the events so --replay reports the same infra columns
+        infra = {**prom_metrics, "actual_rps": actual_rps, "error_pct": error_pct}
+        recorder.meta["infra"] = infra
+
+    analysis = stats.summary()
+    analysis["measure_sec"] = elapsed
+    analysis["warmup_sec"] = warmup_sec
+    result = report_level(conc, rps, analysis, infra, tsv_path)
+    print(f"└{'─' * 55}")
+    return result
+
+
+class LevelCache:
+    """Measured levels by concurrency, so a search never measures one twice."""
+
+    def __init__(self, rps, warmup_sec, measure_sec, events_dir, tsv_path, ci_width=None,
+                 min_measure_sec=MIN_MEASURE_SEC, warmup_max_sec=WARMUP_MAX_SEC, live=None):
+        self.rps = rps
+        self.warmup_sec = warmup_sec
+        self.warmup_max_sec = warmup_max_sec
+        self.measure_sec = measure_sec
+        self.ci_width = ci_width
+        self.min_measure_sec = min_measure_sec
+        self.live = live
+        self.events_dir = events_dir
+        self.tsv_path = tsv_path
+        self.results = {}
+
+    async def speedup(self, conc):
+        if conc not in self.results:
+            print(f"\n  [measurement {len(self.results) + 1}] concurrency {conc}")
+            self.results[conc] = await measure_level(
+                conc, self.rps, self.warmup_sec, self.measure_sec,
+                self.events_dir, self.tsv_path, start=not self.results,
+                ci_width=self.ci_width, min_measure_sec=self.min_measure_sec,
+                warmup_max_sec=self.warmup_max_sec, live=self.live,
+            )
+        return self.results[conc]["speedup"]
+
+    def sorted_results(self):
+        return [self.results[c] for c in sorted(self.results)]
+
+
+async def search_threshold(cache, threshold, lo, hi, max_conc, resolution):
+    """Bracket and bisect the concurrency where speedup first drops below threshold.
+
+    Assumes speedup falls with concurrency. Returns (lo, hi) with speedup(lo)
+    >= threshold > speedup(hi) and hi - lo <= resolution; lo is None when even
+    the lowest level is below threshold, hi is None when max_conc is still above.
+    """
+    if await cache.speedup(lo) < threshold:
+        return None, lo
+    # Start from the tightest bracket the levels measured so far allow
+    known = {c: r["speedup"] for c, r in cache.results.items() if c > lo}
+    below = [c for c, speedup in known.items() if speedup < threshold]
+    if below:
+        hi = min(below)
+    lo = max([c for c, speedup in known.items() if speedup >= threshold and c < hi], default=lo)
+    # Expand the bracket upward until the benefit is lost
+    while await cache.speedup(hi) >= threshold:
+        if hi >= max_conc:
+            return hi, None
+        lo, hi = hi, min(hi * 2, max_conc)
+    while hi - lo > resolution:
+        mid = (lo + hi) // 2
+        if await cache.speedup(mid) >= threshold:
+            lo = mid
+        else:
+            hi = mid
+    return lo, hi
+
+
+def describe_bracket(name, threshold, bracket):
+    lo, hi = bracket
+    if lo is None:
+        return f"{name} (<{threshold:.2f}x) already at concurrency {hi} (lowest tested)"
+    if hi is None:
+        return f"{name} (<{threshold:.2f}x) not reached up to concurrency {lo}"
+    return f"{name} (<{threshold:.2f}x) between concurrency {lo} and {hi}"
+
+
+async def run_test(levels, rps, warmup_sec, measure_sec, output_dir, label="", search=None,
+                   ci_width=None, min_measure_sec=MIN_MEASURE_SEC, warmup_max_sec=WARMUP_MAX_SEC, live=None):
+    """Measure KV cache benefit at each concurrency level, or search for the thresholds.
+
+    search, when given, is (max_concurrency, resolution): levels[0] and
+    levels[-1] form the initial bracket, which is widened (doubling, up to
+    max_concurrency) and bisected until the marginal and gone thresholds
+    are each pinned to within resolution. ci_width enables early stopping
+    per level, warmup_sec None detects each level's warmup and live shows
+    the live dashboard (see measure_level()).
+    """
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    label_part = f"-{label}" if label else ""
+    tsv_path = Path(output_dir) / f"kv-benefit-test{label_part}-{timestamp}.tsv"
+    events_dir = tsv_path.with_suffix("")
+
+    # ── Pre-checks ────────────────────────────────────────────────────────
+    print("Setting up port forwards...")
+    if not start_port_forward("loadgen", 3000, 3000, LOADGEN_NS, "Load Generator"):
+        sys.exit(1)
+    start_port_forward(PROM_SVC, 9090, 9090, PROM_NS, "Prometheus")
+
+    print("\nChecking load generator connectivity...")
+    status = get_status()
+    if not status:
+        print("ERROR: Cannot reach load generator at", LOADGEN_URL)
+        sys.exit(1)
+    print(f"  Load generator ready (corpus: {status.get('corpus', {}).get('chatPassages', '?')} passages)")
+
+    if status.get("running"):
+        print("  Workload already running — stopping first...")
+        stop_workload()
+        await asyncio.sleep(5)
+
+    # ── Banner ────────────────────────────────────────────────────────────
+    if search:
+        max_conc, resolution = search
+        # Two bisections sharing one bracket, plus its two ends
+        span = max(max_conc - levels[0], 1)
+        n_levels = 2 + 2 * max(math.ceil(math.log2(span / resolution)), 0)
+    else:
+        n_levels = len(levels)
+    est_min = n_levels * ((warmup_sec if warmup_sec is not None else warmup_max_sec) + measure_sec + 10) // 60
+    print(f"\n{'=' * 70}")
+    print(f"  KV Cache Benefit Threshold Test")
+    if search:
+        print(f"  Search: bracket {levels[0]}..{levels[-1]} (max {max_conc}), resolution {resolution}")
+    else:
+        print(f"  Concurrency levels: {levels}")
+    print(f"  RPS: {rps}")
+    warmup = f"{warmup_sec}s warmup" if warmup_sec is not None else f"auto warmup (<={warmup_max_sec}s)"
+    if ci_width:
+        print(f"  Per level: {warmup} + {min_measure_sec}-{measure_sec}s measurement "
+              f"(stop at {CONFIDENCE:.0%} CI width {ci_width:.0%})")
+    else:
+        print(f"  Per level: {warmup} + {measure_sec}s measurement")
+    print(f"  Estimated duration: ~{est_min} min{' (at most)' if search else ''}")
+    print(f"  Output: {tsv_path}")
+    print(f"  Raw events: {events_dir}/c<level>/")
+    print(f"{'=' * 70}")
+
+    write_tsv_header(tsv_path)
+
+    cache = LevelCache(rps, warmup_sec, measure_sec, events_dir, tsv_path, ci_width, min_measure_sec, warmup_max_sec,
+                       live)
+    verdicts = []
+    if search:
+        marginal = await search_threshold(cache, MARGINAL_SPEEDUP, levels[0], levels[-1], max_conc, resolution)
+        # Speedup at marginal's lower end is >= MARGINAL_SPEEDUP > GONE_SPEEDUP, so start from there
+        lo = marginal[0] if marginal[0] is not None else levels[0]
+        hi = marginal[1] if marginal[1] is not None else max_conc
+        gone = await search_threshold(cache, GONE_SPEEDUP, lo, hi, max_conc, resolution)
+        verdicts = [describe_bracket("Marginal", MARGINAL_SPEEDUP, marginal),
+                    describe_bracket("Gone", GONE_SPEEDUP, gone)]
+    else:
+        for conc in levels:
+            await cache.speedup(conc)
+
+    # ── Stop workload ─────────────────────────────────────────────────────
+    print("\nStopping workload...")
+    stop_workload()
+
+    # ── Summary ───────────────────────────────────────────────────────────
+    print_summary(cache.sorted_results(), tsv_path, events_dir, verdicts)
+
+
 # ── Entry point ───────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -610,6 +1518,20 @@ Examples:
   python3 scripts/kv-benefit-test.py --levels 10,12,15,18,20,25,30
   python3 scripts/kv-benefit-test.py --warmup 45 --measure 90
   python3 scripts/kv-benefit-test.py --levels 8,10,15,20 --rps 8
+
+Adaptive search (brackets 8..32, bisects to within 2):
+  python3 scripts/kv-benefit-test.py --search --levels 8,32 --resolution 2
+
+Early stopping (each level ends once its 95% CIs are within 10%, at most 180s):
+  python3 scripts/kv-benefit-test.py --ci-width 0.1 --measure 180
+
+Steady-state warmup (each level starts measuring once TTFT/queue stop drifting):
+  python3 scripts/kv-benefit-test.py --warmup auto --warmup-max 240
+
+Offline re-analysis of a recorded run (no cluster needed):
+  python3 scripts/kv-benefit-test.py --replay dev/kv-benefit-test-kv-20260301-101500
+  python3 scripts/kv-benefit-test.py --replay dev/kv-benefit-test-kv-20260301-101500 \\
+      --since 30 --group-by turn --metric ttft --percentiles 50,90,99
 """,
     )
     parser.add_argument(
@@ -625,15 +1547,40 @@ Examples:
     )
     parser.add_argument(
         "--warmup",
+        default=str(WARMUP_SEC),
+        help=f"Warmup seconds per level, or 'auto' to wait for steady state (default: {WARMUP_SEC})",
+    )
+    parser.add_argument(
+        "--warmup-max",
         type=int,
-        default=WARMUP_SEC,
-        help=f"Warmup seconds per level (default: {WARMUP_SEC})",
+        default=WARMUP_MAX_SEC,
+        help=f"Longest warmup with --warmup auto (default: {WARMUP_MAX_SEC})",
     )
     parser.add_argument(
         "--measure",
         type=int,
         default=MEASURE_SEC,
-        help=f"Measurement seconds per level (default: {MEASURE_SEC})",
+        help=f"Measurement seconds per level; the maximum with --ci-width (default: {MEASURE_SEC})",
+    )
+    parser.add_argument(
+        "--ci-width",
+        type=float,
+        default=None,
+        help=f"End a level early once the {CONFIDENCE:.0%}% intervals on speedup and TTFT p95 "
+        "are within this fraction of their estimates (e.g. 0.1)",
+    )
+    parser.add_argument(
+        "--min-measure",
+        type=int,
+        default=MIN_MEASURE_SEC,
+        help=f"Minimum measurement seconds per level with --ci-width (default: {MIN_MEASURE_SEC})",
+    )
+    parser.add_argument(
+        "--live",
+        choices=("tty", "json"),
+        default=None,
+        help="Rolling once-a-second view while measuring: redrawn in the terminal, "
+        "or one JSON line per second for headless runs",
     )
     parser.add_argument(
         "--output-dir",
@@ -645,13 +1592,95 @@ Examples:
         default="",
         help="Label for output filename (e.g. 'kv' → kv-benefit-test-kv-{timestamp}.tsv)",
     )
+    search = parser.add_argument_group("adaptive search")
+    search.add_argument(
+        "--search",
+        action="store_true",
+        help="Bisect for the marginal/gone thresholds instead of measuring every level; "
+        "the lowest and highest --levels form the initial bracket",
+    )
+    search.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=SEARCH_MAX_CONCURRENCY,
+        help=f"Upper limit when widening the bracket (default: {SEARCH_MAX_CONCURRENCY})",
+    )
+    search.add_argument(
+        "--resolution",
+        type=int,
+        default=SEARCH_RESOLUTION,
+        help=f"Stop bisecting once a threshold is bracketed this tightly (default: {SEARCH_RESOLUTION})",
+    )
+    replay = parser.add_argument_group("offline replay")
+    replay.add_argument(
+        "--replay",
+        metavar="EVENTS_DIR",
+        help="Re-analyze a recorded run (the directory next to its TSV, or one c<level> dir) instead of measuring",
+    )
+    replay.add_argument(
+        "--since",
+        type=float,
+        default=None,
+        help="Only count requests completed at least SEC after the level's first completion",
+    )
+    replay.add_argument(
+        "--until",
+        type=float,
+        default=None,
+        help="Only count requests completed less than SEC after the level's first completion",
+    )
+    replay.add_argument(
+        "--group-by",
+        choices=REPLAY_GROUPINGS,
+        default=None,
+        help="Also print a per-group breakdown for each level",
+    )
+    replay.add_argument(
+        "--metric",
+        choices=REPLAY_METRICS,
+        default="ttft",
+        help="Metric for --group-by (default: ttft)",
+    )
+    replay.add_argument(
+        "--percentiles",
+        default="50,95,99",
+        help="Percentiles for --group-by (default: 50,95,99)",
+    )
     args = parser.parse_args()
 
-    levels = sorted(int(x.strip()) for x in args.levels.split(","))
+    if args.replay:
+        run_replay(
+            args.replay,
+            args.output_dir,
+            since_sec=args.since,
+            until_sec=args.until,
+            group_by=args.group_by,
+            metric=args.metric,
+            percentiles=[float(p) for p in args.percentiles.split(",")],
+        )
+        sys.exit(0)
+
+    websockets = load_websockets()
+    levels = sorted({int(x.strip()) for x in args.levels.split(",")})
+    if args.warmup == "auto":
+        warmup = None
+    elif args.warmup.isdigit():
+        warmup = int(args.warmup)
+    else:
+        parser.error("--warmup must be a number of seconds or 'auto'")
+    search = None
+    if args.search:
+        if args.resolution < 1:
+            parser.error("--resolution must be at least 1")
+        search = (max(args.max_concurrency, levels[-1]), args.resolution)
+    if args.live == "tty" and not sys.stdout.isatty():
+        print("  --live tty needs a terminal; printing JSON lines instead")
+        args.live = "json"
 
     try:
         asyncio.run(
-            run_test(levels, args.rps, args.warmup, args.measure, args.output_dir, args.label)
+            run_test(levels, args.rps, warmup, args.measure, args.output_dir, args.label, search,
+                     args.ci_width, args.min_measure, args.warmup_max, args.live)
         )
     except KeyboardInterrupt:
         print("\n\nInterrupted — stopping workload...")
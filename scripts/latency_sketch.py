@@ -0,0 +1,190 @@
+"""Mergeable latency quantile sketches (DDSketch).
+
+A LatencySketch keeps a count per logarithmic bucket: every value v > 0 goes
+to bucket ceil(log_gamma(v)) with gamma = (1 + alpha) / (1 - alpha), and a
+bucket answers quantile queries with 2 * gamma^i / (gamma + 1). Any quantile
+is then within a relative error alpha of the exact order statistic, for
+O(1) insertion and a few hundred buckets for latencies from 0.1 ms to hours.
+
+Sketches with the same alpha merge exactly (bucket counts add). That makes
+it possible to combine levels, sweeps or runs without raw samples, where
+averaging their percentiles would not be correct.
+
+Serialization:
+    sketch.to_dict() / LatencySketch.from_dict()   JSON outputs
+    sketch.encode()  / LatencySketch.decode()      one tab-free TSV cell
+
+Only the standard library is required.
+"""
+
+import base64
+import json
+import math
+import zlib
+
+DEFAULT_ALPHA = 0.01
+# Values at or below this (ms) are counted as zero rather than bucketed
+MIN_VALUE = 1e-3
+ENCODING_PREFIX = "dd1:"
+
+
+class LatencySketch:
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        if not 0 < alpha < 1:
+            raise ValueError("alpha must be in (0, 1)")
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float, weight: int = 1):
+        if value > MIN_VALUE:
+            i = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[i] = self.bins.get(i, 0) + weight
+        else:
+            self.zero += weight
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @classmethod
+    def from_array(cls, values, alpha: float = DEFAULT_ALPHA) -> "LatencySketch":
+        """Sketch of a NumPy array in one vectorized pass (needs numpy)."""
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        sketch = cls(alpha)
+        if not values.size:
+            return sketch
+        positive = values[values > MIN_VALUE]
+        keys, counts = np.unique(np.ceil(np.log(positive) / sketch._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        sketch.bins = dict(zip(keys.tolist(), counts.tolist()))
+        sketch.zero = int(values.size - positive.size)
+        sketch.count = int(values.size)
+        sketch.sum = float(values.sum())
+        sketch.min = float(values.min())
+        sketch.max = float(values.max())
+        return sketch
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        """Fold other into this sketch (in place) and return self."""
+        if other.alpha != self.alpha:
+            raise ValueError(f"cannot merge sketches with alpha {self.alpha} and {other.alpha}")
+        for i, n in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q in [0, 1] (0.0 for an empty sketch)."""
+        if not self.count:
+            return 0.0
+        return self.value_at_rank(q * (self.count - 1))
+
+    def quantile_interval(self, q: float, z: float = 1.96) -> tuple[float, float]:
+        """Distribution-free confidence interval for the q quantile.
+
+        Uses the order statistics at ranks n*q -/+ z*sqrt(n*q*(1-q)) (the
+        normal approximation to the binomial), read from the sketch, so the
+        bounds carry its relative error alpha on top. z = 1.96 gives ~95%.
+        """
+        if not self.count:
+            return 0.0, 0.0
+        n = self.count
+        spread = z * math.sqrt(n * q * (1 - q))
+        return self.value_at_rank(math.floor(n * q - spread)), self.value_at_rank(math.ceil(n * q + spread))
+
+    def value_at_rank(self, rank: float) -> float:
+        """Value of the order statistic at 0-based rank (clamped to the observed range)."""
+        if not self.count:
+            return 0.0
+        if rank <= 0:
+            return self.min
+        if rank >= self.count - 1:
+            return self.max
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if rank < seen:
+                value = 2 * self.gamma ** i / (self.gamma + 1)
+                # The representative can fall just outside the observed range
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentile(self, p: float) -> float:
+        return self.quantile(p / 100.0)
+
+    def stats(self, percentiles=(50, 95, 99)) -> dict:
+        """count, mean and pNN entries, the shape compute_stats() has always returned."""
+        result = {"count": self.count, "mean": self.mean}
+        result.update({f"p{p:g}": self.percentile(p) for p in percentiles})
+        return result
+
+    # ── Serialization ─────────────────────────────────────────────────────
+
+    def to_dict(self) -> dict:
+        keys = sorted(self.bins)
+        offset = keys[0] if keys else 0
+        counts = [0] * (keys[-1] - offset + 1) if keys else []
+        for i in keys:
+            counts[i - offset] = self.bins[i]
+        return {
+            "alpha": self.alpha,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "zero": self.zero,
+            "offset": offset,
+            "counts": counts,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencySketch":
+        sketch = cls(d["alpha"])
+        sketch.bins = {d["offset"] + k: n for k, n in enumerate(d["counts"]) if n}
+        sketch.zero = d["zero"]
+        sketch.count = d["count"]
+        sketch.sum = d["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = d["min"], d["max"]
+        return sketch
+
+    def encode(self) -> str:
+        """Compact single-token string (no tabs or newlines) for TSV cells."""
+        raw = json.dumps(self.to_dict(), separators=(",", ":")).encode()
+        return ENCODING_PREFIX + base64.b64encode(zlib.compress(raw, 9)).decode()
+
+    @classmethod
+    def decode(cls, text: str) -> "LatencySketch":
+        if not text.startswith(ENCODING_PREFIX):
+            raise ValueError("not an encoded latency sketch")
+        return cls.from_dict(json.loads(zlib.decompress(base64.b64decode(text[len(ENCODING_PREFIX):]))))
+
+
+def merge_all(sketches) -> LatencySketch:
+    """Merge an iterable of sketches into a new one."""
+    merged = None
+    for s in sketches:
+        merged = LatencySketch(s.alpha).merge(s) if merged is None else merged.merge(s)
+    return merged if merged is not None else LatencySketch()
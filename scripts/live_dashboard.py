@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Live terminal view of a running load test, refreshed once a second.
+
+A LiveDashboard takes load generator request_complete events and keeps one
+small set of latency sketches (latency_sketch.py) per second. Every refresh
+merges the last --window seconds of them, so showing rolling TTFT p50/p95
+for initial (t0) and follow-up (t1+) turns, the event rate and the error
+rate costs the same however many events arrive; nothing is re-sorted.
+Queue depth and KV hit rate come from an infra callback polled on its own
+thread, so a slow Prometheus never holds up the view.
+
+Rendering runs on a background thread as well, so the view keeps
+refreshing, and shows how long ago the last event arrived, even while the
+websocket is down. Alerts flag the ways a long run usually goes bad: no
+events (websocket or port-forward dead), errors, no follow-up turns.
+
+Two outputs:
+    tty    redraws a block of lines in place (stdout must be a terminal)
+    json   prints one JSON object per refresh, for headless runs and logs
+
+kv-benefit-test.py --live tty|json shows it while each level measures. Run
+as a script, it watches whatever is driving the load generator, e.g. a
+capacity-test.sh or benchmark-sweep.sh run, from a second terminal:
+
+    python3 scripts/live_dashboard.py
+    python3 scripts/live_dashboard.py --json --duration 600 >> dev/live.jsonl
+
+Requires websockets (pip install websockets) for the script; the module
+itself only needs the standard library.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import deque
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from latency_sketch import LatencySketch
+from loadgen_events import NO_TURN, split_item_id
+from prom_client import PromClient
+
+WINDOW_SEC = 30
+REFRESH_SEC = 1.0
+INFRA_SEC = 5.0
+# No event for this long means the stream is probably dead
+STALE_SEC = 5.0
+ERROR_ALERT_PCT = 5.0
+# Events needed before a missing follow-up turn counts as an alert
+FOLLOWUP_ALERT_EVENTS = 20
+
+LOADGEN_URL = "http://localhost:3000"
+WS_URL = "ws://localhost:3000/ws"
+PROM_URL = "http://localhost:9090"
+QUEUE_QUERY = 'sum(dynamo_frontend_queued_requests{dynamo_namespace="dynamo-workload-gtc-demo"}) or vector(0)'
+KV_HIT_QUERY = ('avg(dynamo_component_kvstats_gpu_prefix_cache_hit_rate'
+                '{dynamo_namespace="dynamo_workload_gtc_demo"}) or vector(0)')
+
+
+def rounded(value, digits=1):
+    """value with every float rounded (timestamps to ms), for compact JSON lines."""
+    if isinstance(value, float):
+        return round(value, 3 if value > 1e9 else digits)
+    if isinstance(value, dict):
+        return {k: rounded(v, digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rounded(v, digits) for v in value]
+    return value
+
+
+class RollingStats:
+    """Per-second buckets of TTFT sketches and counts over a trailing window."""
+
+    def __init__(self, window_sec=WINDOW_SEC):
+        self.window_sec = window_sec
+        # (second, {"initial": sketch, "followup": sketch, "events": n, "errors": n})
+        self.buckets = deque()
+        self.first_event = None
+        self.last_event = None
+
+    def _bucket(self, second):
+        if not self.buckets or self.buckets[-1][0] != second:
+            self.buckets.append((second, {"initial": LatencySketch(), "followup": LatencySketch(),
+                                          "events": 0, "errors": 0}))
+        return self.buckets[-1][1]
+
+    def _expire(self, now):
+        while self.buckets and self.buckets[0][0] <= now - self.window_sec:
+            self.buckets.popleft()
+
+    def add_event(self, data, now=None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        bucket = self._bucket(int(now))
+        bucket["events"] += 1
+        self.first_event = self.first_event or now
+        self.last_event = now
+        if data.get("status") != "ok":
+            bucket["errors"] += 1
+            return
+        _, turn = split_item_id(data.get("itemId") or "")
+        if turn != NO_TURN:
+            bucket["initial" if turn == 0 else "followup"].add(data.get("ttftMs") or 0)
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        initial, followup = LatencySketch(), LatencySketch()
+        events = errors = 0
+        for _, b in self.buckets:
+            initial.merge(b["initial"])
+            followup.merge(b["followup"])
+            events += b["events"]
+            errors += b["errors"]
+        # Early on the window is only as long as the stream has been running
+        span = min(self.window_sec, now - self.first_event) if self.first_event else 0
+        chat = initial.count + followup.count
+        return {
+            "window_sec": self.window_sec,
+            "events": events,
+            "events_per_sec": events / span if span >= 1 else float(events),
+            "error_pct": 100.0 * errors / events if events else 0.0,
+            "followup_share": 100.0 * followup.count / chat if chat else 0.0,
+            "initial": {"count": initial.count, "p50": initial.percentile(50), "p95": initial.percentile(95)},
+            "followup": {"count": followup.count, "p50": followup.percentile(50), "p95": followup.percentile(95)},
+            "last_event_age": now - self.last_event if self.last_event else None,
+        }
+
+
+class LiveDashboard:
+    """Rolling view of a load test, rendered to a terminal or as JSON lines.
+
+    Feed it with add_event(); start() launches the render (and optional
+    infra polling) threads and close() stops them and clears the view.
+    infra_fn returns a dict with any of queue_depth, kv_hit_rate and
+    active_requests (None values are shown as N/A).
+    """
+
+    def __init__(self, mode="tty", title="", infra_fn=None, window_sec=WINDOW_SEC,
+                 refresh_sec=REFRESH_SEC, infra_sec=INFRA_SEC, prefix="", out=None):
+        if mode not in ("tty", "json"):
+            raise ValueError(f"unknown dashboard mode {mode!r}")
+        self.mode = mode
+        self.title = title
+        self.infra_fn = infra_fn
+        self.refresh_sec = refresh_sec
+        self.infra_sec = infra_sec
+        self.prefix = prefix
+        self.out = out or sys.stdout
+        self.stats = RollingStats(window_sec)
+        self.infra = {}
+        self.started = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._drawn = 0
+
+    def add_event(self, data):
+        with self._lock:
+            self.stats.add_event(data)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            snap = self.stats.snapshot(now)
+        snap["elapsed"] = now - self.started if self.started else 0.0
+        snap["infra"] = dict(self.infra)
+        snap["alerts"] = self.alerts(snap)
+        return snap
+
+    @staticmethod
+    def alerts(snap):
+        alerts = []
+        age = snap["last_event_age"]
+        if age is None and snap["elapsed"] >= STALE_SEC:
+            alerts.append(f"no events after {snap['elapsed']:.0f}s (websocket / port-forward down?)")
+        elif age is not None and age >= STALE_SEC:
+            alerts.append(f"no events for {age:.0f}s (websocket / port-forward down?)")
+        if snap["error_pct"] > ERROR_ALERT_PCT:
+            alerts.append(f"errors at {snap['error_pct']:.1f}%")
+        if snap["initial"]["count"] >= FOLLOWUP_ALERT_EVENTS and not snap["followup"]["count"]:
+            alerts.append("no follow-up turns")
+        return alerts
+
+    # ── Rendering ─────────────────────────────────────────────────────────
+
+    def lines(self, snap):
+        def ttft(side):
+            s = snap[side]
+            return f"p50 {s['p50']:>6.0f}ms  p95 {s['p95']:>6.0f}ms  n={s['count']}"
+
+        def infra(key, fmt):
+            value = snap["infra"].get(key)
+            return fmt.format(value) if value is not None else "N/A"
+
+        age = snap["last_event_age"]
+        head = f"TTFT ({snap['window_sec']}s)"
+        lines = [
+            f"── live{f' {self.title}' if self.title else ''} ── {time.strftime('%H:%M:%S')} "
+            f"── {snap['elapsed']:.0f}s {'─' * 20}",
+            f"{head}  t0  {ttft('initial')}",
+            f"{'':<{len(head)}}  t1+ {ttft('followup')}",
+            f"Rate {snap['events_per_sec']:.1f} ev/s  errors {snap['error_pct']:.1f}%  "
+            f"follow-ups {snap['followup_share']:.0f}%  "
+            f"last event {f'{age:.0f}s ago' if age is not None else 'never'}",
+            f"Infra queue={infra('queue_depth', '{:.0f}')}  kv_hit={infra('kv_hit_rate', '{:.1f}%')}  "
+            f"active={infra('active_requests', '{:.0f}')}",
+        ]
+        lines += [f"!! {alert}" for alert in snap["alerts"]]
+        return [self.prefix + line for line in lines]
+
+    def render(self):
+        snap = self.snapshot()
+        if self.mode == "json":
+            self.out.write(json.dumps(rounded({"ts": time.time(), "title": self.title, **snap})) + "\n")
+        else:
+            lines = self.lines(snap)
+            # Move back over the previous frame and clear it before redrawing
+            erase = f"\x1b[{self._drawn}F\x1b[J" if self._drawn else ""
+            self.out.write(erase + "\n".join(lines) + "\n")
+            self._drawn = len(lines)
+        self.out.flush()
+
+    def clear(self):
+        if self.mode == "tty" and self._drawn:
+            self.out.write(f"\x1b[{self._drawn}F\x1b[J")
+            self.out.flush()
+            self._drawn = 0
+
+    # ── Threads ───────────────────────────────────────────────────────────
+
+    def _render_loop(self):
+        while not self._stop.wait(self.refresh_sec):
+            self.render()
+
+    def _infra_loop(self):
+        while True:
+            try:
+                self.infra = dict(self.infra_fn() or {})
+            except Exception as e:  # a broken poller must not take the view down
+                self.infra = {"error": str(e)}
+            if self._stop.wait(self.infra_sec):
+                return
+
+    def start(self):
+        self.started = time.time()
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._render_loop, daemon=True)]
+        if self.infra_fn is not None:
+            self._threads.append(threading.Thread(target=self._infra_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self, keep=False):
+        """Stop refreshing; the view is cleared unless keep (then drawn one last time)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if keep:
+            self.render()
+        else:
+            self.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ── CLI (standalone watcher) ────────────────────────────────────────────────
+
+
+def get_json(url, timeout=3):
+    try:
+        with urlopen(Request(url), timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except (URLError, OSError, json.JSONDecodeError):
+        return None
+
+
+def standalone_infra(loadgen_url, prom):
+    status = get_json(f"{loadgen_url}/api/status") or {}
+    return {
+        **prom.query_many({"queue_depth": QUEUE_QUERY, "kv_hit_rate": KV_HIT_QUERY}),
+        "active_requests": status.get("activeRequests"),
+    }
+
+
+async def watch(dashboard, ws_url, duration_sec=None):
+    """Feed request_complete events from the websocket until duration_sec (or forever)."""
+    import websockets
+
+    deadline = time.time() + duration_sec if duration_sec else None
+    while deadline is None or time.time() < deadline:
+        try:
+            async with websockets.connect(ws_url, close_timeout=5) as ws:
+                while deadline is None or time.time() < deadline:
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    msg = json.loads(raw)
+                    if msg.get("type") == "request_complete":
+                        dashboard.add_event(msg["data"])
+        except (OSError, websockets.exceptions.WebSocketException):
+            await asyncio.sleep(2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live rolling view of the load generator's request stream")
+    parser.add_argument("--loadgen-url", default=LOADGEN_URL, help="Load generator base URL")
+    parser.add_argument("--ws-url", default=WS_URL, help="Load generator websocket URL")
+    parser.add_argument("--prom-url", default=PROM_URL, help="Prometheus base URL")
+    parser.add_argument("--window", type=int, default=WINDOW_SEC,
+                        help=f"Rolling window seconds (default: {WINDOW_SEC})")
+    parser.add_argument("--json", action="store_true", help="Print one JSON line per second instead of redrawing")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until Ctrl-C)")
+    parser.add_argument("--title", default="", help="Label shown in the header / JSON lines")
+    args = parser.parse_args()
+
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print("ERROR: websockets library required. Install with: pip install websockets")
+        sys.exit(1)
+
+    prom = PromClient(args.prom_url, timeout=3, retries=0)
+    dashboard = LiveDashboard(
+        "json" if args.json else "tty", args.title, window_sec=args.window,
+        infra_fn=lambda: standalone_infra(args.loadgen_url, prom),
+    )
+    dashboard.start()
+    try:
+        asyncio.run(watch(dashboard, args.ws_url, args.duration))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dashboard.close(keep=dashboard.mode == "tty")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Load generator stand-in — a local, cluster-free imitation of the Node load
+generator's API for exercising and benchmarking the Python harnesses.
+
+Serves the same endpoints as apps/load-generator/src/server/index.ts:
+
+  GET  /healthz, /api/status
+  POST /api/workload/start, /api/workload/stop, /api/workload/config
+  GET  /api/conversations, /api/conversations/<id>
+  GET  /ws   (websocket: state_change, request_complete, aggregate 1/s)
+
+The scheduler mirrors the real one (a tick every 1/RPS seconds, ticks dropped
+while maxConcurrency requests are in flight, chat conversations run 5 turns
+back to back), but requests are simulated instead of sent to Dynamo:
+
+  TTFT = (base + uncached_input / prefill_rate + queue_ms * max(0, active - knee)) * jitter
+  ITL  = itl_ms * (1 + itl_slope * active) * jitter
+
+where the input of each chat turn grows with the conversation, and a turn
+hits the prefix cache (all but the newest message cached) with probability
+--cache-hit. --time-scale shrinks every simulated delay, so thousands of
+events per second are possible on a laptop; completedAt stays start +
+latencyMs, so completion times run ahead of the wall clock when scaled.
+
+Only the standard library is required.
+
+Usage:
+  python3 scripts/loadgen-standin.py                      # listens on :3000
+  python3 scripts/loadgen-standin.py --time-scale 0.01 --port 3100
+  python3 scripts/kv-benefit-test.py --levels 5,10 --warmup 5 --measure 10
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Drop websocket clients that fall this far behind instead of buffering for them
+WS_MAX_BUFFER = 8 * 1024 * 1024
+
+CHAT_TURNS = 5
+MAX_CONVERSATIONS = 500
+METRICS_WINDOW_SEC = 60
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 426: "Upgrade Required"}
+
+TOPICS = [
+    "GPU Architecture", "Large Language Models", "Kubernetes Container Orchestration",
+    "Disaggregated Inference", "Cloud Computing Infrastructure", "Transformer Architecture",
+    "Distributed Computing Systems", "CUDA Programming Model", "Model Optimization for Inference",
+    "Observability and Monitoring",
+]
+
+
+# ── Latency model ─────────────────────────────────────────────────────────────
+
+
+class LatencyModel:
+    """Synthetic per-request metrics as a function of input, turn and load."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+    def _jitter(self):
+        return self.rng.lognormvariate(0.0, self.args.jitter)
+
+    def output_tokens(self, workload):
+        if workload == "b":
+            return 200
+        if workload == "c":
+            return self.rng.randint(300, 1024)
+        return max(1, min(1024, int(self.rng.gauss(self.args.assistant_tokens, self.args.assistant_tokens / 4))))
+
+    def request(self, workload, input_tokens, cached_tokens, active):
+        a = self.args
+        output_tokens = self.output_tokens(workload)
+        queue_ms = a.queue_ms * max(0, active - a.queue_knee)
+        ttft = (a.ttft_base_ms + (input_tokens - cached_tokens) / a.prefill_tps * 1000.0 + queue_ms) * self._jitter()
+        itl = a.itl_ms * (1 + a.itl_slope * active) * self._jitter()
+        latency = ttft + itl * max(0, output_tokens - 1)
+        return {
+            "ttftMs": ttft,
+            "itlMs": itl,
+            "tpotMs": (latency - ttft) / (output_tokens - 1) if output_tokens > 1 else 0.0,
+            "latencyMs": latency,
+            "outputTokens": output_tokens,
+            "inputTokens": input_tokens,
+            "cachedTokens": cached_tokens,
+        }
+
+
+# ── Simulated load generator ──────────────────────────────────────────────────
+
+
+class StandIn:
+    def __init__(self, args):
+        self.args = args
+        self.model = LatencyModel(args)
+        self.rng = random.Random(args.seed + 1)
+        self.config = None
+        self.started_at = None
+        self.active = 0
+        self.clients = set()
+        self.window = deque()
+        self.conversations = {}
+        self._scheduler = None
+        self._aggregate = None
+        self.passages = [
+            {"id": f"chat-{i + 1:02d}", "topic": TOPICS[i % len(TOPICS)],
+             "tokens": self.rng.randint(args.passage_tokens // 2, args.passage_tokens)}
+            for i in range(args.passages)
+        ]
+
+    @property
+    def running(self):
+        return self._scheduler is not None
+
+    # ── Websocket fan-out ─────────────────────────────────────────────────
+
+    def broadcast(self, msg):
+        frame = ws_frame(json.dumps(msg).encode())
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > WS_MAX_BUFFER:
+                self.clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+
+    # ── Scheduler ─────────────────────────────────────────────────────────
+
+    def start(self, config):
+        self.config = config
+        self.started_at = time.time()
+        self._scheduler = asyncio.create_task(self._schedule())
+        self._aggregate = asyncio.create_task(self._broadcast_aggregate())
+
+    def stop(self):
+        for task in (self._scheduler, self._aggregate):
+            if task:
+                task.cancel()
+        self._scheduler = self._aggregate = None
+
+    async def _schedule(self):
+        next_tick = time.monotonic()
+        while True:
+            # Like setInterval: a fixed grid of ticks, re-read on config change.
+            # Ticks that came due while asleep are dispatched together so high
+            # RPS is not capped by the event loop's timer resolution.
+            next_tick += 1.0 / self.config["totalRPS"]
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -1.0:
+                next_tick = time.monotonic()  # fell far behind: skip, don't burst
+            if self.active >= self.config["maxConcurrency"]:
+                continue
+            workload = self._pick_workload()
+            if workload:
+                self.active += 1
+                asyncio.create_task(self._run(workload))
+            if delay <= 0:
+                await asyncio.sleep(0)
+
+    def _pick_workload(self):
+        active = [(w, weight) for w, weight in self.config["mix"].items() if weight and weight > 0]
+        if not active:
+            return None
+        return self.rng.choices([w for w, _ in active], weights=[wt for _, wt in active])[0]
+
+    async def _broadcast_aggregate(self):
+        while True:
+            await asyncio.sleep(1)
+            self.broadcast({"type": "aggregate", "data": self.aggregate()})
+
+    async def _run(self, workload):
+        try:
+            if workload == "a":
+                await self._run_chat()
+            else:
+                prefix = "summ" if workload == "b" else "reason"
+                item = f"{prefix}-{self.rng.randint(1, 20):02d}"
+                tokens = self.rng.randint(200, 8000) if workload == "b" else self.rng.randint(30, 80)
+                await self._request(workload, item, tokens, 0)
+        finally:
+            self.active -= 1
+
+    async def _run_chat(self):
+        passage = self.rng.choice(self.passages)
+        conv_id = f"{passage['id']}-{int(time.time() * 1000)}-{self.rng.randrange(1 << 16)}"
+        record = {"id": conv_id, "topic": passage["topic"], "status": "active",
+                  "startedAt": now_ms(), "completedAt": None, "turns": [], "totalDurationMs": None}
+        self._store_conversation(record)
+
+        context = passage["tokens"] + self.args.overhead_tokens
+        previous = 0
+        for turn in range(CHAT_TURNS):
+            hit = self.rng.random() < (self.args.cache_hit if turn else self.args.passage_hit)
+            cached = (previous if turn else passage["tokens"]) if hit else 0
+            metrics = await self._request("a", f"{passage['id']}-t{turn}", context, cached)
+            record["turns"].append({
+                "turnNumber": turn,
+                "userMessage": f"Synthetic question {turn} about {passage['topic']}",
+                "assistantMessage": "" if metrics["status"] == "error" else f"Synthetic answer ({metrics['outputTokens']} tokens)",
+                "metrics": metrics,
+            })
+            if metrics["status"] == "error":
+                record["status"] = "error"
+                break
+            previous = context + metrics["outputTokens"]
+            context = previous + self.args.follow_up_tokens
+        else:
+            record["status"] = "completed"
+        record["completedAt"] = now_ms()
+        record["totalDurationMs"] = record["completedAt"] - record["startedAt"]
+
+    async def _request(self, workload, item_id, input_tokens, cached_tokens):
+        m = self.model.request(workload, input_tokens, cached_tokens, self.active)
+        started = now_ms()
+        await asyncio.sleep(m["latencyMs"] / 1000.0 * self.args.time_scale)
+        error = self.rng.random() < self.args.error_rate
+        metrics = {
+            "workload": workload,
+            "status": "error" if error else "ok",
+            **m,
+            # Unscaled, so completedAt - latencyMs is the dispatch time as with the real one
+            "completedAt": started + m["latencyMs"],
+            "itemId": item_id,
+        }
+        if error:
+            metrics.update(ttftMs=0, itlMs=0, tpotMs=0, outputTokens=0, error="simulated error")
+            del metrics["inputTokens"], metrics["cachedTokens"]
+        self.window.append(metrics)
+        self.broadcast({"type": "request_complete", "data": metrics})
+        return metrics
+
+    def _store_conversation(self, record):
+        while len(self.conversations) >= MAX_CONVERSATIONS:
+            del self.conversations[next(iter(self.conversations))]
+        self.conversations[record["id"]] = record
+
+    # ── Aggregates (matches MetricsAggregator.getAggregate) ──────────────
+
+    def aggregate(self):
+        cutoff = now_ms() - METRICS_WINDOW_SEC * 1000
+        while self.window and self.window[0]["completedAt"] < cutoff:
+            self.window.popleft()
+        ok = [m for m in self.window if m["status"] == "ok"]
+        total_out = sum(m["outputTokens"] for m in ok)
+        ttft = percentiles([m["ttftMs"] for m in ok])
+        latency = percentiles([m["latencyMs"] for m in ok])
+        avg_out = total_out / len(ok) if ok else 1
+        return {
+            "windowSec": METRICS_WINDOW_SEC,
+            "requestCount": len(self.window),
+            "errorCount": len(self.window) - len(ok),
+            "actualRPS": len(self.window) / METRICS_WINDOW_SEC,
+            "ttft": ttft,
+            "itl": percentiles([m["itlMs"] for m in ok]),
+            "tpot": {k: (latency[k] - ttft[k]) / avg_out if avg_out > 0 else 0 for k in ("mean", "p50", "p95")},
+            "latency": latency,
+            "outputTokens": percentiles([m["outputTokens"] for m in ok]),
+            "tops": total_out / METRICS_WINDOW_SEC,
+        }
+
+    def status(self):
+        return {
+            "running": self.running,
+            "config": self.config if self.running else None,
+            "uptimeMs": now_ms() - int(self.started_at * 1000) if self.started_at else 0,
+            "activeRequests": self.active,
+            "corpus": {"chatPassages": len(self.passages), "summarizationDocs": 20, "reasoningPrompts": 20},
+            "metrics": self.aggregate() if self.running else None,
+        }
+
+    # ── REST API ──────────────────────────────────────────────────────────
+
+    def handle(self, method, path, body):
+        if method == "GET" and path == "/healthz":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/api/status":
+            return 200, self.status()
+        if method == "POST" and path == "/api/workload/start":
+            if self.running:
+                return 409, {"error": "Already running. POST /api/workload/stop first."}
+            config = {
+                "totalRPS": body.get("totalRPS", self.args.default_rps),
+                "mix": body.get("mix", {"a": 1.0, "b": 0, "c": 0}),
+                "maxConcurrency": body.get("maxConcurrency", self.args.default_concurrency),
+            }
+            self.start(config)
+            self.broadcast({"type": "state_change", "data": {"running": True, "config": config}})
+            return 200, {"status": "started", "config": config}
+        if method == "POST" and path == "/api/workload/stop":
+            if not self.running:
+                return 409, {"error": "Not running."}
+            self.stop()
+            self.broadcast({"type": "state_change", "data": {"running": False}})
+            return 200, {"status": "stopped"}
+        if method == "POST" and path == "/api/workload/config":
+            if not self.running:
+                return 409, {"error": "Not running. POST /api/workload/start first."}
+            for key in ("totalRPS", "mix", "maxConcurrency"):
+                if key in body:
+                    self.config[key] = body[key]
+            self.broadcast({"type": "state_change", "data": {"running": True, "config": self.config}})
+            return 200, {"status": "updated", "config": self.config}
+        if method == "GET" and path == "/api/conversations":
+            summaries = [{k: r[k] for k in ("id", "topic", "status", "startedAt", "completedAt", "totalDurationMs")}
+                         | {"turnCount": len(r["turns"])} for r in self.conversations.values()]
+            return 200, sorted(summaries, key=lambda s: -s["startedAt"])
+        if method == "GET" and path.startswith("/api/conversations/"):
+            record = self.conversations.get(path.rsplit("/", 1)[1])
+            return (200, record) if record else (404, {"error": "Conversation not found"})
+        return 404, {"error": "Not found"}
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def percentiles(values):
+    """mean/p50/p95 like the load generator's metrics.ts (nearest rank)."""
+    if not values:
+        return {"mean": 0, "p50": 0, "p95": 0}
+    s = sorted(values)
+    pick = lambda p: s[min(len(s) - 1, int(len(s) * p / 100))]
+    return {"mean": sum(s) / len(s), "p50": pick(50), "p95": pick(95)}
+
+
+def ws_frame(payload, opcode=0x1):
+    """Unmasked server-to-client frame (RFC 6455 section 5.2)."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def ws_read_frame(reader):
+    """(opcode, payload) of the next client frame; client frames are always masked."""
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b2 & 0x80 else b"\0\0\0\0"
+    data = await reader.readexactly(n)
+    return b1 & 0x0F, bytes(c ^ mask[i % 4] for i, c in enumerate(data))
+
+
+async def serve_websocket(standin, reader, writer, headers):
+    key = headers.get("sec-websocket-key")
+    if not key:
+        write_response(writer, 426, {"error": "Expected a websocket upgrade"})
+        return
+    accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+    writer.write(
+        "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+    )
+    writer.write(ws_frame(json.dumps({"type": "state_change",
+                                      "data": {"running": standin.running, "config": standin.config}}).encode()))
+    standin.clients.add(writer)
+    try:
+        while True:
+            opcode, payload = await ws_read_frame(reader)
+            if opcode == 0x8:  # close
+                writer.write(ws_frame(payload[:2], opcode=0x8))
+                break
+            if opcode == 0x9:  # ping
+                writer.write(ws_frame(payload, opcode=0xA))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        standin.clients.discard(writer)
+
+
+def write_response(writer, status, payload, keep_alive=False):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+        + body
+    )
+
+
+async def handle_connection(standin, reader, writer):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+            path = urlsplit(target).path
+
+            if path == "/ws":
+                await serve_websocket(standin, reader, writer, headers)
+                return
+
+            raw = await reader.readexactly(int(headers.get("content-length", 0)))
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                write_response(writer, 400, {"error": "Invalid JSON"})
+                return
+            status, payload = standin.handle(method, path, body)
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main(args):
+    standin = StandIn(args)
+    server = await asyncio.start_server(lambda r, w: handle_connection(standin, r, w), args.host, args.port)
+    print(f"Load generator stand-in on http://{args.host}:{args.port} (ws://{args.host}:{args.port}/ws)")
+    print(f"  time scale {args.time_scale}, prefill {args.prefill_tps:.0f} tok/s, "
+          f"queue {args.queue_ms}ms/request above concurrency {args.queue_knee}, cache hit {args.cache_hit:.0%}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the load generator API and websocket",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier on simulated delays (0.01 = 100x faster than real time, 0 = no waiting)")
+    parser.add_argument("--default-rps", type=float, default=2.0, help="totalRPS when start omits it")
+    parser.add_argument("--default-concurrency", type=int, default=10, help="maxConcurrency when start omits it")
+    model = parser.add_argument_group("latency model")
+    model.add_argument("--ttft-base-ms", type=float, default=40.0, help="TTFT floor per request")
+    model.add_argument("--prefill-tps", type=float, default=20000.0, help="Prefill throughput for uncached tokens")
+    model.add_argument("--queue-ms", type=float, default=25.0, help="Extra TTFT per in-flight request above the knee")
+    model.add_argument("--queue-knee", type=int, default=12, help="Concurrency at which queueing starts")
+    model.add_argument("--itl-ms", type=float, default=12.0, help="Inter-token latency at zero load")
+    model.add_argument("--itl-slope", type=float, default=0.02, help="Relative ITL increase per in-flight request")
+    model.add_argument("--jitter", type=float, default=0.15, help="Lognormal sigma applied to TTFT and ITL")
+    model.add_argument("--cache-hit", type=float, default=0.9,
+                       help="Probability a follow-up turn reuses the conversation's cached prefix")
+    model.add_argument("--passage-hit", type=float, default=0.3,
+                       help="Probability a first turn finds its passage already cached")
+    model.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests reported as errors")
+    corpus = parser.add_argument_group("synthetic corpus")
+    corpus.add_argument("--passages", type=int, default=10, help="Chat passages (itemIds chat-01..)")
+    corpus.add_argument("--passage-tokens", type=int, default=4000, help="Largest passage length in tokens")
+    corpus.add_argument("--overhead-tokens", type=int, default=60, help="System prompt + instruction tokens")
+    corpus.add_argument("--assistant-tokens", type=int, default=400, help="Mean chat reply length")
+    corpus.add_argument("--follow-up-tokens", type=int, default=20, help="Tokens per follow-up question")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
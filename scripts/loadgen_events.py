@@ -0,0 +1,226 @@
+"""Streaming columnar recorder for load generator request_complete events.
+
+Each measurement gets its own directory with one .npy file per field:
+
+    c15/
+      meta.json          free-form run metadata (level, rps, start/stop time)
+      dictionaries.json  string tables for dictionary-encoded columns
+      conversation.npy   u4  index into dictionaries["conversation"]
+      turn.npy           u2  chat turn parsed from itemId (...-t<N>), else NO_TURN
+      workload.npy       u1  index into dictionaries["workload"]
+      status.npy         u1  0 = ok, 1 = error
+      ttft_ms.npy ...    f4  latencies as reported by the load generator
+      input_tokens.npy   u4  prompt tokens from the usage chunk (0 if not reported)
+      cached_tokens.npy  u4  of those, prefix-cache hits (0 if not reported)
+      completed_at.npy   f8  load generator completion time (epoch ms)
+      received_at.npy    f8  local receive time (epoch s)
+
+Rows are buffered briefly and appended, so memory stays flat no matter how
+long a level runs. Every file has a fixed 128-byte NPY v1.0 header that is
+rewritten with the final row count on close(); readers here derive the row
+count from the file size instead, so a directory left behind by a crashed
+run is still readable. The files load directly with numpy.load() after a
+clean close (or numpy.memmap(offset=128) at any time). Columns added after a
+recording was made read back as zeros.
+
+Only the standard library is required; read_arrays() additionally needs numpy.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from pathlib import Path
+
+TURN_REGEX = re.compile(r"-t(\d+)$")
+NO_TURN = 0xFFFF
+
+HEADER_SIZE = 128
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+# name -> (NPY descr, array typecode, source event field)
+COLUMNS = {
+    "conversation": ("<u4", "I", None),
+    "turn": ("<u2", "H", None),
+    "workload": ("|u1", "B", None),
+    "status": ("|u1", "B", None),
+    "ttft_ms": ("<f4", "f", "ttftMs"),
+    "itl_ms": ("<f4", "f", "itlMs"),
+    "tpot_ms": ("<f4", "f", "tpotMs"),
+    "latency_ms": ("<f4", "f", "latencyMs"),
+    "output_tokens": ("<u4", "I", "outputTokens"),
+    "input_tokens": ("<u4", "I", "inputTokens"),
+    "cached_tokens": ("<u4", "I", "cachedTokens"),
+    "completed_at": ("<f8", "d", "completedAt"),
+    "received_at": ("<f8", "d", None),
+}
+DICTIONARY_COLUMNS = ("conversation", "workload")
+FLUSH_ROWS = 512
+
+
+def npy_header(descr: str, rows: int) -> bytes:
+    """Fixed-size NPY v1.0 header for a 1-D array of rows elements."""
+    text = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({rows},), }}"
+    body_len = HEADER_SIZE - len(NPY_MAGIC) - 2
+    return NPY_MAGIC + body_len.to_bytes(2, "little") + text.ljust(body_len - 1).encode("latin1") + b"\n"
+
+
+def split_item_id(item_id: str) -> tuple[str, int]:
+    """'<passage>-t<turn>' -> (passage, turn); ids without a turn get NO_TURN."""
+    match = TURN_REGEX.search(item_id)
+    if not match:
+        return item_id, NO_TURN
+    return item_id[:match.start()], int(match.group(1))
+
+
+class EventRecorder:
+    """Append request_complete payloads to per-column files under directory."""
+
+    def __init__(self, directory, meta: dict | None = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.meta = {"started_at": time.time(), **(meta or {})}
+        self.dictionaries = {name: [] for name in DICTIONARY_COLUMNS}
+        self._codes = {name: {} for name in DICTIONARY_COLUMNS}
+        self._buffers = {name: array(code) for name, (_, code, _) in COLUMNS.items()}
+        self._files = {}
+        for name, (descr, _, _) in COLUMNS.items():
+            f = open(self.directory / f"{name}.npy", "wb")
+            f.write(npy_header(descr, 0))
+            self._files[name] = f
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _code(self, column: str, value: str) -> int:
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(codes)
+            self.dictionaries[column].append(value)
+        return codes[value]
+
+    def append(self, event: dict):
+        conversation, turn = split_item_id(event.get("itemId") or "")
+        row = {
+            "conversation": self._code("conversation", conversation),
+            "turn": turn,
+            "workload": self._code("workload", event.get("workload") or ""),
+            "status": 0 if event.get("status") == "ok" else 1,
+            "received_at": time.time(),
+        }
+        for name, (_, _, field) in COLUMNS.items():
+            self._buffers[name].append(row[name] if field is None else (event.get(field) or 0))
+        self.rows += 1
+        if len(self._buffers["status"]) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        for name, buf in self._buffers.items():
+            if sys.byteorder == "big":
+                buf.byteswap()
+            buf.tofile(self._files[name])
+            self._files[name].flush()
+            del buf[:]
+        self._write_json()
+
+    def _write_json(self):
+        for filename, payload in (("meta.json", {**self.meta, "rows": self.rows}),
+                                  ("dictionaries.json", self.dictionaries)):
+            tmp = self.directory / f".{filename}.tmp"
+            tmp.write_text(json.dumps(payload, indent=2))
+            os.replace(tmp, self.directory / filename)
+
+    def close(self):
+        if not self._files:
+            return
+        self.meta["stopped_at"] = time.time()
+        self.flush()
+        for name, f in self._files.items():
+            f.seek(0)
+            f.write(npy_header(COLUMNS[name][0], self.rows))
+            f.close()
+        self._files = {}
+
+
+def read_columns(directory, columns=None) -> tuple[dict[str, array], dict[str, list[str]], dict]:
+    """(columns, dictionaries, meta) from a recorder directory, crash-tolerant."""
+    directory = Path(directory)
+    dictionaries = json.loads((directory / "dictionaries.json").read_text())
+    meta = json.loads((directory / "meta.json").read_text())
+    data = {}
+    rows = None
+    missing = []
+    for name in columns or COLUMNS:
+        _, code, _ = COLUMNS[name]
+        path = directory / f"{name}.npy"
+        if not path.exists():
+            missing.append(name)
+            continue
+        raw = path.read_bytes()[HEADER_SIZE:]
+        col = array(code)
+        col.frombytes(raw[:len(raw) - len(raw) % col.itemsize])
+        if sys.byteorder == "big":
+            col.byteswap()
+        data[name] = col
+        rows = len(col) if rows is None else min(rows, len(col))
+    rows = rows or 0
+    for name in missing:
+        data[name] = array(COLUMNS[name][1], bytes(rows * array(COLUMNS[name][1]).itemsize))
+    # Columns are flushed together; a crash mid-flush can leave a ragged tail
+    return {name: col[:rows] for name, col in data.items()}, dictionaries, meta
+
+
+def read_arrays(directory, columns=None) -> tuple[dict, dict[str, list[str]], dict]:
+    """Like read_columns(), as NumPy arrays memory-mapped from the files (needs numpy)."""
+    import numpy as np
+
+    directory = Path(directory)
+    dictionaries = json.loads((directory / "dictionaries.json").read_text())
+    meta = json.loads((directory / "meta.json").read_text())
+    data = {}
+    missing = []
+    for name in columns or COLUMNS:
+        dtype = np.dtype(COLUMNS[name][0])
+        path = directory / f"{name}.npy"
+        if not path.exists():
+            missing.append(name)
+            continue
+        rows = (path.stat().st_size - HEADER_SIZE) // dtype.itemsize
+        data[name] = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(rows,)) if rows \
+            else np.zeros(0, dtype=dtype)
+    rows = min((col.size for col in data.values()), default=0)
+    for name in missing:
+        data[name] = np.zeros(rows, dtype=COLUMNS[name][0])
+    return {name: col[:rows] for name, col in data.items()}, dictionaries, meta
+
+
+def iter_events(directory):
+    """Yield recorded rows as dicts: the load generator payload fields, with
+    itemId already split into conversation and turn."""
+    cols, dictionaries, _ = read_columns(directory)
+    conversations = dictionaries["conversation"]
+    workloads = dictionaries["workload"]
+    for i in range(len(cols["status"])):
+        yield {
+            "conversation": conversations[cols["conversation"][i]],
+            "turn": cols["turn"][i],
+            "workload": workloads[cols["workload"][i]],
+            "status": "ok" if cols["status"][i] == 0 else "error",
+            "ttftMs": cols["ttft_ms"][i],
+            "itlMs": cols["itl_ms"][i],
+            "tpotMs": cols["tpot_ms"][i],
+            "latencyMs": cols["latency_ms"][i],
+            "outputTokens": cols["output_tokens"][i],
+            "inputTokens": cols["input_tokens"][i],
+            "cachedTokens": cols["cached_tokens"][i],
+            "completedAt": cols["completed_at"][i],
+        }
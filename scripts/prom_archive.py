@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Offline Prometheus archives: export the series behind a run, query them later.
+
+Reports and backfills need the series behind each row's measurement window,
+and those are gone once the cluster is torn down. Exporting them first makes
+the results reproducible:
+
+    python3 scripts/prom_archive.py dev/benchmark-sweep-20260227-184935.tsv
+    # -> dev/benchmark-sweep-20260227-184935.prom.npz
+
+Sources are sweep TSVs, whose windows come from measure_start_utc and
+measure_end_utc. They can also be kv-benefit-test results, meaning the TSV
+or its events directory, with windows taken from each level's meta.json
+started_at/stopped_at. Every metric in the backfill_metrics spec
+(--spec/--metrics, default DEFAULT_SPEC) is fetched with query_range
+over exactly those windows at the metric's step. Windows are padded with
+--pad and aligned to the step grid.
+
+The archive is one compressed .npz with columnar arrays, loadable without
+pickle:
+
+    t, v       float64 samples of all series, concatenated
+    offsets    int64, series i is t[offsets[i]:offsets[i+1]]
+    index      JSON [{"query": ..., "metric": {labels}}] per series
+    meta       JSON: source files, windows, step, Prometheus URL, export time
+
+ArchiveClient answers the PromClient API (query, query_many, query_range,
+range_many, range_mean) from one or more archives. Like Prometheus, it
+evaluates each step with the latest sample at most LOOKBACK_SEC old. A
+query that is not in the archive fails (None plus last_error), exactly
+as an unreachable server would. prom_client.open_prom() returns one for
+any --prom-url that is not http(s), so the backfill scripts and the
+prom_client CLI work offline:
+
+    python3 scripts/backfill_metrics.py --prom-url dev/benchmark-sweep-20260227-184935.prom.npz \\
+        --refresh dev/benchmark-sweep-20260227-184935.tsv
+
+Requires numpy.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from prom_client import PROM_URL, PromClient
+
+ARCHIVE_SUFFIX = ".prom.npz"
+# Prometheus' default lookback delta for instant vectors
+LOOKBACK_SEC = 300
+# Prometheus rejects ranges over 11,000 points per series
+MAX_POINTS = 10000
+
+
+def to_epoch(value) -> float:
+    """Epoch seconds from a number or an RFC 3339 timestamp."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def to_seconds(step) -> float:
+    """Seconds from a number or a Prometheus duration such as 15s, 1m or 1h."""
+    try:
+        return float(step)
+    except ValueError:
+        units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+        unit = "ms" if step.endswith("ms") else step[-1]
+        return float(step[: -len(unit)]) * units[unit]
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.split())
+
+
+def series_key(query: str, labels: dict) -> tuple:
+    return normalize(query), json.dumps(labels, sort_keys=True)
+
+
+# ── Archive files ─────────────────────────────────────────────────────────────
+
+
+def write_archive(path, series, meta):
+    """Write [(query, labels, t, v)] plus meta to a compressed .npz (atomically)."""
+    import numpy as np
+
+    ts = [np.asarray(t, dtype=np.float64) for _, _, t, _ in series]
+    vs = [np.asarray(v, dtype=np.float64) for _, _, _, v in series]
+    offsets = np.cumsum([0] + [len(t) for t in ts]).astype(np.int64)
+    index = [{"query": query, "metric": labels} for query, labels, _, _ in series]
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(
+            f,
+            t=np.concatenate(ts) if ts else np.zeros(0),
+            v=np.concatenate(vs) if vs else np.zeros(0),
+            offsets=offsets,
+            index=np.array(json.dumps(index)),
+            meta=np.array(json.dumps(meta)),
+        )
+    os.replace(tmp, path)
+
+
+def read_archive(path):
+    """([(query, labels, t, v)], meta) from an archive written by write_archive()."""
+    import numpy as np
+
+    with np.load(path, allow_pickle=False) as z:
+        t, v, offsets = z["t"], z["v"], z["offsets"]
+        index = json.loads(str(z["index"]))
+        meta = json.loads(str(z["meta"]))
+    series = [(entry["query"], entry["metric"], t[offsets[i]:offsets[i + 1]], v[offsets[i]:offsets[i + 1]])
+              for i, entry in enumerate(index)]
+    return series, meta
+
+
+class ArchiveClient(PromClient):
+    """PromClient drop-in that answers from archive files instead of a server."""
+
+    offline = True
+
+    def __init__(self, paths, lookback=LOOKBACK_SEC):
+        import numpy as np
+
+        paths = [paths] if isinstance(paths, (str, Path)) else list(paths)
+        self.base_url = "archive:" + ",".join(str(p) for p in paths)
+        self.lookback = lookback
+        self.last_error = None
+        self.meta = []
+        merged = {}
+        for path in paths:
+            series, meta = read_archive(path)
+            self.meta.append(meta)
+            for query, labels, t, v in series:
+                merged.setdefault(series_key(query, labels), []).append((t, v))
+
+        # Several archives may overlap: one sorted, de-duplicated series per (query, labels)
+        self.series = {}
+        for (query, labels), parts in merged.items():
+            t = np.concatenate([p[0] for p in parts])
+            v = np.concatenate([p[1] for p in parts])
+            t, first = np.unique(t, return_index=True)
+            self.series.setdefault(query, []).append((json.loads(labels), t, v[first]))
+        # Exported queries that returned no series are empty, not missing
+        for meta in self.meta:
+            for metric in meta.get("metrics", []):
+                if metric["name"] not in meta.get("failed", []):
+                    self.series.setdefault(normalize(metric["query"]), [])
+
+    def close(self):
+        pass
+
+    def _map(self, fn, items):
+        return [fn(item) for item in items]
+
+    def _lookup(self, query):
+        series = self.series.get(normalize(query))
+        if series is None:
+            self.last_error = f"not in archive: {query}"
+        return series
+
+    def _sample(self, t, v, points):
+        """(mask, values): latest sample at or before each point, within the lookback."""
+        import numpy as np
+
+        idx = np.searchsorted(t, points, side="right") - 1
+        ok = idx >= 0
+        ok[ok] &= points[ok] - t[idx[ok]] <= self.lookback
+        return ok, v[np.maximum(idx, 0)]
+
+    def query_vector(self, query, at=None):
+        import numpy as np
+
+        series = self._lookup(query)
+        if not series:
+            return []
+        at = to_epoch(at) if at is not None else max((t[-1] for _, t, _ in series if len(t)), default=0.0)
+        result = []
+        for labels, t, v in series:
+            if len(t):
+                ok, values = self._sample(t, v, np.array([at]))
+                if ok[0]:
+                    result.append((labels, float(values[0])))
+        return result
+
+    def query_range(self, query, start, end, step="60"):
+        import numpy as np
+
+        series = self._lookup(query)
+        if series is None:
+            return None
+        start, end, step = to_epoch(start), to_epoch(end), to_seconds(step)
+        points = start + step * np.arange(int((end - start) // step) + 1)
+        result = []
+        for labels, t, v in series:
+            if not len(t) or not len(points):
+                continue
+            ok, values = self._sample(t, v, points)
+            if ok.any():
+                result.append({"metric": labels, "values": list(zip(points[ok].tolist(), values[ok].tolist()))})
+        return result
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+
+def archive_path(source: Path) -> Path:
+    """Where the archive for a TSV or events directory goes: next to it."""
+    return source.with_suffix(ARCHIVE_SUFFIX) if source.is_file() else source.with_name(source.name + ARCHIVE_SUFFIX)
+
+
+def events_windows(directory: Path) -> list[tuple[float, float]]:
+    """(started_at, stopped_at) of a kv-benefit-test recording or each of its level directories."""
+    metas = [directory / "meta.json"] if (directory / "meta.json").exists() else sorted(directory.glob("*/meta.json"))
+    windows = []
+    for path in metas:
+        meta = json.loads(path.read_text())
+        if meta.get("started_at") and meta.get("stopped_at"):
+            windows.append((float(meta["started_at"]), float(meta["stopped_at"])))
+    return windows
+
+
+def source_windows(source: Path) -> list[tuple[float, float]]:
+    from backfill_metrics import END_COL, START_COL, parse_utc, read_tsv
+
+    if source.is_dir():
+        return events_windows(source)
+    fieldnames, rows = read_tsv(str(source))
+    if START_COL in fieldnames and END_COL in fieldnames:
+        windows = [(parse_utc(r.get(START_COL)), parse_utc(r.get(END_COL))) for r in rows]
+        return [w for w in windows if None not in w]
+    # kv-benefit-test keeps its recording next to the TSV
+    events = source.with_suffix("")
+    return events_windows(events) if events.is_dir() else []
+
+
+def covering_spans(windows, step, pad=0.0):
+    """Merge padded windows into step-aligned spans of at most MAX_POINTS samples."""
+    spans = []
+    for start, end in sorted(windows):
+        start = (start - pad) // step * step
+        end = -(-(end + pad) // step) * step
+        if spans and start <= spans[-1][1] + step:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    limit = MAX_POINTS * step
+    out = []
+    for start, end in spans:
+        while end - start > limit:
+            out.append((start, start + limit - step))
+            start += limit
+        out.append((start, end))
+    return out
+
+
+def export(groups, metrics, prom, pad=0.0):
+    """Fetch every metric over each group's windows and write one archive per group.
+
+    groups is [(archive path, [source paths], [(start, end)])]. All range
+    queries of all groups run in one concurrent batch. False if any archive
+    could not be written.
+    """
+    requests = {}
+    for gi, (_, _, windows) in enumerate(groups):
+        for mi, metric in enumerate(metrics):
+            for si, (start, end) in enumerate(covering_spans(windows, metric["step"], pad)):
+                requests[(gi, mi, si)] = (metric["query"], start, end, metric["step"])
+    prom.last_error = None
+    results = prom.range_many(requests)
+
+    ok = True
+    for gi, (path, sources, windows) in enumerate(groups):
+        collected = {}
+        failed = []
+        for mi, metric in enumerate(metrics):
+            keys = [k for k in requests if k[:2] == (gi, mi)]
+            if any(results[k] is None for k in keys):
+                failed.append(metric["name"])
+            for k in keys:
+                for s in results[k] or []:
+                    entry = collected.setdefault(series_key(metric["query"], s["metric"]),
+                                                 (metric["query"], s["metric"], {}))
+                    entry[2].update(s["values"])
+        if len(failed) == len(metrics):
+            # Never replace a good archive with an empty one
+            print(f"  ERROR: {path} not written: Prometheus query failed ({prom.last_error})", file=sys.stderr)
+            ok = False
+            continue
+        series = [(query, labels, sorted(samples), [samples[t] for t in sorted(samples)])
+                  for query, labels, samples in collected.values()]
+        meta = {
+            "prom_url": prom.base_url,
+            "exported_at": time.time(),
+            "pad_sec": pad,
+            "sources": [str(s) for s in sources],
+            "windows": windows,
+            "metrics": [{k: m[k] for k in ("name", "query", "agg", "step")} for m in metrics],
+            "failed": failed,
+        }
+        write_archive(path, series, meta)
+        samples = sum(len(s[2]) for s in series)
+        print(f"  {path}: {len(windows)} windows, {len(series)} series, {samples} samples "
+              f"({Path(path).stat().st_size / 1024:.0f} KiB)")
+        if failed:
+            print(f"    WARN: not exported: {', '.join(failed)} ({prom.last_error})", file=sys.stderr)
+    return ok
+
+
+def main():
+    from backfill_metrics import load_spec
+
+    parser = argparse.ArgumentParser(
+        description="Export the Prometheus series behind sweep / kv-benefit results to a local archive",
+    )
+    parser.add_argument("sources", nargs="+", type=Path, metavar="SOURCE",
+                        help="Sweep TSVs, kv-benefit-test TSVs or their events directories")
+    parser.add_argument("--prom-url", default=PROM_URL, help=f"Prometheus base URL (default: {PROM_URL})")
+    parser.add_argument("--spec", help="JSON metric spec (default: backfill_metrics' built-in spec)")
+    parser.add_argument("--metrics", help="Comma-separated subset of the spec's metric names")
+    parser.add_argument("--pad", type=float, default=0.0, help="Seconds exported before/after each window")
+    parser.add_argument("--output", type=Path,
+                        help=f"Write one archive for all sources (default: <source>{ARCHIVE_SUFFIX} next to each)")
+    args = parser.parse_args()
+
+    try:
+        metrics = load_spec(args.spec, args.metrics.split(",") if args.metrics else None)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    try:
+        import numpy as np  # noqa: F401  (used by write_archive)
+    except ImportError:
+        print("ERROR: numpy required. Install with: pip install numpy")
+        sys.exit(1)
+
+    groups = []
+    for source in args.sources:
+        windows = source_windows(source)
+        if not windows:
+            print(f"  WARN: no measurement windows in {source}, skipping", file=sys.stderr)
+            continue
+        groups.append((archive_path(source), [source], windows))
+    if not groups:
+        sys.exit(1)
+    if args.output:
+        groups = [(args.output, [s for g in groups for s in g[1]], [w for g in groups for w in g[2]])]
+
+    print(f"Exporting {len(metrics)} metrics from {args.prom_url}")
+    if not export(groups, metrics, PromClient(args.prom_url), args.pad):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
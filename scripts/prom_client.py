@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Shared Prometheus HTTP API client for the test and reporting scripts.
+
+PromClient keeps a pool of keep-alive connections and fans a whole metric
+set out concurrently, so a snapshot of N queries costs about one round trip
+instead of N fresh connections run back to back:
+
+    prom = PromClient("http://localhost:9090")
+    prom.query("sum(dynamo_frontend_queued_requests) or vector(0)")    # float or None
+    prom.query_many({"queue": QUEUE_QUERY, "kv_hit": KV_HIT_QUERY})    # {name: float or None}
+    prom.range_mean(TOPS_QUERY, "2026-03-01T10:00:00Z", "2026-03-01T10:05:00Z")
+
+Failed requests (connection errors, timeouts, HTTP 429/5xx) are retried
+with jittered exponential backoff; a connection the server closed while
+idle in the pool is replaced without counting as a retry. Values are
+normalized: NaN, +/-Inf, empty results and errors all come back as None
+(instant queries) or are dropped (range samples), and the last error is
+kept in last_error.
+
+Run as a script, it evaluates instant queries concurrently and prints the
+values on one line for the shell harnesses, NaN for missing:
+
+    IFS='|' read -r t50 qd <<< "$(python3 scripts/prom_client.py "$Q_TTFT_P50" "$Q_QUEUE")"
+
+--prom-url also accepts an archive written by prom_archive.py (see
+open_prom()), for querying a torn-down cluster's series offline.
+
+Only the standard library is required (numpy for archives).
+"""
+
+import argparse
+import http.client
+import json
+import math
+import queue
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+PROM_URL = "http://localhost:9090"
+TIMEOUT_SEC = 10.0
+RETRIES = 2
+BACKOFF_SEC = 0.2
+WORKERS = 8
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def finite(value):
+    """float(value), or None for NaN, +/-Inf and anything unparsable."""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+class PromClient:
+    """Pooled, retrying client for the Prometheus query API (see module docstring)."""
+
+    def __init__(self, base_url=PROM_URL, timeout=TIMEOUT_SEC, retries=RETRIES, backoff=BACKOFF_SEC,
+                 workers=WORKERS):
+        url = urlsplit(base_url)
+        self.base_url = base_url
+        self.https = url.scheme == "https"
+        self.host = url.hostname or "localhost"
+        self.port = url.port or (443 if self.https else 80)
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.workers = workers
+        self.last_error = None
+        self._pool = queue.LifoQueue()
+        self._executor = None
+
+    # ── Connections ───────────────────────────────────────────────────────
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self, fresh=False):
+        """(connection, reused) — an idle pooled connection unless fresh."""
+        if not fresh:
+            try:
+                return self._pool.get_nowait(), True
+            except queue.Empty:
+                pass
+        return self._connect(), False
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _map(self, fn, items):
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prom")
+        return list(self._executor.map(fn, items))
+
+    # ── Requests ──────────────────────────────────────────────────────────
+
+    def request(self, endpoint, params):
+        """POST params to /api/v1/<endpoint>; the response's "data", or None on failure."""
+        body = urlencode(params)
+        headers = {"Content-Type": "application/x-www-form-urlencoded", "Accept": "application/json"}
+        path = f"{self.prefix}/api/v1/{endpoint}"
+        attempt = 0
+        fresh = False
+        while True:
+            conn, reused = self._acquire(fresh)
+            fresh = False
+            try:
+                conn.request("POST", path, body, headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused:
+                    # Server closed the idle keep-alive connection: not a real failure
+                    fresh = True
+                    continue
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._pool.put(conn)
+                if resp.status not in RETRY_STATUSES:
+                    try:
+                        payload = json.loads(raw)
+                    except ValueError:
+                        self.last_error = f"HTTP {resp.status}: invalid JSON"
+                        return None
+                    if payload.get("status") != "success":
+                        # Bad query or similar: retrying will not help
+                        self.last_error = f"HTTP {resp.status}: {payload.get('error', 'query failed')}"
+                        return None
+                    return payload.get("data")
+                error = f"HTTP {resp.status}"
+            if attempt >= self.retries:
+                self.last_error = error
+                return None
+            time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+    # ── Instant queries ───────────────────────────────────────────────────
+
+    def query_vector(self, query, at=None):
+        """[(labels, value)] for an instant query; value None where not finite."""
+        params = {"query": query}
+        if at is not None:
+            params["time"] = at
+        data = self.request("query", params)
+        if not data:
+            return []
+        result = data.get("result") or []
+        if data.get("resultType") == "scalar":
+            return [({}, finite(result[1]))] if result else []
+        return [(series.get("metric", {}), finite(series.get("value", [None, None])[1])) for series in result]
+
+    def query(self, query, at=None):
+        """First value of an instant query, or None (empty, NaN/Inf or failed)."""
+        vector = self.query_vector(query, at)
+        return vector[0][1] if vector else None
+
+    def query_many(self, queries, at=None):
+        """Evaluate instant queries concurrently.
+
+        queries is a {name: promql} dict (returns {name: value}) or a list
+        (returns a list of values in the same order).
+        """
+        if isinstance(queries, dict):
+            values = self._map(lambda q: self.query(q, at), list(queries.values()))
+            return dict(zip(queries, values))
+        return self._map(lambda q: self.query(q, at), list(queries))
+
+    # ── Range queries ─────────────────────────────────────────────────────
+
+    def query_range(self, query, start, end, step="60"):
+        """[{"metric": labels, "values": [(t, v)]}] with non-finite samples dropped.
+
+        start/end are RFC 3339 strings or epoch seconds; step is seconds or a
+        duration. None if the request failed (an empty range is []).
+        """
+        data = self.request("query_range", {"query": query, "start": start, "end": end, "step": step})
+        if data is None:
+            return None
+        series = []
+        for s in data.get("result") or []:
+            values = [(float(t), v) for t, v in ((t, finite(v)) for t, v in s.get("values", [])) if v is not None]
+            series.append({"metric": s.get("metric", {}), "values": values})
+        return series
+
+    def range_many(self, requests):
+        """Run range queries concurrently: {key: (query, start, end, step)} -> {key: series or None}."""
+        keys = list(requests)
+        results = self._map(lambda k: self.query_range(*requests[k]), keys)
+        return dict(zip(keys, results))
+
+    def range_mean(self, query, start, end, step="60"):
+        """Mean of every finite sample across all series of a range query, or None."""
+        values = [v for s in self.query_range(query, start, end, step) or [] for _, v in s["values"]]
+        return sum(values) / len(values) if values else None
+
+
+def open_prom(source=PROM_URL, **kwargs):
+    """PromClient for an http(s) URL; otherwise an ArchiveClient over comma-separated archive paths.
+
+    Archives are written by prom_archive.py (which needs numpy).
+    """
+    if source.startswith(("http://", "https://")):
+        return PromClient(source, **kwargs)
+    from prom_archive import ArchiveClient
+
+    return ArchiveClient(source.split(","))
+
+
+# ── CLI (for the shell harnesses) ────────────────────────────────────────────
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate Prometheus instant queries concurrently; print the values on one line",
+    )
+    parser.add_argument("queries", nargs="+", metavar="QUERY", help="PromQL instant queries")
+    parser.add_argument("--prom-url", default=PROM_URL,
+                        help=f"Prometheus base URL or prom_archive.py archive(s) (default: {PROM_URL})")
+    parser.add_argument("--at", help="Evaluation time, epoch seconds or RFC 3339 (default: now / archive end)")
+    parser.add_argument("--sep", default="|", help="Output separator (default: |)")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SEC,
+                        help=f"Per-request timeout seconds (default: {TIMEOUT_SEC:g})")
+    parser.add_argument("--retries", type=int, default=RETRIES, help=f"Retries per query (default: {RETRIES})")
+    args = parser.parse_args()
+
+    with open_prom(args.prom_url, timeout=args.timeout, retries=args.retries) as prom:
+        values = prom.query_many(args.queries, args.at)
+        if prom.last_error and all(v is None for v in values):
+            print(f"prom_client: {prom.last_error}", file=sys.stderr)
+    print(args.sep.join("NaN" if v is None else f"{v:.6f}" for v in values))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Steady-state detection to replace fixed warmup sleeps in load tests.
+
+A SteadyStateDetector takes timestamped samples of any number of signals
+(streaming TTFT, active requests, Prometheus queued requests, ...) and
+declares steady state once none of them is still moving:
+
+  - samples are averaged into BUCKET_SEC buckets, and each check judges the
+    trailing window against the window just before it (the reference);
+  - the least-squares slope extrapolated across the window must stay within
+    tolerance of the window mean (or of the signal's floor, for signals that
+    sit near zero such as queue depth) unless it is within SLOPE_T standard
+    errors of zero;
+  - likewise the two window means must agree within tolerance unless the
+    difference is within SLOPE_T standard errors, which a slow ramp fails
+    even when each window's slope is lost in the noise;
+  - a two-sided CUSUM of the window's bucket means around the reference
+    mean, in units of the reference window's detrended spread, must not
+    cross its threshold, which catches a step that a single slope can
+    average out (the spread is taken from the reference, so a trend in the
+    window under test cannot inflate it);
+  - all of that must hold for CONSECUTIVE checks in a row.
+
+Signals that never receive a sample (e.g. Prometheus unreachable) are ignored.
+
+Run as a script, it polls the load generator /api/status (TTFT p50 and active
+requests) and Prometheus (dynamo_frontend_queued_requests) until steady, for
+the shell harnesses:
+
+    waited=$(python3 scripts/steady_state.py --max-sec 300)
+
+The warmup seconds go to stdout (progress to stderr). Exit status is 0 once
+steady, or 3 if --max-sec passed first (the seconds waited are still printed).
+
+Only the standard library is required.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from prom_client import PromClient
+
+BUCKET_SEC = 2.0
+WINDOW_SEC = 30.0
+TOLERANCE = 0.05
+MIN_SEC = 15.0
+MAX_SEC = 300.0
+# CUSUM reference (k) and decision (h) values in units of the reference spread
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+# |slope| / standard error above which a window's trend counts as real
+SLOPE_T = 2.0
+# Passing checks in a row needed before steady state is declared
+CONSECUTIVE = 3
+# Fraction of a window's buckets that must hold samples before a signal is judged
+MIN_COVERAGE = 0.6
+
+POLL_SEC = 2.0
+EXIT_TIMEOUT = 3
+
+# Standard load test signals and their floors (ms, requests, requests)
+SIGNAL_FLOORS = {"ttft": 10.0, "active": 1.0, "queue": 2.0}
+
+DEFAULT_QUEUE_QUERY = 'sum(dynamo_frontend_queued_requests{dynamo_namespace="dynamo-workload-gtc-demo"}) or vector(0)'
+
+
+def linear_fit(xs, ys):
+    """(slope, slope standard error, residual SD) of the least-squares line through the points."""
+    n = len(xs)
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return 0.0, 0.0, 0.0
+    b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    sse = sum((y - my - b * (x - mx)) ** 2 for x, y in zip(xs, ys))
+    resid_sd = math.sqrt(sse / (n - 2)) if n > 2 else 0.0
+    return b, resid_sd / math.sqrt(sxx), resid_sd
+
+
+def variance(values) -> float:
+    n = len(values)
+    mean = sum(values) / n
+    return sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else 0.0
+
+
+def cusum(values, mean, sd, k=CUSUM_K) -> float:
+    """Largest two-sided CUSUM excursion of values around mean, in units of sd."""
+    if sd <= 0:
+        return 0.0
+    hi = lo = peak = 0.0
+    for v in values:
+        z = (v - mean) / sd
+        hi = max(0.0, hi + z - k)
+        lo = max(0.0, lo - z - k)
+        peak = max(peak, hi, lo)
+    return peak
+
+
+class SteadyStateDetector:
+    """Decide when a set of streaming signals has stopped drifting."""
+
+    def __init__(self, window_sec=WINDOW_SEC, tolerance=TOLERANCE, min_sec=MIN_SEC, max_sec=MAX_SEC,
+                 bucket_sec=BUCKET_SEC, start=None):
+        self.window_sec = window_sec
+        self.tolerance = tolerance
+        # Judging a window needs the reference window before it
+        self.min_sec = max(min_sec, 2 * window_sec)
+        self.max_sec = max_sec
+        self.bucket_sec = bucket_sec
+        self.start = time.time() if start is None else start
+        self.floors = {}
+        # signal -> {bucket index: [sum, count]}
+        self.buckets = {}
+        self.steady_at = None
+        self.passes = 0
+        self.drift = {}
+
+    def add_signal(self, name, floor=0.0):
+        """Register a signal; drift is judged relative to max(|mean|, floor)."""
+        self.floors[name] = floor
+        self.buckets.setdefault(name, {})
+
+    def add(self, name, value, t=None):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        if name not in self.buckets:
+            self.add_signal(name)
+        b = int(((time.time() if t is None else t) - self.start) // self.bucket_sec)
+        acc = self.buckets[name].setdefault(b, [0.0, 0])
+        acc[0] += value
+        acc[1] += 1
+
+    def elapsed(self, now=None) -> float:
+        return (time.time() if now is None else now) - self.start
+
+    def timed_out(self, now=None) -> bool:
+        return self.elapsed(now) >= self.max_sec
+
+    def check(self, now=None) -> bool:
+        """True once steady (sticky); updates drift with each signal's window statistics."""
+        if self.steady_at is not None:
+            return True
+        elapsed = self.elapsed(now)
+        if elapsed < self.min_sec:
+            return False
+        last = int(elapsed // self.bucket_sec)  # current, still filling
+        width = int(self.window_sec // self.bucket_sec)
+        first = last - width
+        steady = True
+        for name, buckets in self.buckets.items():
+            if not buckets:
+                continue
+            points = [(b * self.bucket_sec, s / n) for b, (s, n) in buckets.items() if first <= b < last]
+            ref = [(b * self.bucket_sec, s / n) for b, (s, n) in buckets.items() if first - width <= b < first]
+            if min(len(points), len(ref)) < max(MIN_COVERAGE * width, 3):
+                self.drift[name] = None
+                steady = False
+                continue
+            xs, ys = zip(*points)
+            ref_xs, ref_ys = zip(*ref)
+            mean, ref_mean = sum(ys) / len(ys), sum(ref_ys) / len(ref_ys)
+            scale = max(abs(mean), self.floors.get(name, 0.0)) or 1.0
+
+            # Slope and mean shift fail only when both too large and significant (t > SLOPE_T)
+            b, se, _ = linear_fit(xs, ys)
+            drift = abs(b) * self.window_sec / scale
+            trending = drift > self.tolerance and abs(b) > SLOPE_T * se
+            shift = abs(mean - ref_mean) / scale
+            shift_se = math.sqrt(variance(ys) / len(ys) + variance(ref_ys) / len(ref_ys))
+            shifted = shift > self.tolerance and abs(mean - ref_mean) > SLOPE_T * shift_se
+            # Detrended reference spread, floored so a near-constant signal is not held to zero noise
+            _, _, ref_sd = linear_fit(ref_xs, ref_ys)
+            change = cusum(ys, ref_mean, max(ref_sd, self.tolerance * scale / 2))
+            self.drift[name] = (drift, shift, change)
+            if trending or shifted or change > CUSUM_H:
+                steady = False
+        if steady and any(self.drift.get(name) for name in self.buckets):
+            self.passes += 1
+        else:
+            self.passes = 0
+        if self.passes >= CONSECUTIVE:
+            self.steady_at = elapsed
+        return self.steady_at is not None
+
+    def status(self) -> str:
+        """One-line per-signal summary of the last check()."""
+        parts = []
+        for name in self.buckets:
+            d = self.drift.get(name)
+            if d is None:
+                parts.append(f"{name}=n/a" if not self.buckets[name] else f"{name}=filling")
+            else:
+                parts.append(f"{name} drift={d[0]:.0%} shift={d[1]:.0%} cusum={d[2]:.1f}")
+        return "  ".join(parts)
+
+
+def load_test_detector(**kwargs) -> SteadyStateDetector:
+    """Detector with the standard signals: ttft (ms), active (requests), queue (requests)."""
+    detector = SteadyStateDetector(**kwargs)
+    for name, floor in SIGNAL_FLOORS.items():
+        detector.add_signal(name, floor)
+    return detector
+
+
+# ── CLI polling (load generator + Prometheus) ───────────────────────────────
+
+
+def get_json(url, timeout=10):
+    try:
+        with urlopen(Request(url), timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except (URLError, OSError, json.JSONDecodeError):
+        return None
+
+
+def poll_loadgen(detector, loadgen_url):
+    status = get_json(f"{loadgen_url}/api/status")
+    if not status:
+        return
+    metrics = status.get("metrics") or {}
+    if metrics.get("requestCount"):
+        detector.add("ttft", (metrics.get("ttft") or {}).get("p50"))
+    detector.add("active", status.get("activeRequests"))
+
+
+def poll_prometheus(detector, prom, query):
+    detector.add("queue", prom.query(query))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Wait until the running workload reaches steady state; print the warmup seconds",
+    )
+    parser.add_argument("--loadgen-url", default="http://localhost:3000", help="Load generator base URL")
+    parser.add_argument("--prom-url", default="http://localhost:9090", help="Prometheus base URL")
+    parser.add_argument("--queue-query", default=DEFAULT_QUEUE_QUERY, help="PromQL for queued requests")
+    parser.add_argument("--window", type=float, default=WINDOW_SEC,
+                        help=f"Trailing window seconds judged for drift (default: {WINDOW_SEC:g})")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"Allowed drift across the window, relative to the mean (default: {TOLERANCE:g})")
+    parser.add_argument("--min-sec", type=float, default=MIN_SEC,
+                        help=f"Minimum warmup seconds (default: {MIN_SEC:g}, at least twice --window)")
+    parser.add_argument("--max-sec", type=float, default=MAX_SEC,
+                        help=f"Give up after this many seconds (default: {MAX_SEC:g})")
+    args = parser.parse_args()
+
+    detector = load_test_detector(window_sec=args.window, tolerance=args.tolerance, min_sec=args.min_sec,
+                                  max_sec=args.max_sec)
+
+    prom = PromClient(args.prom_url, retries=0)
+    next_report = time.time() + 10
+    while not detector.check():
+        if detector.timed_out():
+            print(f"steady_state: no steady state after {detector.elapsed():.0f}s ({detector.status()})",
+                  file=sys.stderr)
+            print(f"{detector.elapsed():.0f}")
+            sys.exit(EXIT_TIMEOUT)
+        poll_loadgen(detector, args.loadgen_url)
+        poll_prometheus(detector, prom, args.queue_query)
+        if time.time() >= next_report:
+            print(f"steady_state: [{detector.elapsed():>4.0f}s] {detector.status()}", file=sys.stderr)
+            next_report += 10
+        time.sleep(POLL_SEC)
+
+    print(f"steady_state: steady after {detector.steady_at:.0f}s ({detector.status()})", file=sys.stderr)
+    print(f"{detector.steady_at:.0f}")
+
+
+if __name__ == "__main__":
+    main()
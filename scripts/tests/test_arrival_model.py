@@ -0,0 +1,46 @@
+"""ArrivalModel (coordinated-omission accounting) in kv-benefit-test.py."""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS))
+_spec = importlib.util.spec_from_file_location("kv_benefit_test", SCRIPTS / "kv-benefit-test.py")
+kv_benefit_test = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(kv_benefit_test)
+
+ArrivalModel = kv_benefit_test.ArrivalModel
+NO_TURN = kv_benefit_test.NO_TURN
+
+
+def test_tied_dispatch_times_do_not_compare_ttft():
+    model = ArrivalModel(rps=10)
+    # A follow-up completing early opens the counting window before the ties
+    model.add(1, True, 900.0, 100.0, 20.0)
+    # Same dispatch time (completed_at - latency_ms = 1000) with a TTFT and with None
+    model.add(0, True, 1100.0, 100.0, 50.0)
+    model.add(NO_TURN, True, 1100.0, 100.0, 0.0)
+    model.add(0, False, 1200.0, 200.0, 0.0)
+    model.add(0, True, 1400.0, 300.0, 40.0)
+    model.add(0, True, 5000.0, 100.0, 30.0)
+
+    summary = model.summary()
+
+    assert summary is not None
+    assert summary["dispatched"] == 4
+    assert summary["intended"] >= summary["dispatched"]
+
+
+def test_tied_dispatch_times_from_arrays():
+    import numpy as np
+
+    model = ArrivalModel(rps=10)
+    turn = np.array([1, 0, NO_TURN, 0, 0, 0])
+    ok = np.array([True, True, True, False, True, True])
+    completed = np.array([900.0, 1100.0, 1100.0, 1200.0, 1400.0, 5000.0])
+    latency = np.array([100.0, 100.0, 100.0, 200.0, 300.0, 100.0])
+    ttft = np.array([20.0, 50.0, 0.0, 0.0, 40.0, 30.0])
+    model.add_arrays(turn, ok, completed, latency, ttft)
+
+    assert model.summary()["dispatched"] == 4